@@ -0,0 +1,63 @@
+"""place search indexes
+
+Revision ID: 3f1c2a9d7b10
+Revises: 
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b10'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # unaccent() is only STABLE, index expressions need an IMMUTABLE wrapper
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+        $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        """
+    )
+    # Lower-cased, diacritic-folded text searched by /places/search
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION place_search_document(name text, local_name text, address text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+        $$ SELECT lower(immutable_unaccent(
+            coalesce(name, '') || ' ' || coalesce(local_name, '') || ' ' || coalesce(address, '')
+        )) $$
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_places_search_trgm ON places
+        USING gin (place_search_document(name, local_name, address) gin_trgm_ops)
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_places_search_tsv ON places
+        USING gin (to_tsvector('simple', place_search_document(name, local_name, address)))
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_places_search_tsv")
+    op.execute("DROP INDEX IF EXISTS ix_places_search_trgm")
+    op.execute("DROP FUNCTION IF EXISTS place_search_document(text, text, text)")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
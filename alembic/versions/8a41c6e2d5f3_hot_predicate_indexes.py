@@ -0,0 +1,67 @@
+"""hot predicate indexes and unique constraints
+
+Revision ID: 8a41c6e2d5f3
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 11:47:05.902611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a41c6e2d5f3'
+down_revision: Union[str, None] = '3f1c2a9d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, constraint name, columns, primary key, keep) where keep picks the
+# surviving duplicate: the oldest row, or the newest for device tokens
+UNIQUE_CONSTRAINTS = [
+    ("restaurant_details", "uq_restaurant_details_place_id", ["place_id"], "restaurant_detail_id", "oldest"),
+    ("hotel_details", "uq_hotel_details_place_id", ["place_id"], "hotel_detail_id", "oldest"),
+    ("attraction_details", "uq_attraction_details_place_id", ["place_id"], "attraction_detail_id", "oldest"),
+    ("itinerary_shares", "uq_itinerary_shares_itinerary_user", ["itinerary_id", "shared_with_user_id"], "share_id", "oldest"),
+    ("fcm_tokens", "uq_fcm_tokens_user_token", ["user_id", "fcm_token"], "token_id", "newest"),
+    ("favorite_itineraries", "uq_favorite_itineraries_user_itinerary", ["user_id", "itinerary_id"], "favorite_id", "oldest"),
+]
+
+INDEXES = [
+    ("ix_places_city", "places", ["city"]),
+    ("ix_places_type", "places", ["type"]),
+    ("ix_place_photos_place_id", "place_photos", ["place_id"]),
+    ("ix_itineraries_user_id_created_at", "itineraries", ["user_id", "created_at", "itinerary_id"]),
+    ("ix_itinerary_days_itinerary_id_day_number", "itinerary_days", ["itinerary_id", "day_number"]),
+    ("ix_itinerary_activities_day_id_start_time", "itinerary_activities", ["day_id", "start_time"]),
+    ("ix_itinerary_activities_place_id", "itinerary_activities", ["place_id"]),
+    ("ix_itinerary_shares_shared_with_user_id", "itinerary_shares", ["shared_with_user_id"]),
+    ("ix_favorite_itineraries_itinerary_id", "favorite_itineraries", ["itinerary_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, name, columns, primary_key, keep in UNIQUE_CONSTRAINTS:
+        # Drop duplicates left behind by the check-then-insert code paths
+        same_key = " AND ".join(f"a.{column} = b.{column}" for column in columns)
+        newer_or_older = ">" if keep == "oldest" else "<"
+        op.execute(
+            f"DELETE FROM {table} a USING {table} b "
+            f"WHERE {same_key} AND a.{primary_key} {newer_or_older} b.{primary_key}"
+        )
+        op.create_unique_constraint(name, table, columns)
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+
+    for table, name, _, _, _ in reversed(UNIQUE_CONSTRAINTS):
+        op.drop_constraint(name, table, type_="unique")
@@ -0,0 +1,31 @@
+"""itinerary version
+
+Revision ID: b7e3d9a1c4f8
+Revises: f4c8a1d3e6b2
+Create Date: 2026-10-18 17:41:09.552814
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d9a1c4f8'
+down_revision: Union[str, None] = 'f4c8a1d3e6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'itineraries',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('itineraries', 'version')
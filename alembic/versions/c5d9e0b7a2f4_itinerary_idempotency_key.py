@@ -0,0 +1,36 @@
+"""itinerary idempotency key
+
+Revision ID: c5d9e0b7a2f4
+Revises: 8a41c6e2d5f3
+Create Date: 2026-10-18 13:05:22.417930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d9e0b7a2f4'
+down_revision: Union[str, None] = '8a41c6e2d5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'itineraries',
+        sa.Column('idempotency_key', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True)
+    )
+    op.create_unique_constraint(
+        'uq_itineraries_user_idempotency_key', 'itineraries', ['user_id', 'idempotency_key']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_itineraries_user_idempotency_key', 'itineraries', type_='unique')
+    op.drop_column('itineraries', 'idempotency_key')
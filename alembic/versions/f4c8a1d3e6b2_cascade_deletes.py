@@ -0,0 +1,56 @@
+"""on delete cascade for user and itinerary children
+
+Revision ID: f4c8a1d3e6b2
+Revises: e2b7f4a9c1d6
+Create Date: 2026-10-18 15:02:37.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8a1d3e6b2'
+down_revision: Union[str, None] = 'e2b7f4a9c1d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, referred table, referred column)
+CASCADE_FOREIGN_KEYS = [
+    ("itineraries", "user_id", "users", "user_id"),
+    ("itinerary_days", "itinerary_id", "itineraries", "itinerary_id"),
+    ("itinerary_activities", "day_id", "itinerary_days", "day_id"),
+    ("itinerary_shares", "itinerary_id", "itineraries", "itinerary_id"),
+    ("itinerary_shares", "shared_with_user_id", "users", "user_id"),
+    ("favorite_itineraries", "user_id", "users", "user_id"),
+    ("favorite_itineraries", "itinerary_id", "itineraries", "itinerary_id"),
+    ("fcm_tokens", "user_id", "users", "user_id"),
+    ("notification_outbox", "user_id", "users", "user_id"),
+]
+
+
+def _replace_foreign_keys(ondelete: Union[str, None]) -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, column, referred_table, referred_column in CASCADE_FOREIGN_KEYS:
+        # The base schema was not created by alembic, so look up the constraint names
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key["constrained_columns"] == [column]:
+                op.drop_constraint(foreign_key["name"], table, type_="foreignkey")
+        op.create_foreign_key(
+            f"{table}_{column}_fkey", table, referred_table, [column], [referred_column], ondelete=ondelete
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_foreign_keys("CASCADE")
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'deleted_at')
+    _replace_foreign_keys(None)
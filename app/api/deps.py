@@ -1,4 +1,5 @@
 from typing import Annotated, Generator, Optional
+import uuid
 import jwt
 from fastapi import Depends, HTTPException, status, Security
 from fastapi.security import APIKeyHeader
@@ -9,13 +10,15 @@ from app.core.security import ALGORITHM
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
+from app.core.principal_cache import get_principal
 from app.models import  Users
 from app.repository.response.login_response import TokenPayload, Token
 
 api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
 
 def get_session() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    # Services commit once per request and keep using the rows to build the response
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
 SessionDep = Annotated[Session, Depends(get_session)]
@@ -35,15 +38,15 @@ def get_current_user(
     token = authorization.replace("Bearer ", "") if authorization.startswith("Bearer ") else authorization
     
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        token_data = TokenPayload(**payload)
-    except (jwt.PyJWTError, ValidationError, InvalidTokenError):
+        token_data = security.decode_token(token)
+        user_id = uuid.UUID(token_data.sub)
+    except (jwt.PyJWTError, ValidationError, InvalidTokenError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
     
-    user = session.get(Users, token_data.sub)
+    user = get_principal(session, user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -18,12 +18,12 @@ from app.core.config import settings
 router = APIRouter(prefix="/login", tags=["auth"])
 
 @router.post("/", response_model=LoginResponse)
-def login_access_token(
+async def login_access_token(
     session: SessionDep,
     login_data: LoginRequest
 ):
     return LoginResponse(
-        data=auth_service.login_access_token(
+        data=await auth_service.login_access_token(
             session=session,
             email=login_data.email,
             password=login_data.password,
@@ -33,11 +33,11 @@ def login_access_token(
     )
 
 @router.post("/admin", response_model=LoginResponse)
-def admin_login_access_token(
+async def admin_login_access_token(
     session: SessionDep,
     login_data: LoginRequest
 ):
-    user = crud_user.authenticate(session=session, email=login_data.email, password=login_data.password)
+    user = await crud_user.authenticate(session=session, email=login_data.email, password=login_data.password)
     if not user:
         raise HTTPException(
             status_code=400,
@@ -49,6 +49,7 @@ def admin_login_access_token(
             status_code=403,
             detail="Access denied. Admin role required."
         )
+    session.commit()
 
     access_token = create_access_token(user.user_id)
     refresh_token = create_refresh_token(user.user_id)
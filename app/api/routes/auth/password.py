@@ -2,14 +2,14 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.api.deps import SessionDep, CurrentUser
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.crud.users.crud_user import crud_user
 from app.models import NewPassword, Message, ChangePassword
 
 router = APIRouter(prefix="/password", tags=["auth"])
 
 @router.post("/change", response_model=Message)
-def change_password(
+async def change_password(
     session: SessionDep,
     current_user: CurrentUser,  # Requires authentication
     data: ChangePassword
@@ -18,7 +18,7 @@ def change_password(
     Change password for logged in user.
     Requires authentication.
     """
-    if not verify_password(data.old_password, current_user.password):
+    if not await verify_password_async(data.old_password, current_user.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
@@ -30,14 +30,14 @@ def change_password(
             detail="New password must be different from current password"
         )
 
-    current_user.password = get_password_hash(data.new_password)
+    current_user.password = await get_password_hash_async(data.new_password)
     session.add(current_user)
     session.commit()
     return Message(detail="Password changed successfully")
 
 
 @router.post("/reset-by-email", response_model=Message)
-def reset_password(
+async def reset_password(
     session: SessionDep,  # No authentication required
     body: NewPassword
 ):
@@ -52,7 +52,7 @@ def reset_password(
             detail="User not found"
         )
 
-    user.password = get_password_hash(body.new_password)
+    user.password = await get_password_hash_async(body.new_password)
     session.add(user)
     session.commit()
     return Message(detail="Password reset successfully")
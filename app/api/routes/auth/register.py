@@ -13,7 +13,7 @@ router = APIRouter(prefix="/register", tags=["auth"])
         422: {"description": "Validation error"}
     }
 )
-def register_user(
+async def register_user(
     session: SessionDep,
     # current_user: CurrentUser,
     user_in: UserCreate
@@ -24,4 +24,4 @@ def register_user(
     Creates a new user account with the provided email, password and user information.
     Returns the created user without sensitive data.
     """
-    return UserResponse(data= user_service.create_user(session=session, user_in=user_in))
+    return UserResponse(data=await user_service.create_user(session=session, user_in=user_in))
@@ -6,7 +6,7 @@ from app.crud.users.crud_user import crud_user
 from app.services.email.mail_service import (
     create_verification_email,
     create_recovery_email,
-    send_email,
+    queue_email,
 )
 from app.services.email.otp_token_service import (
     generate_otp,
@@ -64,8 +64,8 @@ def request_otp(
         # Create token
         token = create_otp_token(email=otp_request.email, otp_code=otp_code)
 
-        # Send email using mail service
-        send_email(
+        # Queue the email, the mail workers send it in the background
+        queue_email(
             email_to=otp_request.email,
             subject=email_data.subject,
             html_content=email_data.html_content
@@ -1,37 +1,33 @@
-from fastapi import APIRouter, Depends, Body
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, Body, Header, HTTPException, status
+from typing import List, Dict, Any, Optional
 from uuid import UUID
 from app.api.deps import CurrentUser, SessionDep
 from app.models import (
     ItineraryPublic, ItineraryCreate, ItineraryDayCreate, ItineraryActivityCreate,
-    Message
+    ItineraryGenerateRequest, Message
 )
 from datetime import timedelta
+from app.services.itineraries.activity_scheduler import activity_scheduler
+from app.services.itineraries.itinerary_planner import itinerary_planner
 from app.services.itineraries.itinerary_service import itinerary_service
-from datetime import datetime, time
+from app.services.places.place_service import place_service
+from datetime import datetime
 
 router = APIRouter(prefix="/itinerary-planner", tags=["itinerary-planner"])
 
-# Default start times for activities based on their order
-DEFAULT_START_TIMES = [
-    time(7, 30),  # 7:30
-    time(8, 30),  # 8:30
-    time(11, 30), # 11:30
-    time(14, 0),  # 14:00
-    time(17, 0),  # 17:00
-    time(20, 0),  # 20:00
-]
-
 @router.post("/create-from-ai", response_model=ItineraryPublic)
 def create_itinerary_from_ai(
     *,
     session: SessionDep,
     current_user: CurrentUser,
-    ai_data: Dict[str, Any] = Body(...)
+    ai_data: Dict[str, Any] = Body(...),
+    idempotency_key: Optional[str] = Header(
+        None, max_length=64, description="Retries with the same key return the itinerary created first"
+    )
 ) -> ItineraryPublic:
     """
     Create a new itinerary from AI-generated data format.
-    Automatically assigns start times to activities.
+    Start times are assigned from travel and visit times, restaurants at meal times.
     """
     # Handle date format - convert string dates to proper date objects
     try:
@@ -56,56 +52,69 @@ def create_itinerary_from_ai(
         hotel_id=ai_data.get("hotel_id")
     )
     
-    # Create the itinerary first
-    itinerary = itinerary_service.create_itinerary(
-        session=session,
-        user_id=current_user.user_id,
-        itinerary_in=itinerary_data
-    )
-    
+    # Load every place of every day, and the hotel, in one batch
+    hotel_id = ai_data.get("hotel_id")
+    all_place_ids = [
+        activity.get("place_id")
+        for day_info in ai_data.get("days", [])
+        for activity in day_info.get("activities", [])
+    ] + ([hotel_id] if hotel_id else [])
+    places = place_service._get_places_by_ids(session=session, place_ids=all_place_ids)
+    missing_ids = [place_id for place_id in dict.fromkeys(all_place_ids) if place_id not in places]
+    if missing_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Places with IDs {missing_ids} not found"
+        )
+    hotel = places.get(hotel_id) if hotel_id else None
+
     # Process days and activities
-    days_data = ai_data.get("days", [])
-    for day_info in days_data:
+    days_data = []
+    for day_info in ai_data.get("days", []):
         day_number = day_info.get("day_number", 1)
-        day_date = start_date + timedelta(days=day_number - 1)
-
-        # Create day
         day_data = ItineraryDayCreate(
             day_number=day_number,
-            date=day_date,
+            date=start_date + timedelta(days=day_number - 1),
         )
 
-        day = itinerary_service.add_day(
-            session=session,
-            user_id=current_user.user_id,
-            itinerary_id=itinerary.itinerary_id,
-            day_in=day_data
+        # Start times follow the AI's order, with restaurants moved into meal times
+        place_ids = [activity.get("place_id") for activity in day_info.get("activities", [])]
+        schedule = activity_scheduler.schedule(
+            places=[places[place_id] for place_id in place_ids], hotel=hotel
         )
-        
-        # Process activities for this day
-        activities = day_info.get("activities", [])
-        for idx, activity in enumerate(activities):
-            if idx < len(DEFAULT_START_TIMES):
-                start_time = DEFAULT_START_TIMES[idx]
-            else:
-                # Default to last time slot if more activities than time slots
-                start_time = DEFAULT_START_TIMES[-1]
-                
-            # Create activity
-            activity_data = ItineraryActivityCreate(
-                place_id=activity.get("place_id"),
-                start_time=start_time
-            )
-            
-            itinerary_service.add_activity(
-                session=session,
-                user_id=current_user.user_id,
-                day_id=day.day_id,
-                activity_in=activity_data
-            )
+        activities_data = [
+            ItineraryActivityCreate(place_id=place_ids[idx], start_time=start_time)
+            for idx, start_time in schedule
+        ]
+        days_data.append((day_data, activities_data))
     
-    # Return the full itinerary with all days and activities
-    return itinerary_service.get_itinerary(
+    # Create the itinerary with all days and activities in one transaction
+    return itinerary_service.create_itinerary_tree(
         session=session,
-        itinerary_id=itinerary.itinerary_id
-    )
\ No newline at end of file
+        user=current_user,
+        itinerary_in=itinerary_data,
+        days_in=days_data,
+        idempotency_key=idempotency_key,
+        places=places
+    )
+
+@router.post("/generate", response_model=ItineraryPublic)
+def generate_itinerary(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    plan_in: ItineraryGenerateRequest,
+    idempotency_key: Optional[str] = Header(
+        None, max_length=64, description="Retries with the same key return the itinerary created first"
+    )
+) -> ItineraryPublic:
+    """
+    Generate an itinerary from the best rated places of a city.
+    Places are grouped into days by location and each day is ordered by travel distance.
+    """
+    return itinerary_planner.generate(
+        session=session,
+        user=current_user,
+        plan_in=plan_in,
+        idempotency_key=idempotency_key
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Response, status
 from typing import List, Dict, Any
 from uuid import UUID
 from app.api.deps import CurrentUser, SessionDep, get_current_user
@@ -6,7 +6,7 @@ from app.models import (
     ItineraryPublic, ItineraryCreate, ItineraryUpdate,
     ItineraryDayPublic, ItineraryDayCreate, ItineraryDayUpdate,
     ItineraryActivityPublic, ItineraryActivityCreate, ItineraryActivityUpdate,
-    Message, PaginatedResponse,ItineraryResponse
+    Message, PaginatedResponse,ItineraryResponse, ItineraryRoutePublic
 )
 from app.services.itineraries.itinerary_service import itinerary_service
 
@@ -19,7 +19,8 @@ def read_itineraries(
     current_user: CurrentUser,
     destination: str = Query(None, description="Filter by destination city"),
     page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(10, ge=1, le=100, description="Number of items per page")
+    limit: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    cursor: str = Query(None, description="Cursor from pagination.next_cursor, pass it empty to start cursor pagination")
 ) -> PaginatedResponse[ItineraryPublic]:
     """
     Get user itineraries with optional filter for destination.
@@ -30,14 +31,16 @@ def read_itineraries(
             user_id=current_user.user_id, 
             destination=destination, 
             page=page, 
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
     else:
         result = itinerary_service.get_itineraries(
             session=session, 
             user_id=current_user.user_id, 
             page=page, 
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
     return PaginatedResponse(**result)
 
@@ -46,13 +49,27 @@ def read_itinerary(
     *,
     session: SessionDep,
     current_user: CurrentUser,
-    itinerary_id: int
+    itinerary_id: int,
+    include_legs: bool = Query(False, description="Add the travel leg to the next activity of each day"),
+    travel_mode: str = Query(None, description="Travel mode of the legs: walking, motorbike or car")
 ) -> ItineraryResponse:
     """
     Get itinerary by ID.
     """
-    itinerary = itinerary_service.get_itinerary(session=session, itinerary_id=itinerary_id,current_user=current_user.user_id)
-    return ItineraryResponse(data=itinerary)
+    if include_legs:
+        itinerary = itinerary_service.get_itinerary(
+            session=session,
+            itinerary_id=itinerary_id,
+            current_user=current_user.user_id,
+            include_legs=include_legs,
+            travel_mode=travel_mode
+        )
+        return ItineraryResponse(data=itinerary)
+    # Without legs the itinerary is served from its cached serialized document
+    document = itinerary_service.get_itinerary_document(
+        session=session, itinerary_id=itinerary_id, current_user=current_user.user_id
+    )
+    return Response(content=document, media_type="application/json")
 
 @router.post("", response_model=ItineraryResponse)
 def create_itinerary(
@@ -210,4 +227,59 @@ def delete_itinerary_activity(
         session=session, 
         user_id=current_user.user_id, 
         activity_id=activity_id
-    )
\ No newline at end of file
+    )
+
+@router.post("/days/{day_id}/schedule", response_model=ItineraryDayPublic)
+def schedule_itinerary_day(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    day_id: int
+) -> ItineraryDayPublic:
+    """
+    Reassign start times of a day's activities from visit and travel times.
+    The visit order is kept, restaurants are moved into breakfast, lunch and dinner times.
+    """
+    return itinerary_service.schedule_day(
+        session=session,
+        user_id=current_user.user_id,
+        day_id=day_id
+    )
+
+# Route optimization endpoints
+@router.post("/days/{day_id}/optimize", response_model=ItineraryRoutePublic)
+def optimize_itinerary_day(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    day_id: int,
+    dry_run: bool = Query(False, description="Return the proposed order without saving it")
+) -> ItineraryRoutePublic:
+    """
+    Reorder a day's activities to minimize travel distance from the itinerary's hotel.
+    The day's start times are kept and reassigned in route order.
+    """
+    return itinerary_service.optimize_day(
+        session=session,
+        user_id=current_user.user_id,
+        day_id=day_id,
+        dry_run=dry_run
+    )
+
+@router.post("/{itinerary_id}/optimize", response_model=ItineraryRoutePublic)
+def optimize_itinerary(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    itinerary_id: int,
+    dry_run: bool = Query(False, description="Return the proposed order without saving it")
+) -> ItineraryRoutePublic:
+    """
+    Optimize the activity order of every day in an itinerary.
+    """
+    return itinerary_service.optimize_itinerary(
+        session=session,
+        user_id=current_user.user_id,
+        itinerary_id=itinerary_id,
+        dry_run=dry_run
+    )
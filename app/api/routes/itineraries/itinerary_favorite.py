@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 from sqlalchemy import func
 
 from app.api.deps import SessionDep, CurrentUser
 from app.models import Itineraries, ItineraryShares, Message, ItineraryPublic, PaginatedResponse, PaginationMetadata
+from app.core.pagination import cursor_pagination, decode_cursor, encode_cursor
 from app.crud.itineraries.crud_favorite import crud_favorite
-from app.models import Users, UserPublicMinimal
+from app.services.itineraries.itinerary_service import itinerary_service
 
 router = APIRouter(prefix="", tags=["Itinerary Favorite"])
 
@@ -14,66 +15,38 @@ def get_favorite_itineraries(
     session: SessionDep,
     current_user: CurrentUser,
     page: int = 1,
-    limit: int = 10
+    limit: int = 10,
+    cursor: str = Query(None, description="Cursor from pagination.next_cursor, pass it empty to start cursor pagination")
 ):
-    favorites = crud_favorite.get_favorites(session, current_user.user_id)
-    itinerary_ids = [fav.itinerary_id for fav in favorites]
-    if not itinerary_ids:
-        return PaginatedResponse[ItineraryPublic](
-            data=[],
-            pagination=PaginationMetadata(
-                page=page,
-                limit=limit,
-                total_pages=0,
-                has_prev=False,
-                has_next=False
-            )
-        )
-    itineraries_query = select(Itineraries).where(Itineraries.itinerary_id.in_(itinerary_ids))
-    
-    # Đếm tổng số itinerary yêu thích
-    count_query = select(func.count()).select_from(Itineraries).where(Itineraries.itinerary_id.in_(itinerary_ids))
-    total = session.exec(count_query).one()
-
-    total_pages = (total + limit - 1) // limit
-    has_prev = page > 1
-    has_next = page < total_pages
-
-    itineraries = session.exec(
-        itineraries_query.offset((page - 1) * limit).limit(limit)
-    ).all()
-  
-    # Nếu bạn muốn trả về dạng ItineraryPublic:
-    data = []
-    for i in itineraries:
-        item = ItineraryPublic.model_validate(i).model_dump()
-        item["days"] = None
-        item["is_favorite"] = True
-
-        # Lấy thông tin owner
-        owner = session.get(Users, i.user_id)
-        if owner:
-            item["owner"] = UserPublicMinimal(
-                user_id=owner.user_id,
-                username=owner.username,
-                full_name=owner.full_name,
-                email=owner.email,
-                profile_picture=owner.profile_picture,
-                permissions="owner"
-            )
-        else:
-            item["owner"] = None
+    skip = (page - 1) * limit
+    key = decode_cursor(cursor, int)
+    rows = crud_favorite.get_favorite_itineraries(
+        session, current_user.user_id, skip=skip, limit=limit + 1, before_id=key[0] if key else None
+    )
+    has_next = len(rows) > limit
+    if has_next:
+        rows = rows[:limit]
 
-        data.append(item)
-    return PaginatedResponse[ItineraryPublic](
-        data=data,
-        pagination=PaginationMetadata(
+    if cursor is not None:
+        next_cursor = encode_cursor(rows[-1][1]) if has_next else None
+        pagination = cursor_pagination(limit=limit, cursor=cursor, next_cursor=next_cursor)
+    else:
+        # Đếm tổng số itinerary yêu thích
+        total = crud_favorite.get_count(session, current_user.user_id)
+        pagination = PaginationMetadata(
             page=page,
             limit=limit,
-            total_pages=total_pages,
-            has_prev=has_prev,
+            total_pages=(total + limit - 1) // limit,
+            has_prev=page > 1,
             has_next=has_next
         )
+
+    data = itinerary_service._build_itinerary_summaries(session=session, itineraries=[itinerary for itinerary, _ in rows])
+    for item in data:
+        item.is_favorite = True
+    return PaginatedResponse[ItineraryPublic](
+        data=data,
+        pagination=pagination
     )
 
 @router.post("/itineraries/{itinerary_id}/favorite", response_model=Message)
@@ -96,6 +69,7 @@ def add_favorite_itinerary(
         if not share:
             raise HTTPException(status_code=403, detail="You do not have permission to favorite this itinerary")
     crud_favorite.add(session, current_user.user_id, itinerary_id)
+    session.commit()
     return Message(detail="Added to favorites")
 
 @router.delete("/itineraries/{itinerary_id}/favorite", response_model=Message)
@@ -107,4 +81,5 @@ def remove_favorite_itinerary(
     fav = crud_favorite.remove(session, current_user.user_id, itinerary_id)
     if not fav:
         raise HTTPException(status_code=404, detail="Favorite not found")
+    session.commit()
     return Message(detail="Removed from favorites")
\ No newline at end of file
@@ -65,7 +65,8 @@ def read_itinerary_shares(
     shared_with_user_id: str = Query(None, description="Filter by shared user ID"),
     permission: str = Query(None, description="Filter by permission (view, edit)"),
     page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(10, ge=1, le=100, description="Number of items per page")
+    limit: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    cursor: str = Query(None, description="Cursor from pagination.next_cursor, pass it empty to start cursor pagination")
 ) -> ItinerarySharesResponse:
     """
     Get itinerary shares with optional filters.
@@ -77,7 +78,8 @@ def read_itinerary_shares(
             session=session, 
             itinerary_id=itinerary_id, 
             page=page, 
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
     elif shared_with_user_id:
         try:
@@ -86,7 +88,8 @@ def read_itinerary_shares(
                 session=session, 
                 shared_with_user_id=user_uuid, 
                 page=page, 
-                limit=limit
+                limit=limit,
+                cursor=cursor
             )
         except ValueError:
             raise HTTPException(
@@ -103,13 +106,15 @@ def read_itinerary_shares(
             session=session, 
             permission=permission, 
             page=page, 
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
     else:
         result = itinerary_share_service.get_shares(
             session=session, 
             page=page, 
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
     
     return result
@@ -221,7 +226,8 @@ def get_itinerary_shares(
     current_user: CurrentUser,
     itinerary_id: int = Path(..., description="Itinerary ID"),
     page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(10, ge=1, le=100, description="Number of items per page")
+    limit: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    cursor: str = Query(None, description="Cursor from pagination.next_cursor, pass it empty to start cursor pagination")
 ) -> ItinerarySharesResponse:
     """
     Get all shares for a specific itinerary.
@@ -230,7 +236,8 @@ def get_itinerary_shares(
         session=session, 
         itinerary_id=itinerary_id, 
         page=page, 
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
 @router.get("/me/shared-itineraries", response_model=PaginatedResponse[ItineraryPublic])
 def get_shared_itineraries_for_user(
@@ -238,7 +245,8 @@ def get_shared_itineraries_for_user(
     session: SessionDep,
     current_user: CurrentUser,
     page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(10, ge=1, le=100, description="Number of items per page")
+    limit: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    cursor: str = Query(None, description="Cursor from pagination.next_cursor, pass it empty to start cursor pagination")
 ) -> Dict[str, Any]:
     """
     Get all itineraries shared with a specific user.
@@ -249,7 +257,8 @@ def get_shared_itineraries_for_user(
         session=session,
         shared_with_user_id=user_uuid,
         page=page,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
     return result
 
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import List, Dict, Any
 from app.api.deps import CurrentUser, SessionDep, get_current_user
 from app.models import (
     PlacePublic, PlaceResponse, PlaceCreate, PlaceUpdate, 
     PlacePhotoPublic, PlacePhotoResponse, Message, PlacePhotoCreate,
-    PaginatedResponse, PaginationMetadata
+    PaginatedResponse, PaginationMetadata, TravelMatrixPublic
 )
 from app.services.places.place_service import place_service
+from app.services.places.travel_matrix import travel_matrix
 
 router = APIRouter(prefix="/places", tags=["places"])
 
@@ -16,14 +17,41 @@ def read_places(
     session: SessionDep,
     city: str = Query(None, description="Filter by city"),
     type: str = Query(None, description="Filter by place type (RESTAURANT, HOTEL, ATTRACTION)"),
+    sort: str = Query(None, description="Sort order, 'distance' sorts by distance from lat/lon"),
+    lat: float = Query(None, ge=-90, le=90, description="Latitude used by sort=distance"),
+    lon: float = Query(None, ge=-180, le=180, description="Longitude used by sort=distance"),
     page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(10, ge=1, le=100, description="Number of items per page")
+    limit: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    cursor: str = Query(None, description="Cursor from pagination.next_cursor, pass it empty to start cursor pagination")
 ) -> Dict[str, Any]:
     """
     Get places with optional filters for city and type.
     """
     result = None
-    if city and type:
+    if cursor is not None and sort is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor cannot be combined with sort"
+        )
+    if sort is not None and sort != "distance":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sort must be 'distance'"
+        )
+    if sort == "distance":
+        if lat is None or lon is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="lat and lon are required to sort by distance"
+            )
+        result = place_service.get_places_by_distance(
+            session=session, lat=lat, lon=lon, city=city, type=type, page=page, limit=limit
+        )
+    elif cursor is not None:
+        result = place_service.get_places_by_cursor(
+            session=session, cursor=cursor, city=city, type=type, limit=limit
+        )
+    elif city and type:
         result = place_service.get_places_by_city_and_type(session=session, city=city, type=type, page=page, limit=limit)
     elif city:
         result = place_service.get_places_by_city(session=session, city=city, page=page, limit=limit)
@@ -34,6 +62,30 @@ def read_places(
     
     return result
 
+@router.get("/nearby", response_model=PaginatedResponse[PlacePublic])
+def read_nearby_places(
+    *,
+    session: SessionDep,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the search center"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the search center"),
+    radius: float = Query(2, gt=0, le=50, description="Search radius in kilometers"),
+    type: str = Query(None, description="Filter by place type (RESTAURANT, HOTEL, ATTRACTION)"),
+    page: int = Query(1, ge=1, description="Page number"),
+    limit: int = Query(10, ge=1, le=100, description="Number of items per page")
+) -> Dict[str, Any]:
+    """
+    Get places within a radius of a point, nearest first.
+    """
+    return place_service.get_nearby_places(
+        session=session,
+        lat=lat,
+        lon=lon,
+        radius_km=radius,
+        type=type,
+        page=page,
+        limit=limit
+    )
+
 @router.get("/search", response_model=PaginatedResponse[PlacePublic])
 def search_places_by_type(
     session: SessionDep,
@@ -53,6 +105,18 @@ def search_places_by_type(
         limit=limit
     )
     
+@router.get("/travel-matrix", response_model=TravelMatrixPublic)
+def read_travel_matrix(
+    *,
+    session: SessionDep,
+    place_ids: List[int] = Query(..., min_length=1, max_length=100, description="Places to measure between"),
+    mode: str = Query(None, description="Travel mode (walking, motorbike, car)")
+) -> TravelMatrixPublic:
+    """
+    Get distances and estimated travel times between every pair of the given places.
+    """
+    return travel_matrix.get_matrix(session=session, place_ids=place_ids, mode=mode)
+
 @router.get("/{place_id}", response_model=PlaceResponse)
 def read_place(
     *,
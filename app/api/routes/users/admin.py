@@ -1,6 +1,6 @@
 # app/api/routes/user/admin.py
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends
 from uuid import UUID
 from typing import Any
 
@@ -23,11 +23,11 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
     return user_service.get_users(session=session, skip=skip, limit=limit)
 
 @router.post("/", response_model=UserResponse)
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+async def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     """
     Create new user by admin.
     """
-    return user_service.create_user(session=session, user_in=user_in)
+    return await user_service.create_user(session=session, user_in=user_in)
 
 @router.patch("/{user_id}", response_model=UserResponse)
 def update_user(*, session: SessionDep, user_id: UUID, user_in: UserUpdate) -> Any:
@@ -44,12 +44,13 @@ def read_user_by_id_admin(user_id: UUID, session: SessionDep) -> Any:
     return user_service.get_user_by_id(session=session, user_id=user_id)
 
 @router.delete("/{user_id}", response_model=Message)
-def delete_user(session: SessionDep, current_user: CurrentUser, user_id: UUID) -> Message:
+def delete_user(session: SessionDep, current_user: CurrentUser, user_id: UUID, background_tasks: BackgroundTasks) -> Message:
     """
     Delete user by admin.
     """
     return user_service.delete_user_admin(
         session=session,
         current_user=current_user,
-        user_id=user_id
+        user_id=user_id,
+        background_tasks=background_tasks
     )
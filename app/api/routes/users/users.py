@@ -1,6 +1,6 @@
 # app/api/routes/user/users.py
 
-from fastapi import APIRouter, Body, Depends, logger, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, logger, UploadFile, File
 from app.api.deps import CurrentUser, SessionDep
 from app.models import ImageUploadPublic, ImageUploadResponse, Message, ChangePassword
 from app.services.users.user_service import user_service
@@ -36,7 +36,7 @@ def update_user_me(
 
 
 @router.patch("/me/password", response_model=Message)
-def change_password_me(
+async def change_password_me(
     *,
     session: SessionDep,
     password_in: ChangePassword,
@@ -45,7 +45,7 @@ def change_password_me(
     """
     Change current user's password.
     """
-    return auth_service.change_password(
+    return await auth_service.change_password(
         session=session,
         current_user=current_user,
         data=password_in
@@ -56,14 +56,16 @@ def change_password_me(
 def delete_user_me(
     *,
     session: SessionDep,
-    current_user: CurrentUser
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks
 ) -> Message:
     """
     Delete current user account.
     """
     return user_service.delete_user_me(
         session=session,
-        current_user=current_user
+        current_user=current_user,
+        background_tasks=background_tasks
     )
 
 
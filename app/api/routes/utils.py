@@ -2,10 +2,19 @@ from fastapi import APIRouter, Body, Depends, Query, status
 from fastapi.responses import JSONResponse
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core.db import get_pool_stats
+from app.core.hashing import password_hasher
+from app.core.principal_cache import principal_cache
+from app.core.security import token_cache
+from app.crud.fcm.crud_notification_outbox import crud_notification_outbox
 from app.models import Message
+from app.services.email.mail_queue import mail_queue
+from app.services.fcm.notification_dispatcher import notification_dispatcher
+from app.services.places.place_service import place_cache
+from app.services.itineraries.itinerary_service import document_cache
+from app.core.firebase import get_firebase_app
 # from app.utils import generate_test_email, send_email
-import firebase_admin
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -49,13 +58,60 @@ async def health_check() -> bool:
     return True
 
 
+@router.get("/cache-stats/", dependencies=[Depends(get_current_active_superuser)])
+def cache_stats() -> dict:
+    """
+    Hit/miss counters of the in-process caches of this worker.
+    """
+    return {"caches": [place_cache.stats(), document_cache.stats(), principal_cache.stats(), token_cache.stats()]}
+
+
+@router.get("/db-pool-stats/", dependencies=[Depends(get_current_active_superuser)])
+def db_pool_stats() -> dict:
+    """
+    Database connection pool usage of this worker.
+    """
+    return get_pool_stats()
+
+
+@router.get("/password-hash-stats/", dependencies=[Depends(get_current_active_superuser)])
+def password_hash_stats() -> dict:
+    """
+    Load on the password hashing pool of this worker.
+    """
+    return password_hasher.stats()
+
+
+@router.get("/mail-queue-stats/", dependencies=[Depends(get_current_active_superuser)])
+def mail_queue_stats() -> dict:
+    """
+    Backlog and delivery counters of the mail workers of this worker.
+    """
+    return mail_queue.stats()
+
+
+@router.get("/notification-outbox-stats/", dependencies=[Depends(get_current_active_superuser)])
+def notification_outbox_stats(session: SessionDep) -> dict:
+    """
+    Backlog of the notification outbox, and the dispatcher counters of this worker.
+    """
+    return {
+        "backlog": crud_notification_outbox.get_backlog_stats(session),
+        "dispatcher": notification_dispatcher.stats(),
+    }
+
+
 @router.get("/firebase-health/")
 async def firebase_health_check() -> dict:
     """
     Kiểm tra Firebase Admin SDK đã được khởi tạo thành công chưa.
     """
-    is_initialized = bool(firebase_admin._apps)
-    return {"firebase_initialized": is_initialized}
+    # The app is created on first use, so initialize it here if nothing has yet
+    try:
+        get_firebase_app()
+    except Exception as e:
+        return {"firebase_initialized": False, "error": str(e)}
+    return {"firebase_initialized": True}
 
 
 @router.post("/test-fcm/")
@@ -75,7 +131,7 @@ async def test_send_fcm_notification(
             ),
             token=token
         )
-        response = messaging.send(message)
+        response = messaging.send(message, app=get_firebase_app())
         return {"success": True, "response": response}
     except Exception as e:
         return {"success": False, "error": str(e)}
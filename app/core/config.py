@@ -44,7 +44,59 @@ class Settings(BaseSettings):
 
     # Database settings
     DB_ECHO: bool = False  
-    
+    # queue: keep a pool of connections to Postgres
+    # null: open a connection per checkout, for an external pooler in session mode
+    # pgbouncer: keep a pool, without server-side prepared statements so it is safe
+    # behind PgBouncer in transaction mode
+    DB_POOL_MODE: Literal["queue", "null", "pgbouncer"] = "queue"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Per-request SQL counting, Server-Timing header and N+1 warnings
+    SQL_INSTRUMENTATION_ENABLED: bool = False
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
+
+    # Auth, decoded tokens and the users behind them are cached per worker;
+    # writes to a user invalidate the local entry, the TTL bounds the other workers
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+
+    # Google sign-in, ID tokens are verified locally against Google's keys and must be
+    # issued to one of these OAuth client ids; access tokens still go to the userinfo endpoint
+    GOOGLE_CLIENT_IDS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+
+    # Accounts with more itineraries than this are deactivated on delete and purged in the background
+    USER_DELETE_SYNC_MAX_ITINERARIES: int = 50
+    USER_PURGE_BATCH_SIZE: int = 100
+
+    # Password hashing, bcrypt runs in worker processes (0 hashes in the request thread).
+    # Changing BCRYPT_ROUNDS rehashes stored passwords as users log in
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+
+    # Places
+    SPATIAL_INDEX_TTL_SECONDS: int = 300
+    PLACE_CACHE_MAX_SIZE: int = 5000
+    PLACE_CACHE_TTL_SECONDS: int = 600
+
+    # Travel estimates: straight-line distance times TRAVEL_ROUTE_FACTOR at the mode's
+    # average speed, plus the mode's fixed minutes (parking, waiting for a ride)
+    TRAVEL_SPEEDS_KMH: dict[str, float] = {"walking": 4.5, "motorbike": 25.0, "car": 20.0}
+    TRAVEL_OVERHEAD_MINUTES: dict[str, int] = {"walking": 0, "motorbike": 10, "car": 10}
+    TRAVEL_DEFAULT_MODE: str = "motorbike"
+    TRAVEL_ROUTE_FACTOR: float = 1.3
+
+    # Serialized itineraries keyed by (itinerary_id, version). Edits bump the version,
+    # the TTL bounds how long changes to places and user profiles take to show
+    ITINERARY_DOCUMENT_CACHE_MAX_SIZE: int = 2000
+    ITINERARY_DOCUMENT_CACHE_TTL_SECONDS: int = 300
+
     BACKEND_CORS_ORIGINS: Annotated[
         list[AnyUrl] | str, BeforeValidator(parse_cors)
     ] = []
@@ -92,6 +144,12 @@ class Settings(BaseSettings):
         return self
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    # Background mail workers, each keeps one SMTP connection open while busy
+    MAIL_WORKERS: int = 2
+    MAIL_QUEUE_MAX_SIZE: int = 1000
+    MAIL_MAX_RETRIES: int = 3
+    MAIL_RETRY_BASE_SECONDS: float = 2.0
+    MAIL_SMTP_IDLE_SECONDS: float = 30.0
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -131,5 +189,20 @@ class Settings(BaseSettings):
     CLOUDINARY_API_SECRET: str
     PRIVATE_KEY_FIREBASE: str
     PRIVATE_KEY_FIREBASE_ID: str
+    # Push notification delivery
+    FCM_DELIVERY_WORKERS: int = 4
+    FCM_MAX_RETRIES: int = 3
+    FCM_RETRY_BASE_SECONDS: float = 1.0
+    # Notification outbox, drained by a thread in each app worker unless a
+    # separate dispatcher process is run (python -m app.services.fcm.notification_dispatcher)
+    NOTIFICATION_DISPATCHER_IN_APP: bool = True
+    NOTIFICATION_OUTBOX_BATCH_SIZE: int = 100
+    NOTIFICATION_OUTBOX_POLL_SECONDS: float = 1.0
+    NOTIFICATION_OUTBOX_LEASE_SECONDS: int = 120
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_OUTBOX_RETRY_BASE_SECONDS: float = 30.0
+    # Sent and failed messages older than this are deleted, checked every PURGE_SECONDS
+    NOTIFICATION_OUTBOX_RETENTION_DAYS: int = 7
+    NOTIFICATION_OUTBOX_PURGE_SECONDS: float = 3600.0
 
 settings = Settings()  # type: ignore
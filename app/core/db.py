@@ -1,4 +1,9 @@
-from sqlalchemy.pool import NullPool
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.pool import NullPool, QueuePool
 from sqlmodel import Session, create_engine, select
 import logging
 
@@ -9,12 +14,77 @@ from app.repository.request.user_request import UserCreate
 
 logger = logging.getLogger(__name__)
 
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._wait_lock:
+                self.wait_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def _engine_options() -> Dict[str, Any]:
+    if settings.DB_POOL_MODE == "null":
+        return {"poolclass": NullPool}
+
+    options: Dict[str, Any] = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_POOL_MODE == "pgbouncer":
+        # Prepared statements do not survive PgBouncer handing the server
+        # connection to another client between transactions
+        options["connect_args"] = {"prepare_threshold": None}
+    return options
+
+
 engine = create_engine(
     str(settings.SQLALCHEMY_DATABASE_URI),
     echo=settings.DB_ECHO,
-    poolclass=NullPool,
+    **_engine_options(),
 )
 
+# A forked worker must not reuse the parent's connections, drop them without closing
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection pool usage of this worker process"""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"mode": settings.DB_POOL_MODE, "pool": pool.status()}
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._wait_lock:
+            wait_count, wait_total, wait_max = pool.wait_count, pool.wait_total, pool.wait_max
+        stats.update(
+            size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=pool.overflow(),
+            checkouts=wait_count,
+            wait_avg_ms=wait_total / wait_count * 1000 if wait_count else 0.0,
+            wait_max_ms=wait_max * 1000,
+        )
+    return stats
+
 def init_db(session: Session) -> None:
     # Check if superuser exists
     user = session.exec(
@@ -0,0 +1,59 @@
+import os
+import threading
+from typing import Any, Optional
+
+from app.core.config import settings
+
+_lock = threading.Lock()
+_app: Optional[Any] = None
+_app_pid: Optional[int] = None
+
+
+def _credentials_dict() -> dict:
+    return {
+        "type": "service_account",
+        "project_id": "trip-wise-fca39",
+        "private_key_id": settings.PRIVATE_KEY_FIREBASE_ID,
+        "private_key": settings.PRIVATE_KEY_FIREBASE.replace('\\n', '\n'),
+        "client_email": "firebase-adminsdk-fbsvc@trip-wise-fca39.iam.gserviceaccount.com",
+        "client_id": "113382632026197703412",
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+        "client_x509_cert_url": "https://www.googleapis.com/robot/v1/metadata/x509/firebase-adminsdk-fbsvc%40trip-wise-fca39.iam.gserviceaccount.com",
+        "universe_domain": "googleapis.com"
+    }
+
+
+def get_firebase_app():
+    """Get the Firebase app of this process, initializing it on first use.
+
+    The app holds HTTP sessions that must not be shared across a fork, so a
+    forked worker (gunicorn --preload) initializes its own app under a name
+    tied to its pid instead of reusing the parent's.
+    """
+    global _app, _app_pid
+    pid = os.getpid()
+    if _app is not None and _app_pid == pid:
+        return _app
+    with _lock:
+        if _app is None or _app_pid != pid:
+            import firebase_admin
+            from firebase_admin import credentials
+
+            _app = firebase_admin.initialize_app(
+                credentials.Certificate(_credentials_dict()), name=f"tripwise-{pid}"
+            )
+            _app_pid = pid
+    return _app
+
+
+def _reset_after_fork() -> None:
+    global _lock, _app, _app_pid
+    # The lock may have been held by another thread at fork time
+    _lock = threading.Lock()
+    _app = None
+    _app_pid = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
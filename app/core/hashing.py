@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _crypt_context(rounds: int) -> CryptContext:
+    # Hashes with any other cost are reported as needing an update
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _crypt_context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a pool of worker processes.
+
+    The async methods await the pool, so auth endpoints hold neither a
+    threadpool thread nor the event loop while bcrypt runs; the sync ones are
+    left for scripts and other sync callers. At most max_pending hashes can
+    be in flight, beyond that requests fail fast with 503 as back-pressure.
+    With workers set to 0 the hash runs in the calling thread (the threadpool
+    for the async methods), under the same bound.
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._executor = None
+        self.pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, forking a process that runs threads is not safe
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        return self._executor
+
+    def _acquire(self) -> Optional[ProcessPoolExecutor]:
+        """Take a pending slot, returns the pool to run on (None to run in the caller's thread)"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please try again"
+                )
+            self.pending += 1
+            return self._get_executor() if self.workers > 0 else None
+
+    def _release(self, start: float) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += time.perf_counter() - start
+
+    def _run(self, func: Callable, *args: Any):
+        executor = self._acquire()
+        start = time.perf_counter()
+        try:
+            if executor is None:
+                return func(*args)
+            future: Future = executor.submit(func, *args)
+            return future.result()
+        finally:
+            self._release(start)
+
+    async def _run_async(self, func: Callable, *args: Any):
+        executor = self._acquire()
+        start = time.perf_counter()
+        try:
+            if executor is None:
+                return await run_in_threadpool(func, *args)
+            return await asyncio.wrap_future(executor.submit(func, *args))
+        finally:
+            self._release(start)
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self.verify_and_update(password, hashed_password)[0]
+
+    def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify the password, returns a new hash as well when the stored one uses other settings"""
+        return self._run(_verify_and_update, password, hashed_password, self.rounds)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(_hash, password, self.rounds)
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        return (await self.verify_and_update_async(password, hashed_password))[0]
+
+    async def verify_and_update_async(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run_async(_verify_and_update, password, hashed_password, self.rounds)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": self.total_seconds / self.completed * 1000 if self.completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS
+)
@@ -0,0 +1,27 @@
+import os
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+_client_pid: Optional[int] = None
+
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared client for outbound calls, so connections and TLS sessions are reused.
+    Created on first use in each process."""
+    global _client, _client_pid
+    if _client is None or _client.is_closed or _client_pid != os.getpid():
+        _client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS)
+        _client_pid = os.getpid()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None and _client_pid == os.getpid():
+        await _client.aclose()
+    _client = None
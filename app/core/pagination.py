@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, status
+
+from app.models import PaginationMetadata
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last returned row into an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], *types: type) -> Optional[List[Any]]:
+    """Decode a cursor into a sort key of the given types, None for the first page"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("Cursor does not match this list")
+        return [
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value_type, value in zip(types, payload)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def cursor_pagination(limit: int, cursor: Optional[str], next_cursor: Optional[str]) -> PaginationMetadata:
+    """Pagination metadata for cursor mode, which skips the total count"""
+    return PaginationMetadata(
+        limit=limit,
+        has_prev=bool(cursor),
+        has_next=next_cursor is not None,
+        next_cursor=next_cursor
+    )
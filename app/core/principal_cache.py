@@ -0,0 +1,69 @@
+import copy
+import uuid
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SASession, make_transient_to_detached, object_session
+from sqlmodel import Session
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models import Users
+
+# Column values of recently authenticated users, keyed by user_id
+principal_cache: LRUCache[Dict[str, Any]] = LRUCache(
+    "principals",
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+
+def get_principal(session: Session, user_id: uuid.UUID) -> Optional[Users]:
+    """Get the user behind a token, from the cache when possible.
+
+    A cache hit is attached to the session as an already loaded row, so the
+    caller can read, update and delete it like the result of session.get().
+    """
+    row = principal_cache.get(user_id)
+    if row is None:
+        user = session.get(Users, user_id)
+        if user is not None:
+            principal_cache.set(user_id, {column.key: getattr(user, column.key) for column in Users.__table__.columns})
+        return user
+
+    # Fresh copy per request, the cached values are shared
+    user = Users(**copy.deepcopy(row))
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
+
+
+def invalidate_principal(*user_ids: uuid.UUID) -> None:
+    principal_cache.invalidate(*user_ids)
+
+
+def invalidate_principal_on_commit(session: Session, user_id: uuid.UUID) -> None:
+    """For bulk statements, which do not fire the mapper events below"""
+    invalidate_principal(user_id)
+    session.info.setdefault("changed_principals", set()).add(user_id)
+
+
+@event.listens_for(Users, "after_update")
+@event.listens_for(Users, "after_delete")
+def _user_changed(mapper, connection, target: Users) -> None:
+    invalidate_principal(target.user_id)
+    # Invalidate again on commit, another request may cache the old row before then
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_principals", set()).add(target.user_id)
+
+
+@event.listens_for(SASession, "after_commit")
+def _invalidate_committed(session: SASession) -> None:
+    changed = session.info.pop("changed_principals", None)
+    if changed:
+        invalidate_principal(*changed)
+
+
+@event.listens_for(SASession, "after_rollback")
+def _discard_rolled_back(session: SASession) -> None:
+    session.info.pop("changed_principals", None)
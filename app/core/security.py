@@ -1,18 +1,24 @@
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 from fastapi import HTTPException,status
 import jwt
-from passlib.context import CryptContext
 
+from app.core.cache import LRUCache
 from app.core.config import settings
+from app.core.hashing import password_hasher
 from app.repository.response.login_response import TokenPayload
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 ALGORITHM = "HS256"
 
+token_cache: LRUCache[TokenPayload] = LRUCache(
+    "tokens",
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
 
 def create_token(subject: str | Any, expires_delta: timedelta, token_type: str = "access") -> str:
     expire = datetime.now(timezone.utc) + expires_delta
@@ -37,6 +43,16 @@ def create_refresh_token(subject: str | Any) -> str:
         expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
         token_type="refresh"
     )
+def decode_token(token: str) -> TokenPayload:
+    """Decode and validate a token, memoized until it expires. Raises jwt.PyJWTError"""
+    payload = token_cache.get(token)
+    if payload is not None and (payload.exp is None or payload.exp > time.time()):
+        return payload
+    # Expired tokens are decoded again so jwt raises the usual error
+    payload = TokenPayload(**jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM]))
+    token_cache.set(token, payload)
+    return payload
+
 def verify_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
@@ -52,8 +68,24 @@ def verify_token(token: str) -> TokenPayload:
             detail="Could not validate token"
         )
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return password_hasher.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify_async(plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await password_hasher.verify_and_update_async(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash_async(password)
@@ -1,33 +1,11 @@
-import firebase_admin
-from firebase_admin import credentials, messaging
 import os
+import uuid
 from typing import List, Dict, Any, Optional
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update
 from app.models import FCMTokens, Users
 from app.core.config import settings  # Assuming settings is imported from app.core.config
 
 class CRUDFcm:
-    def __init__(self):
-        if not firebase_admin._apps:
-            private_key = settings.PRIVATE_KEY_FIREBASE.replace('\\n', '\n')
-            
-            cred_dict = {
-                "type": "service_account",
-                "project_id": "trip-wise-fca39",
-                "private_key_id": settings.PRIVATE_KEY_FIREBASE_ID,
-                "private_key": private_key,
-                "client_email": "firebase-adminsdk-fbsvc@trip-wise-fca39.iam.gserviceaccount.com",
-                "client_id": "113382632026197703412",
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                "client_x509_cert_url": "https://www.googleapis.com/robot/v1/metadata/x509/firebase-adminsdk-fbsvc%40trip-wise-fca39.iam.gserviceaccount.com",
-                "universe_domain": "googleapis.com"
-            }
-            
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
-
     def get_active_tokens(self, session: Session, user_id: str) -> List[FCMTokens]:
         """Get all active FCM tokens for a user"""
         return session.exec(
@@ -36,6 +14,20 @@ class CRUDFcm:
             .where(FCMTokens.is_active == True)
         ).all()
 
+    def get_active_tokens_for_users(self, session: Session, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, List[str]]:
+        """Get the active FCM token strings of several users in one query"""
+        tokens: Dict[uuid.UUID, List[str]] = {user_id: [] for user_id in user_ids}
+        if not user_ids:
+            return tokens
+        rows = session.exec(
+            select(FCMTokens.user_id, FCMTokens.fcm_token)
+            .where(FCMTokens.user_id.in_(user_ids))
+            .where(FCMTokens.is_active == True)
+        ).all()
+        for user_id, fcm_token in rows:
+            tokens[user_id].append(fcm_token)
+        return tokens
+
     def create_or_update_token(self, session: Session, user_id: str, fcm_token: str, device: str) -> FCMTokens:
         """Create new FCM token or update existing one for a user"""
         # Kiểm tra xem token đã tồn tại chưa
@@ -51,8 +43,7 @@ class CRUDFcm:
             existing_token.is_active = True
             existing_token.device = device
             session.add(existing_token)
-            session.commit()
-            session.refresh(existing_token)
+            session.flush()
             return existing_token
         else:
             # Tạo token mới
@@ -63,8 +54,7 @@ class CRUDFcm:
                 is_active=True
             )
             session.add(db_obj)
-            session.commit()
-            session.refresh(db_obj)
+            session.flush()
             return db_obj
 
     def create_token(self, session: Session, user_id: str, fcm_token: str, device: str) -> FCMTokens:
@@ -77,8 +67,7 @@ class CRUDFcm:
         if db_obj:
             db_obj.is_active = is_active
             session.add(db_obj)
-            session.commit()
-            session.refresh(db_obj)
+            session.flush()
         return db_obj
 
     def deactivate_token_by_token(self, session: Session, user_id: str, fcm_token: str) -> Optional[FCMTokens]:
@@ -93,8 +82,7 @@ class CRUDFcm:
         if token_obj:
             token_obj.is_active = False
             session.add(token_obj)
-            session.commit()
-            session.refresh(token_obj)
+            session.flush()
         return token_obj
 
     def deactivate_all_user_tokens(self, session: Session, user_id: str) -> List[FCMTokens]:
@@ -109,7 +97,7 @@ class CRUDFcm:
             session.add(token)
             updated_tokens.append(token)
         
-        session.commit()
+        session.flush()
         return updated_tokens
 
     def activate_token_by_token(self, session: Session, user_id: str, fcm_token: str) -> Optional[FCMTokens]:
@@ -124,8 +112,7 @@ class CRUDFcm:
         if token_obj:
             token_obj.is_active = True
             session.add(token_obj)
-            session.commit()
-            session.refresh(token_obj)
+            session.flush()
         return token_obj
 
     def delete_token(self, session: Session, token_id: int) -> None:
@@ -133,7 +120,7 @@ class CRUDFcm:
         db_obj = session.get(FCMTokens, token_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
 
     def delete_token_by_token(self, session: Session, user_id: str, fcm_token: str) -> bool:
         """Delete FCM token by token string"""
@@ -146,46 +133,22 @@ class CRUDFcm:
         
         if token_obj:
             session.delete(token_obj)
-            session.commit()
+            session.flush()
             return True
         return False
 
-    def send_notification(
-        self,
-        *,
-        tokens: str | List[str],
-        title: str,
-        body: str,
-        data: dict = None
-    ) -> dict:
-        """
-        Gửi thông báo đến một hoặc nhiều token FCM
-        """
-        # Chuyển đổi token đơn lẻ thành list
-        if isinstance(tokens, str):
-            tokens = [tokens]
-
-        message = messaging.MulticastMessage(
-            tokens=tokens,
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-            ),
-            data=data,
+    def deactivate_tokens(self, session: Session, fcm_tokens: List[str]) -> int:
+        """Deactivate the given token strings for every user in one statement"""
+        if not fcm_tokens:
+            return 0
+        result = session.exec(
+            update(FCMTokens)
+            .where(FCMTokens.fcm_token.in_(fcm_tokens))
+            .where(FCMTokens.is_active == True)
+            .values(is_active=False)
         )
-
-        try:
-            response = messaging.send_multicast(message)
-            return {
-                "success": True,
-                "success_count": response.success_count,
-                "failure_count": response.failure_count,
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        session.flush()
+        return result.rowcount
 
 # Create and export an instance
 crud_fcm = CRUDFcm()
@@ -0,0 +1,127 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, delete, select, update
+
+from app.models import NotificationOutbox
+
+
+class CRUDNotificationOutbox:
+    def enqueue(
+        self,
+        session: Session,
+        user_id: uuid.UUID,
+        kind: str,
+        title: str,
+        body: str,
+        data: Optional[Dict[str, str]] = None
+    ) -> NotificationOutbox:
+        """Add a notification to the session without committing, so it is
+        written in the same transaction as the change that caused it"""
+        db_obj = NotificationOutbox(
+            user_id=user_id,
+            kind=kind,
+            title=title,
+            body=body,
+            data=data or {}
+        )
+        session.add(db_obj)
+        return db_obj
+
+    def claim_batch(self, session: Session, limit: int, lease_seconds: float) -> List[NotificationOutbox]:
+        """Lease up to limit due messages to the caller.
+
+        Rows locked by another dispatcher are skipped. A claimed message becomes
+        due again when the lease runs out, so a crashed dispatcher only delays it.
+        The caller commits to take the lease.
+        """
+        now = datetime.now()
+        due = (
+            select(NotificationOutbox.outbox_id)
+            .where(NotificationOutbox.status == "pending")
+            .where(NotificationOutbox.available_at <= now)
+            .order_by(NotificationOutbox.available_at, NotificationOutbox.outbox_id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = session.exec(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.outbox_id.in_(due.scalar_subquery()))
+            .values(
+                available_at=now + timedelta(seconds=lease_seconds),
+                attempts=NotificationOutbox.attempts + 1
+            )
+            .returning(NotificationOutbox)
+        ).scalars().all()
+        # Keep the claimed rows loaded once the caller commits the lease, they are sent outside the session
+        for message in claimed:
+            session.expunge(message)
+        return sorted(claimed, key=lambda message: message.outbox_id)
+
+    def mark_sent(self, session: Session, outbox_ids: List[int]) -> None:
+        if not outbox_ids:
+            return
+        session.exec(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.outbox_id.in_(outbox_ids))
+            .values(status="sent", sent_at=datetime.now(), last_error=None)
+        )
+        session.flush()
+
+    def mark_retry(self, session: Session, outbox_id: int, error: str, delay_seconds: float) -> None:
+        session.exec(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.outbox_id == outbox_id)
+            .values(available_at=datetime.now() + timedelta(seconds=delay_seconds), last_error=error)
+        )
+        session.flush()
+
+    def mark_failed(self, session: Session, outbox_id: int, error: str) -> None:
+        session.exec(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.outbox_id == outbox_id)
+            .values(status="failed", last_error=error)
+        )
+        session.flush()
+
+    def delete_finished_batch(self, session: Session, older_than: datetime, batch_size: int) -> int:
+        """Delete up to batch_size sent or failed messages created before older_than, returns how many.
+        Pending messages are never deleted."""
+        batch = (
+            select(NotificationOutbox.outbox_id)
+            .where(NotificationOutbox.status.in_(("sent", "failed")))
+            .where(NotificationOutbox.created_at < older_than)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = session.exec(
+            delete(NotificationOutbox)
+            .where(NotificationOutbox.outbox_id.in_(batch.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        session.flush()
+        return result.rowcount
+
+    def get_backlog_stats(self, session: Session) -> Dict[str, Any]:
+        """Message counts by status and the age of the oldest pending message"""
+        counts = dict(session.exec(
+            select(NotificationOutbox.status, func.count())
+            .group_by(NotificationOutbox.status)
+        ).all())
+        oldest_pending = session.exec(
+            select(func.min(NotificationOutbox.created_at))
+            .where(NotificationOutbox.status == "pending")
+        ).one()
+        return {
+            "pending": counts.get("pending", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_age_seconds": (
+                (datetime.now() - oldest_pending).total_seconds() if oldest_pending else 0.0
+            ),
+        }
+
+
+crud_notification_outbox = CRUDNotificationOutbox()
@@ -1,5 +1,7 @@
-from sqlmodel import Session, select
-from app.models import FavoriteItineraries
+from typing import List, Optional, Set, Tuple
+from sqlmodel import Session, select, col
+from sqlalchemy import func
+from app.models import FavoriteItineraries, Itineraries
 
 class CRUDFavoriteItinerary:
     def add(self, session: Session, user_id, itinerary_id):
@@ -13,8 +15,7 @@ class CRUDFavoriteItinerary:
             return fav  # Đã có rồi
         fav = FavoriteItineraries(user_id=user_id, itinerary_id=itinerary_id)
         session.add(fav)
-        session.commit()
-        session.refresh(fav)
+        session.flush()
         return fav
 
     def remove(self, session: Session, user_id, itinerary_id):
@@ -26,7 +27,7 @@ class CRUDFavoriteItinerary:
         ).first()
         if fav:
             session.delete(fav)
-            session.commit()
+            session.flush()
         return fav
 
     def get_favorites(self, session: Session, user_id):
@@ -34,4 +35,36 @@ class CRUDFavoriteItinerary:
             select(FavoriteItineraries).where(FavoriteItineraries.user_id == user_id)
         ).all()
 
+    def get_favorited_ids(self, session: Session, user_id, itinerary_ids: List[int]) -> Set[int]:
+        """Get which of the itineraries the user has in favorites, in one query"""
+        if not itinerary_ids:
+            return set()
+        return set(session.exec(
+            select(FavoriteItineraries.itinerary_id).where(
+                FavoriteItineraries.user_id == user_id,
+                col(FavoriteItineraries.itinerary_id).in_(itinerary_ids)
+            )
+        ).all())
+
+    def get_favorite_itineraries(
+        self, session: Session, user_id, skip: int = 0, limit: int = 100, before_id: Optional[int] = None
+    ) -> List[Tuple[Itineraries, int]]:
+        """Get (itinerary, favorite_id) pairs, most recently favorited first.
+        When before_id is given, seek past that favorite_id instead of using the offset."""
+        statement = (
+            select(Itineraries, FavoriteItineraries.favorite_id)
+            .join(FavoriteItineraries, FavoriteItineraries.itinerary_id == Itineraries.itinerary_id)
+            .where(FavoriteItineraries.user_id == user_id)
+        )
+        if before_id is not None:
+            statement = statement.where(FavoriteItineraries.favorite_id < before_id)
+        else:
+            statement = statement.offset(skip)
+        return session.exec(statement.order_by(col(FavoriteItineraries.favorite_id).desc()).limit(limit)).all()
+
+    def get_count(self, session: Session, user_id) -> int:
+        return session.exec(
+            select(func.count()).select_from(FavoriteItineraries).where(FavoriteItineraries.user_id == user_id)
+        ).one()
+
 crud_favorite = CRUDFavoriteItinerary()
\ No newline at end of file
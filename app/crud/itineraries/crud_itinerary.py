@@ -1,36 +1,71 @@
-from typing import Optional, List, Dict, Any
-from sqlmodel import Session, select, col
+import uuid
+from typing import Optional, List, Dict, Any, Tuple
+from sqlmodel import Session, delete, select, col, update
 from app.models import (
     Itineraries, ItineraryCreate, ItineraryUpdate,
     ItineraryDays, ItineraryDayCreate, ItineraryDayUpdate,
     ItineraryActivities, ItineraryActivityCreate, ItineraryActivityUpdate,
-    Places
+    Places, ItineraryShares, FavoriteItineraries
 )
-from sqlalchemy import func
-from datetime import datetime
+from sqlalchemy import exists, func, literal, tuple_
+from sqlalchemy.orm import selectinload
+from datetime import datetime, time
 
 class CRUDItinerary:
     def get_by_id(self, session: Session, itinerary_id: int) -> Optional[Itineraries]:
         return session.get(Itineraries, itinerary_id)
     
-    def get_multi(self, session: Session, skip: int = 0, limit: int = 100) -> List[Itineraries]:
-        return session.exec(select(Itineraries).offset(skip).limit(limit)).all()
-    
-    def get_by_user_id(self, session: Session, user_id: str, skip: int = 0, limit: int = 100) -> List[Itineraries]:
+    def get_by_ids(self, session: Session, itinerary_ids: List[int]) -> Dict[int, Itineraries]:
+        """Get several itineraries in one query, keyed by itinerary_id"""
+        if not itinerary_ids:
+            return {}
+        itineraries = session.exec(
+            select(Itineraries).where(col(Itineraries.itinerary_id).in_(set(itinerary_ids)))
+        ).all()
+        return {itinerary.itinerary_id: itinerary for itinerary in itineraries}
+
+    def _page(self, statement, skip: int, limit: int, after: Optional[Tuple[datetime, int]]):
+        """Helper method to page newest first by offset, or by seeking past the
+        (created_at, itinerary_id) key in after when given"""
+        if after is not None:
+            statement = statement.where(tuple_(Itineraries.created_at, Itineraries.itinerary_id) < tuple_(*after))
+        else:
+            statement = statement.offset(skip)
+        return statement.order_by(
+            col(Itineraries.created_at).desc(), col(Itineraries.itinerary_id).desc()
+        ).limit(limit)
+
+    def get_multi(
+        self, session: Session, skip: int = 0, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Itineraries]:
+        return session.exec(self._page(select(Itineraries), skip, limit, after)).all()
+
+    def get_tree(self, session: Session, itinerary_id: int) -> Optional[Itineraries]:
+        """Get an itinerary with days, activities, owner and shares (with shared users)
+        eager loaded, one query per level."""
         return session.exec(
             select(Itineraries)
-            .where(Itineraries.user_id == user_id)
-            .order_by(col(Itineraries.created_at).desc())
-            .offset(skip)
-            .limit(limit)
+            .where(Itineraries.itinerary_id == itinerary_id)
+            .options(
+                selectinload(Itineraries.days).selectinload(ItineraryDays.activities),
+                selectinload(Itineraries.user),
+                selectinload(Itineraries.shares).selectinload(ItineraryShares.shared_with_user),
+            )
+            .execution_options(populate_existing=True)
+        ).first()
+    
+    def get_by_user_id(
+        self, session: Session, user_id: str, skip: int = 0, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Itineraries]:
+        return session.exec(
+            self._page(select(Itineraries).where(Itineraries.user_id == user_id), skip, limit, after)
         ).all()
     
-    def get_by_destination(self, session: Session, destination: str, skip: int = 0, limit: int = 100) -> List[Itineraries]:
+    def get_by_destination(
+        self, session: Session, destination: str, skip: int = 0, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Itineraries]:
         return session.exec(
-            select(Itineraries)
-            .where(Itineraries.destination_city == destination)
-            .offset(skip)
-            .limit(limit)
+            self._page(select(Itineraries).where(Itineraries.destination_city == destination), skip, limit, after)
         ).all()
     
     def create(self, session: Session, itinerary_create: ItineraryCreate, user_id: str) -> Itineraries:
@@ -47,24 +82,84 @@ class CRUDItinerary:
             hotel_id=itinerary_create.hotel_id
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
+    def get_by_idempotency_key(self, session: Session, user_id: str, idempotency_key: str) -> Optional[Itineraries]:
+        return session.exec(
+            select(Itineraries).where(
+                Itineraries.user_id == user_id,
+                Itineraries.idempotency_key == idempotency_key
+            )
+        ).first()
+
+    def create_tree(
+        self,
+        session: Session,
+        itinerary_create: ItineraryCreate,
+        user_id: uuid.UUID,
+        days: List[Tuple[ItineraryDayCreate, List[ItineraryActivityCreate]]],
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[Itineraries, List[ItineraryDays], Dict[int, List[ItineraryActivities]]]:
+        """Insert an itinerary with its days and activities, one batched INSERT per level.
+        Rows are flushed but not committed, the caller owns the transaction."""
+        db_itinerary = Itineraries(
+            **itinerary_create.model_dump(),
+            user_id=user_id,
+            idempotency_key=idempotency_key
+        )
+        session.add(db_itinerary)
+        session.flush()
+
+        db_days = [
+            ItineraryDays(itinerary_id=db_itinerary.itinerary_id, day_number=day_create.day_number, date=day_create.date)
+            for day_create, _ in days
+        ]
+        session.add_all(db_days)
+        session.flush()
+
+        activities_by_day: Dict[int, List[ItineraryActivities]] = {}
+        for db_day, (_, activity_creates) in zip(db_days, days):
+            activities_by_day[db_day.day_id] = [
+                ItineraryActivities(day_id=db_day.day_id, place_id=activity.place_id, start_time=activity.start_time)
+                for activity in activity_creates
+            ]
+        session.add_all([activity for activities in activities_by_day.values() for activity in activities])
+        session.flush()
+
+        return db_itinerary, db_days, activities_by_day
+    
     def update(self, session: Session, db_itinerary: Itineraries, itinerary_in: ItineraryUpdate) -> Itineraries:
         update_data = itinerary_in.model_dump(exclude_unset=True)
         db_itinerary.sqlmodel_update(update_data)
         db_itinerary.updated_at = datetime.now()
         session.add(db_itinerary)
-        session.commit()
-        session.refresh(db_itinerary)
+        session.flush()
         return db_itinerary
     
+    def bump_version(self, session: Session, itinerary_id: int) -> None:
+        """Mark the itinerary as changed, in SQL so concurrent edits each get their own version"""
+        session.exec(
+            update(Itineraries)
+            .where(Itineraries.itinerary_id == itinerary_id)
+            .values(version=Itineraries.version + 1)
+        )
+
+    def get_version(self, session: Session, itinerary_id: int, user_id: Optional[uuid.UUID] = None) -> Optional[Tuple[int, bool]]:
+        """Get the itinerary's version and whether user_id has it in favorites, None if it does not exist"""
+        is_favorite = exists().where(
+            FavoriteItineraries.itinerary_id == Itineraries.itinerary_id,
+            FavoriteItineraries.user_id == user_id
+        ) if user_id else literal(False)
+        row = session.exec(
+            select(Itineraries.version, is_favorite).where(Itineraries.itinerary_id == itinerary_id)
+        ).first()
+        return (row[0], bool(row[1])) if row else None
+
     def delete(self, session: Session, itinerary_id: int) -> None:
-        db_obj = session.get(Itineraries, itinerary_id)
-        if db_obj:
-            session.delete(db_obj)
-            session.commit()
+        """Delete the itinerary, the database cascades to its days, activities, shares and favorites"""
+        session.exec(delete(Itineraries).where(Itineraries.itinerary_id == itinerary_id))
+        session.flush()
 
     def get_days(self, session: Session, itinerary_id: int) -> List[ItineraryDays]:
         return session.exec(
@@ -83,8 +178,7 @@ class CRUDItinerary:
             date=day_create.date,
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def update_day(self, session: Session, db_day: ItineraryDays, day_in: ItineraryDayUpdate) -> ItineraryDays:
@@ -92,15 +186,12 @@ class CRUDItinerary:
         db_day.sqlmodel_update(update_data)
         db_day.updated_at = datetime.now()
         session.add(db_day)
-        session.commit()
-        session.refresh(db_day)
+        session.flush()
         return db_day
     
     def delete_day(self, session: Session, day_id: int) -> None:
-        db_obj = session.get(ItineraryDays, day_id)
-        if db_obj:
-            session.delete(db_obj)
-            session.commit()
+        session.exec(delete(ItineraryDays).where(ItineraryDays.day_id == day_id))
+        session.flush()
     
     def get_activities(self, session: Session, day_id: int) -> List[ItineraryActivities]:
         return session.exec(
@@ -109,6 +200,42 @@ class CRUDItinerary:
             .order_by(ItineraryActivities.start_time)
         ).all()
     
+    def get_activities_by_day_ids(self, session: Session, day_ids: List[int]) -> Dict[int, List[ItineraryActivities]]:
+        """Get the activities of several days in one query, keyed by day_id"""
+        activities_by_day: Dict[int, List[ItineraryActivities]] = {day_id: [] for day_id in day_ids}
+        if not day_ids:
+            return activities_by_day
+        activities = session.exec(
+            select(ItineraryActivities)
+            .where(col(ItineraryActivities.day_id).in_(day_ids))
+            .order_by(ItineraryActivities.day_id, ItineraryActivities.start_time)
+        ).all()
+        for activity in activities:
+            activities_by_day[activity.day_id].append(activity)
+        return activities_by_day
+    
+    def set_start_times(self, session: Session, updates: List[Tuple[ItineraryActivities, time]]) -> None:
+        """Move activities to new start times, only the changed ones are written"""
+        now = datetime.now()
+        for db_activity, start_time in updates:
+            if db_activity.start_time != start_time:
+                db_activity.start_time = start_time
+                db_activity.updated_at = now
+                session.add(db_activity)
+        session.flush()
+    
+    def is_start_time_taken(
+        self, session: Session, day_id: int, start_time: time, exclude_activity_id: Optional[int] = None
+    ) -> bool:
+        """Whether another activity of the day starts at start_time, answered by the (day_id, start_time) index"""
+        statement = select(ItineraryActivities.itinerary_activity_id).where(
+            ItineraryActivities.day_id == day_id,
+            ItineraryActivities.start_time == start_time
+        )
+        if exclude_activity_id is not None:
+            statement = statement.where(ItineraryActivities.itinerary_activity_id != exclude_activity_id)
+        return session.exec(select(exists(statement))).one()
+    
     def get_activity_by_id(self, session: Session, activity_id: int) -> Optional[ItineraryActivities]:
         return session.get(ItineraryActivities, activity_id)
     
@@ -119,8 +246,7 @@ class CRUDItinerary:
             start_time=activity_create.start_time
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def update_activity(self, session: Session, db_activity: ItineraryActivities, activity_in: ItineraryActivityUpdate) -> ItineraryActivities:
@@ -128,15 +254,32 @@ class CRUDItinerary:
         db_activity.sqlmodel_update(update_data)
         db_activity.updated_at = datetime.now()
         session.add(db_activity)
-        session.commit()
-        session.refresh(db_activity)
+        session.flush()
         return db_activity
     
     def delete_activity(self, session: Session, activity_id: int) -> None:
-        db_obj = session.get(ItineraryActivities, activity_id)
-        if db_obj:
-            session.delete(db_obj)
-            session.commit()
+        session.exec(delete(ItineraryActivities).where(ItineraryActivities.itinerary_activity_id == activity_id))
+        session.flush()
+    def delete_batch_by_user_id(self, session: Session, user_id: uuid.UUID, batch_size: int) -> int:
+        """Delete up to batch_size itineraries of a user, returns how many.
+        Rows another purge of the same user has locked are skipped, not waited for."""
+        batch = (
+            select(Itineraries.itinerary_id)
+            .where(Itineraries.user_id == user_id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = session.exec(
+            delete(Itineraries)
+            .where(Itineraries.itinerary_id.in_(batch.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        session.flush()
+        return result.rowcount
+
+    def has_any_by_user_id(self, session: Session, user_id: uuid.UUID) -> bool:
+        return session.exec(select(exists().where(Itineraries.user_id == user_id))).one()
+
     def get_count_by_user_id(self, session: Session, user_id: str) -> int:
         result = session.exec(
             select(func.count()).select_from(Itineraries).where(Itineraries.user_id == user_id)
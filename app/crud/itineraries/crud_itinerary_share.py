@@ -1,5 +1,5 @@
-from typing import Optional, List
-from sqlmodel import Session, select
+from typing import Dict, Optional, List
+from sqlmodel import Session, col, select
 from sqlalchemy import func
 import uuid
 from app.models import ItineraryShares
@@ -8,23 +8,49 @@ class CRUDItineraryShare:
     def get_by_id(self, session: Session, share_id: int) -> Optional[ItineraryShares]:
         return session.get(ItineraryShares, share_id)
     
-    def get_multi(self, session: Session, skip: int = 0, limit: int = 100) -> List[ItineraryShares]:
-        return session.exec(select(ItineraryShares).offset(skip).limit(limit)).all()
+    def _page(self, statement, skip: int, limit: int, after_id: Optional[int]):
+        """Helper method to page by offset, or by seeking past after_id when given"""
+        if after_id is not None:
+            statement = statement.where(ItineraryShares.share_id > after_id)
+        else:
+            statement = statement.offset(skip)
+        return statement.order_by(ItineraryShares.share_id).limit(limit)
+
+    def get_multi(self, session: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[ItineraryShares]:
+        return session.exec(self._page(select(ItineraryShares), skip, limit, after_id)).all()
     
-    def get_by_itinerary_id(self, session: Session, itinerary_id: int, skip: int = 0, limit: int = 100) -> List[ItineraryShares]:
+    def get_by_itinerary_id(
+        self, session: Session, itinerary_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[ItineraryShares]:
         return session.exec(
-            select(ItineraryShares)
-            .where(ItineraryShares.itinerary_id == itinerary_id)
-            .offset(skip)
-            .limit(limit)
+            self._page(
+                select(ItineraryShares).where(ItineraryShares.itinerary_id == itinerary_id),
+                skip, limit, after_id
+            )
         ).all()
     
-    def get_by_shared_user_id(self, session: Session, shared_with_user_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[ItineraryShares]:
-        return session.exec(
+    def get_by_itinerary_ids(self, session: Session, itinerary_ids: List[int]) -> Dict[int, List[ItineraryShares]]:
+        """Get the shares of several itineraries in one query, keyed by itinerary_id"""
+        shares_by_itinerary: Dict[int, List[ItineraryShares]] = {itinerary_id: [] for itinerary_id in itinerary_ids}
+        if not itinerary_ids:
+            return shares_by_itinerary
+        shares = session.exec(
             select(ItineraryShares)
-            .where(ItineraryShares.shared_with_user_id == shared_with_user_id)
-            .offset(skip)
-            .limit(limit)
+            .where(col(ItineraryShares.itinerary_id).in_(itinerary_ids))
+            .order_by(ItineraryShares.share_id)
+        ).all()
+        for share in shares:
+            shares_by_itinerary[share.itinerary_id].append(share)
+        return shares_by_itinerary
+
+    def get_by_shared_user_id(
+        self, session: Session, shared_with_user_id: uuid.UUID, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[ItineraryShares]:
+        return session.exec(
+            self._page(
+                select(ItineraryShares).where(ItineraryShares.shared_with_user_id == shared_with_user_id),
+                skip, limit, after_id
+            )
         ).all()
     
     def get_by_itinerary_and_user(self, session: Session, itinerary_id: int, shared_with_user_id: uuid.UUID) -> Optional[ItineraryShares]:
@@ -36,12 +62,14 @@ class CRUDItineraryShare:
             )
         ).first()
     
-    def get_by_permission(self, session: Session, permission: str, skip: int = 0, limit: int = 100) -> List[ItineraryShares]:
+    def get_by_permission(
+        self, session: Session, permission: str, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[ItineraryShares]:
         return session.exec(
-            select(ItineraryShares)
-            .where(ItineraryShares.permission == permission)
-            .offset(skip)
-            .limit(limit)
+            self._page(
+                select(ItineraryShares).where(ItineraryShares.permission == permission),
+                skip, limit, after_id
+            )
         ).all()
     
     def create(self, session: Session, itinerary_id: int, shared_with_user_id: uuid.UUID, permission: str = "view") -> ItineraryShares:
@@ -51,28 +79,26 @@ class CRUDItineraryShare:
             permission=permission
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def update_permission(self, session: Session, db_share: ItineraryShares, permission: str) -> ItineraryShares:
         db_share.permission = permission
         session.add(db_share)
-        session.commit()
-        session.refresh(db_share)
+        session.flush()
         return db_share
     
     def delete(self, session: Session, share_id: int) -> None:
         db_obj = session.get(ItineraryShares, share_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     
     def delete_by_itinerary_and_user(self, session: Session, itinerary_id: int, shared_with_user_id: uuid.UUID) -> None:
         db_obj = self.get_by_itinerary_and_user(session, itinerary_id, shared_with_user_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     
     def get_count(self, session: Session) -> int:
         result = session.exec(select(func.count()).select_from(ItineraryShares))
@@ -1,6 +1,6 @@
 from typing import Optional, List
 from sqlalchemy import func
-from sqlmodel import Session, select
+from sqlmodel import Session, select, col
 from app.models import AttractionDetails, AttractionDetailCreate, AttractionDetailUpdate
 
 class CRUDAttraction:
@@ -9,6 +9,15 @@ class CRUDAttraction:
     
     def get_by_place_id(self, session: Session, place_id: int) -> Optional[AttractionDetails]:
         return session.exec(select(AttractionDetails).where(AttractionDetails.place_id == place_id)).first()
+
+    def get_by_place_ids(self, session: Session, place_ids: List[int]) -> List[AttractionDetails]:
+        if not place_ids:
+            return []
+        return session.exec(
+            select(AttractionDetails)
+            .where(col(AttractionDetails.place_id).in_(place_ids))
+            .order_by(AttractionDetails.attraction_detail_id)
+        ).all()
     
     def get_multi(self, session: Session, skip: int = 0, limit: int = 100) -> List[AttractionDetails]:
         return session.exec(select(AttractionDetails).offset(skip).limit(limit)).all()
@@ -20,29 +29,27 @@ class CRUDAttraction:
             subtype=attraction_detail_create.subtype
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def update(self, session: Session, db_attraction_detail: AttractionDetails, attraction_detail_in: AttractionDetailUpdate) -> AttractionDetails:
         update_data = attraction_detail_in.model_dump(exclude_unset=True)
         db_attraction_detail.sqlmodel_update(update_data)
         session.add(db_attraction_detail)
-        session.commit()
-        session.refresh(db_attraction_detail)
+        session.flush()
         return db_attraction_detail
     
     def delete(self, session: Session, attraction_detail_id: int) -> None:
         db_obj = session.get(AttractionDetails, attraction_detail_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     
     def delete_by_place_id(self, session: Session, place_id: int) -> None:
         db_obj = session.exec(select(AttractionDetails).where(AttractionDetails.place_id == place_id)).first()
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     def get_count(self, session: Session) -> int:
         result = session.exec(select(func.count()).select_from(AttractionDetails))
         return result.one()
@@ -1,6 +1,6 @@
 from typing import Optional, List
 from sqlalchemy import func
-from sqlmodel import Session, select
+from sqlmodel import Session, select, col
 from app.models import HotelDetails, HotelDetailCreate, HotelDetailUpdate
 
 class CRUDHotel:
@@ -9,6 +9,15 @@ class CRUDHotel:
     
     def get_by_place_id(self, session: Session, place_id: int) -> Optional[HotelDetails]:
         return session.exec(select(HotelDetails).where(HotelDetails.place_id == place_id)).first()
+
+    def get_by_place_ids(self, session: Session, place_ids: List[int]) -> List[HotelDetails]:
+        if not place_ids:
+            return []
+        return session.exec(
+            select(HotelDetails)
+            .where(col(HotelDetails.place_id).in_(place_ids))
+            .order_by(HotelDetails.hotel_detail_id)
+        ).all()
     
     def get_multi(self, session: Session, skip: int = 0, limit: int = 100) -> List[HotelDetails]:
         return session.exec(select(HotelDetails).offset(skip).limit(limit)).all()
@@ -18,29 +27,27 @@ class CRUDHotel:
             place_id=place_id,
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def update(self, session: Session, db_hotel_detail: HotelDetails, hotel_detail_in: HotelDetailUpdate) -> HotelDetails:
         update_data = hotel_detail_in.model_dump(exclude_unset=True)
         db_hotel_detail.sqlmodel_update(update_data)
         session.add(db_hotel_detail)
-        session.commit()
-        session.refresh(db_hotel_detail)
+        session.flush()
         return db_hotel_detail
     
     def delete(self, session: Session, hotel_detail_id: int) -> None:
         db_obj = session.get(HotelDetails, hotel_detail_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     
     def delete_by_place_id(self, session: Session, place_id: int) -> None:
         db_obj = session.exec(select(HotelDetails).where(HotelDetails.place_id == place_id)).first()
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     def get_count(self, session: Session) -> int:
         result = session.exec(select(func.count()).select_from(HotelDetails))
         return result.one()
@@ -1,24 +1,94 @@
-from typing import Optional, List
-from sqlmodel import Session, select
-from sqlalchemy import func
+import unicodedata
+from typing import Optional, List, Tuple
+from sqlmodel import Session, select, col
+from sqlalchemy import func, literal, or_
 from app.models import Places, PlaceCreate, PlaceUpdate, PlacePhotos, PlacePhotoCreate
 
+
+def fold_search_text(text: str) -> str:
+    """Lower-case and strip Vietnamese diacritics, matching place_search_document() in the DB"""
+    decomposed = unicodedata.normalize("NFD", text.strip().lower())
+    folded = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return folded.replace("đ", "d")
+
+
+def _search_document():
+    # Must match the expression of the ix_places_search_* indexes
+    return func.place_search_document(Places.name, Places.local_name, Places.address)
+
+
+def _search_filter(query: str, type: str):
+    folded = fold_search_text(query)
+    escaped = folded.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    document = _search_document()
+    return (
+        (Places.type == type.upper()) &
+        or_(
+            # Substring match, served by the trigram index
+            document.like(f"%{escaped}%"),
+            # Typo tolerant match on the closest word sequence
+            literal(folded).op("<%")(document),
+            # All words present in any order
+            func.to_tsvector("simple", document).op("@@")(func.plainto_tsquery("simple", folded)),
+        )
+    )
+
+
 class CRUDPlace:
     def get_by_id(self, session: Session, place_id: int) -> Optional[Places]:
         return session.get(Places, place_id)
+
+    def get_by_ids(self, session: Session, place_ids: List[int]) -> List[Places]:
+        if not place_ids:
+            return []
+        return session.exec(select(Places).where(col(Places.place_id).in_(place_ids))).all()
     
-    def get_multi(self, session: Session, skip: int = 0, limit: int = 100) -> List[Places]:
-        return session.exec(select(Places).offset(skip).limit(limit)).all()
+    def get_coordinates(self, session: Session) -> List[Tuple[int, float, float, str, str]]:
+        return session.exec(
+            select(Places.place_id, Places.latitude, Places.longitude, Places.type, Places.city)
+        ).all()
+
+    def get_planner_candidates(
+        self, session: Session, city: str, types: List[str], max_price_level: Optional[int] = None
+    ) -> Tuple[List[int], List[str], List[float], List[float], List[Optional[float]], List[Optional[int]]]:
+        """Get the place_id, type, latitude, longitude, rating and number_review columns
+        of the places in a city, as one list per column (cheaper than a row per place).
+        With max_price_level, places whose price_range starts above that many "$" are left out."""
+        columns = (Places.place_id, Places.type, Places.latitude, Places.longitude, Places.rating, Places.number_review)
+        statement = select(*(func.array_agg(column) for column in columns)).where(
+            Places.city == city, col(Places.type).in_(types)
+        )
+        if max_price_level is not None:
+            statement = statement.where(or_(
+                col(Places.price_range).is_(None),
+                col(Places.price_range).notlike("$" * (max_price_level + 1) + "%")
+            ))
+        row = session.exec(statement).one()
+        # array_agg over no rows is NULL
+        return tuple(values or [] for values in row)
+
+    def _page(self, statement, skip: int, limit: int, after_id: Optional[int]):
+        """Helper method to page by offset, or by seeking past after_id when given"""
+        if after_id is not None:
+            statement = statement.where(Places.place_id > after_id)
+        else:
+            statement = statement.offset(skip)
+        return statement.order_by(Places.place_id).limit(limit)
+
+    def get_multi(self, session: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Places]:
+        return session.exec(self._page(select(Places), skip, limit, after_id)).all()
     
-    def get_by_city(self, session: Session, city: str, skip: int = 0, limit: int = 100) -> List[Places]:
-        return session.exec(select(Places).where(Places.city == city).offset(skip).limit(limit)).all()
+    def get_by_city(self, session: Session, city: str, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Places]:
+        return session.exec(self._page(select(Places).where(Places.city == city), skip, limit, after_id)).all()
     
-    def get_by_type(self, session: Session, type: str, skip: int = 0, limit: int = 100) -> List[Places]:
-        return session.exec(select(Places).where(Places.type == type).offset(skip).limit(limit)).all()
+    def get_by_type(self, session: Session, type: str, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Places]:
+        return session.exec(self._page(select(Places).where(Places.type == type), skip, limit, after_id)).all()
     
-    def get_by_city_and_type(self, session: Session, city: str, type: str, skip: int = 0, limit: int = 100) -> List[Places]:
+    def get_by_city_and_type(
+        self, session: Session, city: str, type: str, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Places]:
         return session.exec(
-            select(Places).where(Places.city == city, Places.type == type).offset(skip).limit(limit)
+            self._page(select(Places).where(Places.city == city, Places.type == type), skip, limit, after_id)
         ).all()
     
     def create(self, session: Session, place_create: PlaceCreate) -> Places:
@@ -40,23 +110,21 @@ class CRUDPlace:
             image=place_create.image,
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def update(self, session: Session, db_place: Places, place_in: PlaceUpdate) -> Places:
         update_data = place_in.model_dump(exclude_unset=True)
         db_place.sqlmodel_update(update_data)
         session.add(db_place)
-        session.commit()
-        session.refresh(db_place)
+        session.flush()
         return db_place
     
     def delete(self, session: Session, place_id: int) -> None:
         db_obj = session.get(Places, place_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     
     def add_photo(self, session: Session, place_id: int, photo_create: PlacePhotoCreate) -> PlacePhotos:
         db_obj = PlacePhotos(
@@ -65,18 +133,47 @@ class CRUDPlace:
             is_primary=photo_create.is_primary
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def get_photos(self, session: Session, place_id: int) -> List[PlacePhotos]:
         return session.exec(select(PlacePhotos).where(PlacePhotos.place_id == place_id)).all()
+
+    def get_photos_by_place_ids(self, session: Session, place_ids: List[int]) -> List[PlacePhotos]:
+        if not place_ids:
+            return []
+        return session.exec(
+            select(PlacePhotos)
+            .where(col(PlacePhotos.place_id).in_(place_ids))
+            .order_by(PlacePhotos.photo_id)
+        ).all()
     
     def delete_photo(self, session: Session, photo_id: int) -> None:
         db_obj = session.get(PlacePhotos, photo_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
+    def search(self, session: Session, query: str, type: str, skip: int = 0, limit: int = 100) -> List[Places]:
+        folded = fold_search_text(query)
+        document = _search_document()
+        name_document = func.lower(func.immutable_unaccent(Places.name))
+        rank = (
+            2 * func.word_similarity(folded, name_document) +
+            func.word_similarity(folded, document) +
+            func.ts_rank_cd(func.to_tsvector("simple", document), func.plainto_tsquery("simple", folded))
+        )
+        return session.exec(
+            select(Places)
+            .where(_search_filter(query, type))
+            .order_by(rank.desc(), col(Places.number_review).desc().nulls_last(), Places.place_id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+
+    def get_search_count(self, session: Session, query: str, type: str) -> int:
+        result = session.exec(select(func.count()).select_from(Places).where(_search_filter(query, type)))
+        return result.one()
+
     def get_count(self, session: Session) -> int:
             result = session.exec(select(func.count()).select_from(Places))
             return result.one()
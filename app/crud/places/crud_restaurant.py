@@ -1,6 +1,6 @@
 from typing import Optional, List
 from sqlalchemy import func
-from sqlmodel import Session, select
+from sqlmodel import Session, select, col
 from app.models import RestaurantDetails, RestaurantDetailCreate, RestaurantDetailUpdate
 
 class CRUDRestaurant:
@@ -9,6 +9,15 @@ class CRUDRestaurant:
     
     def get_by_place_id(self, session: Session, place_id: int) -> Optional[RestaurantDetails]:
         return session.exec(select(RestaurantDetails).where(RestaurantDetails.place_id == place_id)).first()
+
+    def get_by_place_ids(self, session: Session, place_ids: List[int]) -> List[RestaurantDetails]:
+        if not place_ids:
+            return []
+        return session.exec(
+            select(RestaurantDetails)
+            .where(col(RestaurantDetails.place_id).in_(place_ids))
+            .order_by(RestaurantDetails.restaurant_detail_id)
+        ).all()
     
     def get_multi(self, session: Session, skip: int = 0, limit: int = 100) -> List[RestaurantDetails]:
         return session.exec(select(RestaurantDetails).offset(skip).limit(limit)).all()
@@ -19,29 +28,27 @@ class CRUDRestaurant:
             meal_types=restaurant_detail_create.meal_types
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
     
     def update(self, session: Session, db_restaurant_detail: RestaurantDetails, restaurant_detail_in: RestaurantDetailUpdate) -> RestaurantDetails:
         update_data = restaurant_detail_in.model_dump(exclude_unset=True)
         db_restaurant_detail.sqlmodel_update(update_data)
         session.add(db_restaurant_detail)
-        session.commit()
-        session.refresh(db_restaurant_detail)
+        session.flush()
         return db_restaurant_detail
     
     def delete(self, session: Session, restaurant_detail_id: int) -> None:
         db_obj = session.get(RestaurantDetails, restaurant_detail_id)
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     
     def delete_by_place_id(self, session: Session, place_id: int) -> None:
         db_obj = session.exec(select(RestaurantDetails).where(RestaurantDetails.place_id == place_id)).first()
         if db_obj:
             session.delete(db_obj)
-            session.commit()
+            session.flush()
     def get_count(self, session: Session) -> int:
         result = session.exec(select(func.count()).select_from(RestaurantDetails))
         return result.one()
@@ -1,28 +1,49 @@
+import uuid
 from datetime import datetime
-from typing import Optional
-from sqlmodel import Session, select
-from app.core.security import get_password_hash, verify_password
+from typing import Dict, List, Optional
+from sqlmodel import Session, col, delete, select
+from app.core.principal_cache import invalidate_principal_on_commit
+from app.core.security import get_password_hash, verify_and_update_password_async
 from app.models import Users
 from app.repository.request.user_request import UserCreate, UserUpdate
 class CRUDUser:
     def get_by_email(self, session: Session, email: str) -> Optional[Users]:
         return session.exec(select(Users).where(Users.email == email)).first()
     
+    def get_by_ids(self, session: Session, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Users]:
+        """Get several users in one query, keyed by user_id"""
+        if not user_ids:
+            return {}
+        users = session.exec(select(Users).where(col(Users.user_id).in_(set(user_ids)))).all()
+        return {user.user_id: user for user in users}
+
     def get_by_username(self, session: Session, username: str) -> Users | None:
         statement = select(Users).where(Users.username == username)
         return session.exec(statement).first()
     
-    def create(self, session: Session, user_create: UserCreate) -> Users:
+    def get_available_username(self, session: Session, base_username: str) -> str:
+        """Get base_username, or base_username followed by the lowest free number"""
+        taken = set(session.exec(
+            select(Users.username).where(Users.username.startswith(base_username, autoescape=True))
+        ).all())
+        if base_username not in taken:
+            return base_username
+        counter = 1
+        while f"{base_username}{counter}" in taken:
+            counter += 1
+        return f"{base_username}{counter}"
+
+    def create(self, session: Session, user_create: UserCreate, hashed_password: Optional[str] = None) -> Users:
+        """Create the user, async callers pass hashed_password so bcrypt does not run in their thread"""
         db_obj = Users(
             username=user_create.username,
             email=user_create.email,
             full_name=user_create.full_name,
-            password=get_password_hash(user_create.password),
+            password=hashed_password or get_password_hash(user_create.password),
             role=user_create.role,
         )
         session.add(db_obj)
-        session.commit()
-        session.refresh(db_obj)
+        session.flush()
         return db_obj
 
     def update(self, session: Session, db_user: Users, user_in: UserUpdate) -> Users:
@@ -30,30 +51,51 @@ class CRUDUser:
         db_user.updated_at = datetime.now()
         db_user.sqlmodel_update(update_data)
         session.add(db_user)
-        session.commit()
-        session.refresh(db_user)
+        session.flush()
         return db_user
 
-    def authenticate(self, session: Session, email: str, password: str) -> Optional[Users]:
+    async def authenticate(self, session: Session, email: str, password: str) -> Optional[Users]:
         user = self.get_by_email(session=session, email=email)
         if not user:
             return None
-        if not verify_password(password, user.password):
+        verified, new_hash = await verify_and_update_password_async(password, user.password)
+        if not verified:
             return None
         if not user.is_active:
             return None
+        if new_hash:
+            # Stored hash was made with other bcrypt settings, upgrade it now that we know the password
+            user.password = new_hash
+            session.add(user)
+            session.flush()
         return user
 
     def update_password(self, session: Session, user: Users, new_password: str) -> Users:
         user.password = get_password_hash(new_password)
         session.add(user)
-        session.commit()
-        session.refresh(user)
+        session.flush()
         return user
 
     def get_by_id(self, session: Session, user_id) -> Optional[Users]:
         return session.get(Users, user_id)
 
+    def delete(self, session: Session, user_id: uuid.UUID) -> None:
+        """Delete the user, the database cascades to everything the user owns"""
+        session.exec(delete(Users).where(Users.user_id == user_id))
+        session.flush()
+        invalidate_principal_on_commit(session, user_id)
+
+    def mark_deleted(self, session: Session, user: Users) -> Users:
+        """Deactivate the user until the background purge removes the account"""
+        user.is_active = False
+        user.deleted_at = datetime.now()
+        session.add(user)
+        session.flush()
+        return user
+
+    def get_pending_purge_ids(self, session: Session) -> List[uuid.UUID]:
+        return session.exec(select(Users.user_id).where(Users.deleted_at.is_not(None))).all()
+
 # Create and export an instance
 crud_user = CRUDUser()
 
@@ -0,0 +1,82 @@
+"""Report where the cold start import time of the app goes.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+summarizes the output:
+
+    python -m app.importtime_report --top 20 --budget-ms 1500
+
+Exits with status 1 when the total is over the budget, so it can run in CI.
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def run_importtime(target: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {target} failed:\n{result.stderr}")
+    return result.stderr
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append(ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def summarize(records: List[ImportRecord], target: str, top: int) -> Dict:
+    total_us = next((record.cumulative_us for record in records if record.module == target), 0)
+    by_package: Dict[str, int] = defaultdict(int)
+    for record in records:
+        by_package[record.module.split(".")[0]] += record.self_us
+    return {
+        "total_ms": total_us / 1000,
+        "modules": sorted(records, key=lambda record: record.cumulative_us, reverse=True)[:top],
+        "packages": sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top],
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="app.main", help="module to import")
+    parser.add_argument("--top", type=int, default=20, help="number of rows to show")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when the total is over this")
+    args = parser.parse_args(argv)
+
+    summary = summarize(parse_importtime(run_importtime(args.target)), args.target, args.top)
+
+    print("Slowest imports (cumulative, includes dependencies):")
+    for record in summary["modules"]:
+        print(f"  {record.cumulative_us / 1000:9.1f} ms  {'  ' * record.depth}{record.module}")
+    print("\nTime by top-level package (self time):")
+    for package, self_us in summary["packages"]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+    print(f"\nimport {args.target}: {summary['total_ms']:.1f} ms")
+
+    if args.budget_ms is not None and summary["total_ms"] > args.budget_ms:
+        print(f"Over the budget of {args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
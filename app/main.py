@@ -1,3 +1,6 @@
+import threading
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
@@ -5,6 +8,14 @@ from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import engine
+from app.core.hashing import password_hasher
+from app.core.http_client import close_http_client
+from app.core.sql_instrumentation import SQLInstrumentationMiddleware, install_sql_instrumentation
+from app.services.email.mail_queue import mail_queue
+from app.services.fcm.fcm_delivery import fcm_delivery
+from app.services.fcm.notification_dispatcher import notification_dispatcher
+from app.services.users.user_service import user_service
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,12 +25,27 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.NOTIFICATION_DISPATCHER_IN_APP:
+        notification_dispatcher.start()
+    threading.Thread(target=user_service.resume_pending_purges, name="user-purge", daemon=True).start()
+    yield
+    notification_dispatcher.stop()
+    # Let queued push notifications finish before the worker exits
+    fcm_delivery.shutdown(wait=True)
+    password_hasher.shutdown()
+    mail_queue.shutdown()
+    await close_http_client()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API for TripWise",
     version="1.0.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
     openapi_tags=[
         {
             "name": "auth",
@@ -42,6 +68,10 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    install_sql_instrumentation(engine)
+    app.add_middleware(SQLInstrumentationMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ from datetime import datetime, date as date_type, time as time_type
 from typing import List, Dict, Any, Literal, Optional, TypeVar, Generic
 from pydantic import EmailStr, Field as PydanticField, BaseModel
 from sqlmodel import Field, Relationship, SQLModel
-from sqlalchemy import Column, UniqueConstraint, Text, Time, Date
+from sqlalchemy import Column, Index, UniqueConstraint, Text, Time, Date
 from sqlalchemy.dialects.postgresql import JSONB, UUID, ARRAY
 
 
@@ -13,11 +13,13 @@ T = TypeVar('T')
 class ResponseWrapper(SQLModel, Generic[T]):
     data: T
 class PaginationMetadata(SQLModel):
-    page: int
+    # page and total_pages are None in cursor mode, which follows next_cursor instead
+    page: int | None = None
     limit: int
-    total_pages: int
+    total_pages: int | None = None
     has_prev: bool
     has_next: bool
+    next_cursor: str | None = None
 
 class PaginatedResponse(SQLModel, Generic[T]):
     data: List[T]
@@ -41,20 +43,25 @@ class Users(SQLModel, table=True):
     is_active: bool = Field(default=True)  # Added is_active field
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
+    # Set when the account is deleted but its data is still being purged in the background
+    deleted_at: datetime | None = Field(default=None)
 
-    # Relationships
-    itineraries: List["Itineraries"] = Relationship(back_populates="user")
+    # Relationships, child rows are removed by ON DELETE CASCADE instead of being loaded
+    itineraries: List["Itineraries"] = Relationship(
+        back_populates="user",
+        sa_relationship_kwargs={"passive_deletes": True}
+    )
     shared_itineraries: List["ItineraryShares"] = Relationship(
         back_populates="shared_with_user",
-        sa_relationship_kwargs={"cascade": "all, delete"}
+        sa_relationship_kwargs={"cascade": "all, delete", "passive_deletes": True}
     )
     fcm_tokens: List["FCMTokens"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"cascade": "all, delete"}
+        sa_relationship_kwargs={"cascade": "all, delete", "passive_deletes": True}
     )
     favorite_itineraries: List["FavoriteItineraries"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"cascade": "all, delete"}
+        sa_relationship_kwargs={"cascade": "all, delete", "passive_deletes": True}
     )
 
 class Places(SQLModel, table=True):
@@ -64,9 +71,9 @@ class Places(SQLModel, table=True):
     name: str = Field(max_length=100)
     local_name: str | None = Field(max_length=100, default=None)
     description: str | None = Field(sa_column=Column(Text), default=None)
-    type: str = Field(max_length=50)  # RESTAURANT, HOTEL, ATTRACTION
+    type: str = Field(max_length=50, index=True)  # RESTAURANT, HOTEL, ATTRACTION
     address: str | None = Field(sa_column=Column(Text), default=None)
-    city: str = Field(max_length=100)
+    city: str = Field(max_length=100, index=True)
     latitude: float = Field()
     longitude: float = Field()
     rating: float | None = Field(default=None)
@@ -94,7 +101,7 @@ class PlacePhotos(SQLModel, table=True):
     __tablename__ = "place_photos"
 
     photo_id: int = Field(default=None, primary_key=True)
-    place_id: int = Field(foreign_key="places.place_id")
+    place_id: int = Field(foreign_key="places.place_id", index=True)
     photo_url: str = Field(max_length=255)
     is_primary: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.now)
@@ -105,6 +112,7 @@ class PlacePhotos(SQLModel, table=True):
 
 class RestaurantDetails(SQLModel, table=True):
     __tablename__ = "restaurant_details"
+    __table_args__ = (UniqueConstraint("place_id", name="uq_restaurant_details_place_id"),)
 
     restaurant_detail_id: int = Field(default=None, primary_key=True)
     place_id: int = Field(foreign_key="places.place_id")
@@ -118,6 +126,7 @@ class RestaurantDetails(SQLModel, table=True):
 
 class HotelDetails(SQLModel, table=True):
     __tablename__ = "hotel_details"
+    __table_args__ = (UniqueConstraint("place_id", name="uq_hotel_details_place_id"),)
 
     hotel_detail_id: int = Field(default=None, primary_key=True)
     place_id: int = Field(foreign_key="places.place_id")
@@ -130,6 +139,7 @@ class HotelDetails(SQLModel, table=True):
 
 class AttractionDetails(SQLModel, table=True):
     __tablename__ = "attraction_details"
+    __table_args__ = (UniqueConstraint("place_id", name="uq_attraction_details_place_id"),)
 
     attraction_detail_id: int = Field(default=None, primary_key=True)
     place_id: int = Field(foreign_key="places.place_id")
@@ -144,9 +154,13 @@ class AttractionDetails(SQLModel, table=True):
 
 class Itineraries(SQLModel, table=True):
     __tablename__ = "itineraries"
+    __table_args__ = (
+        Index("ix_itineraries_user_id_created_at", "user_id", "created_at", "itinerary_id"),
+        UniqueConstraint("user_id", "idempotency_key", name="uq_itineraries_user_idempotency_key"),
+    )
 
     itinerary_id: int = Field(default=None, primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="users.user_id")
+    user_id: uuid.UUID = Field(foreign_key="users.user_id", ondelete="CASCADE")
     title: str = Field(max_length=100)
     description: str | None = Field(sa_column=Column(Text), default=None)
     start_date: date_type = Field(sa_column=Column(Date))
@@ -158,26 +172,31 @@ class Itineraries(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     hotel_id: int | None = Field(foreign_key="places.place_id", default=None)
+    # Client supplied key of the request that created the itinerary, so retries are not duplicated
+    idempotency_key: str | None = Field(max_length=64, default=None)
+    # Bumped by every change to the itinerary, its days, activities or shares
+    version: int = Field(default=1)
 
 
     # Relationships
     user: Users = Relationship(back_populates="itineraries")
-    days: List["ItineraryDays"] = Relationship(back_populates="itinerary", sa_relationship_kwargs={"cascade": "all, delete"})   
+    days: List["ItineraryDays"] = Relationship(back_populates="itinerary", sa_relationship_kwargs={"cascade": "all, delete", "passive_deletes": True})   
     hotel: Places | None = Relationship(back_populates="itineraries")
     shares: List["ItineraryShares"] = Relationship(
         back_populates="itinerary", 
-        sa_relationship_kwargs={"cascade": "all, delete"}
+        sa_relationship_kwargs={"cascade": "all, delete", "passive_deletes": True}
     )
     favorite_by: List["FavoriteItineraries"] = Relationship(
         back_populates="itinerary",
-        sa_relationship_kwargs={"cascade": "all, delete"}
+        sa_relationship_kwargs={"cascade": "all, delete", "passive_deletes": True}
     )
 
 class ItineraryDays(SQLModel, table=True):
     __tablename__ = "itinerary_days"
+    __table_args__ = (Index("ix_itinerary_days_itinerary_id_day_number", "itinerary_id", "day_number"),)
 
     day_id: int = Field(default=None, primary_key=True)
-    itinerary_id: int = Field(foreign_key="itineraries.itinerary_id")
+    itinerary_id: int = Field(foreign_key="itineraries.itinerary_id", ondelete="CASCADE")
     day_number: int = Field()
     date: date_type = Field(sa_column=Column(Date))
     created_at: datetime = Field(default_factory=datetime.now)
@@ -187,15 +206,16 @@ class ItineraryDays(SQLModel, table=True):
     itinerary: Itineraries = Relationship(back_populates="days")
     activities: List["ItineraryActivities"] = Relationship(
         back_populates="day",
-        sa_relationship_kwargs={"cascade": "all, delete"}
+        sa_relationship_kwargs={"cascade": "all, delete", "passive_deletes": True}
     )
 
 class ItineraryActivities(SQLModel, table=True):
     __tablename__ = "itinerary_activities"
+    __table_args__ = (Index("ix_itinerary_activities_day_id_start_time", "day_id", "start_time"),)
 
     itinerary_activity_id: int = Field(default=None, primary_key=True)
-    day_id: int = Field(foreign_key="itinerary_days.day_id")
-    place_id: int = Field(foreign_key="places.place_id")
+    day_id: int = Field(foreign_key="itinerary_days.day_id", ondelete="CASCADE")
+    place_id: int = Field(foreign_key="places.place_id", index=True)
     start_time: time_type = Field(sa_column=Column(Time))
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -206,10 +226,13 @@ class ItineraryActivities(SQLModel, table=True):
 
 class ItineraryShares(SQLModel, table=True):
     __tablename__ = "itinerary_shares"
+    __table_args__ = (
+        UniqueConstraint("itinerary_id", "shared_with_user_id", name="uq_itinerary_shares_itinerary_user"),
+    )
 
     share_id: int = Field(default=None, primary_key=True)
-    itinerary_id: int = Field(foreign_key="itineraries.itinerary_id")
-    shared_with_user_id: uuid.UUID = Field(foreign_key="users.user_id")
+    itinerary_id: int = Field(foreign_key="itineraries.itinerary_id", ondelete="CASCADE")
+    shared_with_user_id: uuid.UUID = Field(foreign_key="users.user_id", index=True, ondelete="CASCADE")
     permission: str = Field(max_length=10, default="view")  # view, edit
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -219,9 +242,10 @@ class ItineraryShares(SQLModel, table=True):
     shared_with_user: Users = Relationship(back_populates="shared_itineraries")
 class FCMTokens(SQLModel, table=True):
     __tablename__ = "fcm_tokens"
+    __table_args__ = (UniqueConstraint("user_id", "fcm_token", name="uq_fcm_tokens_user_token"),)
 
     token_id: int = Field(default=None, primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="users.user_id")
+    user_id: uuid.UUID = Field(foreign_key="users.user_id", ondelete="CASCADE")
     fcm_token: str = Field(max_length=255)
     device: str = Field(max_length=100)
     is_active: bool = Field(default=True)
@@ -232,15 +256,33 @@ class FCMTokens(SQLModel, table=True):
     user: Users = Relationship(back_populates="fcm_tokens")
 class FavoriteItineraries(SQLModel, table=True):
     __tablename__ = "favorite_itineraries"
+    __table_args__ = (UniqueConstraint("user_id", "itinerary_id", name="uq_favorite_itineraries_user_itinerary"),)
 
     favorite_id: int = Field(default=None, primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="users.user_id")
-    itinerary_id: int = Field(foreign_key="itineraries.itinerary_id")
+    user_id: uuid.UUID = Field(foreign_key="users.user_id", ondelete="CASCADE")
+    itinerary_id: int = Field(foreign_key="itineraries.itinerary_id", index=True, ondelete="CASCADE")
     created_at: datetime = Field(default_factory=datetime.now)
 
     # Relationships
     user: "Users" = Relationship(back_populates="favorite_itineraries")
     itinerary: "Itineraries" = Relationship(back_populates="favorite_by")
+class NotificationOutbox(SQLModel, table=True):
+    __tablename__ = "notification_outbox"
+    __table_args__ = (Index("ix_notification_outbox_status_available_at", "status", "available_at"),)
+
+    outbox_id: int = Field(default=None, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.user_id", ondelete="CASCADE")
+    kind: str = Field(max_length=50)
+    title: str = Field(max_length=255)
+    body: str = Field(sa_column=Column(Text))
+    data: Dict[str, str] = Field(default_factory=dict, sa_column=Column(JSONB))
+    status: str = Field(max_length=20, default="pending")  # pending, sent, failed
+    attempts: int = Field(default=0)
+    # Earliest time the message may be claimed, pushed forward while a dispatcher holds it
+    available_at: datetime = Field(default_factory=datetime.now)
+    last_error: str | None = Field(sa_column=Column(Text), default=None)
+    created_at: datetime = Field(default_factory=datetime.now)
+    sent_at: datetime | None = Field(default=None)
 # API Request/Response Models
 class PlaceBase(SQLModel):
     name: str
@@ -381,6 +423,7 @@ class PlacePublic(PlaceBase):
     restaurant_detail: RestaurantDetailPublic | None = None
     hotel_detail: HotelDetailPublic | None = None
     attraction_detail: AttractionDetailPublic | None = None
+    distance_km: float | None = None
 
 
 class PlaceResponse(ResponseWrapper[PlacePublic]):
@@ -448,12 +491,28 @@ class ItineraryActivityUpdate(SQLModel):
     start_time: Optional[time_type] = None
 
 
+class TravelLegPublic(SQLModel):
+    to_activity_id: int
+    mode: str
+    distance_km: float
+    duration_minutes: int
+
+
+class TravelMatrixPublic(SQLModel):
+    place_ids: List[int]
+    mode: str
+    distances_km: List[List[float]]
+    duration_minutes: List[List[int]]
+
+
 class ItineraryActivityPublic(ItineraryActivityBase):
     itinerary_activity_id: int
     day_id: int
     created_at: datetime
     updated_at: datetime
     place: PlacePublic
+    # Travel to the day's next activity, only filled when asked for
+    next_leg: TravelLegPublic | None = None
 
 
 class ItineraryActivityResponse(ResponseWrapper[ItineraryActivityPublic]):
@@ -472,6 +531,22 @@ class ItineraryDayResponse(ResponseWrapper[ItineraryDayPublic]):
     pass
 
 
+class ItineraryDayRoutePublic(SQLModel):
+    day_id: int
+    day_number: Optional[int] = None
+    distance_before_km: float
+    distance_after_km: float
+    activities: List[ItineraryActivityPublic]
+
+
+class ItineraryRoutePublic(SQLModel):
+    itinerary_id: int
+    dry_run: bool
+    distance_before_km: float
+    distance_after_km: float
+    days: List[ItineraryDayRoutePublic]
+
+
 class UserPublicMinimal(SQLModel):
     user_id: uuid.UUID
     username: str
@@ -500,6 +575,19 @@ class ItinerariesResponse(SQLModel):
     data: List[ItineraryPublic]
 
 
+class ItineraryGenerateRequest(SQLModel):
+    destination_city: str
+    start_date: date_type
+    end_date: date_type
+    title: str | None = None
+    budget: str | None = None
+    # Leave out places whose price_range starts above this many "$"
+    max_price_level: int | None = Field(default=None, ge=1, le=4)
+    preferred_types: List[str] = ["ATTRACTION", "RESTAURANT"]
+    activities_per_day: int = Field(default=4, ge=1, le=8)
+    hotel_id: int | None = None
+
+
 # Itinerary Share Models
 class ItineraryShareBase(SQLModel):
     itinerary_id: int
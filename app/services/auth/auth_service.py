@@ -4,15 +4,17 @@ from sqlmodel import Session
 
 from app.crud.users.crud_user import crud_user
 from app.core.config import settings
-from app.core.security import create_access_token, create_refresh_token, get_password_hash, verify_password, verify_token
+from app.core.security import (
+    create_access_token, create_refresh_token, get_password_hash_async, verify_password_async, verify_token
+)
 from app.models import Message, ChangePassword, NewPassword
 from app.repository.response.login_response import Token
 from app.services.fcm.fcm_service import fcm_service
 
 class AuthService:
     @staticmethod
-    def login_access_token(session: Session, email: str, password: str, fcm_token: str = None, device: str = None) -> Token:
-        user = crud_user.authenticate(session=session, email=email, password=password)
+    async def login_access_token(session: Session, email: str, password: str, fcm_token: str = None, device: str = None) -> Token:
+        user = await crud_user.authenticate(session=session, email=email, password=password)
         if not user:
             raise HTTPException(
                 status_code=400, 
@@ -21,18 +23,20 @@ class AuthService:
 
         if fcm_token and device:
             fcm_service.register_token_on_login(session, user.user_id, fcm_token, device)
+        # Saves the token above and a rehashed password, if authenticate made one
+        session.commit()
         access_token = create_access_token(user.user_id)
         refresh_token = create_refresh_token(user.user_id)
         return Token(access_token=access_token, refresh_token=refresh_token)
 
     @staticmethod
-    def change_password(
+    async def change_password(
         session: Session,
         current_user,
         data: ChangePassword
     ) -> Message:
         """Change password for logged in user"""
-        if not verify_password(data.old_password, current_user.password):
+        if not await verify_password_async(data.old_password, current_user.password):
             raise HTTPException(
                 status_code=400,
                 detail="Incorrect current password"
@@ -44,13 +48,13 @@ class AuthService:
                 detail="New password must be different from current password"
             )
 
-        current_user.password = get_password_hash(data.new_password)
+        current_user.password = await get_password_hash_async(data.new_password)
         session.add(current_user)
         session.commit()
         return Message(detail="Password changed successfully")
 
     @staticmethod
-    def reset_password_by_email(
+    async def reset_password_by_email(
         session: Session,
         body: NewPassword
     ) -> Message:
@@ -62,7 +66,7 @@ class AuthService:
                 detail="User not found"
             )
 
-        user.password = get_password_hash(body.new_password)
+        user.password = await get_password_hash_async(body.new_password)
         session.add(user)
         session.commit()
         return Message(detail="Password reset successfully")
@@ -75,6 +79,7 @@ class AuthService:
         else:
             # Deactivate all tokens if no specific token provided
             fcm_service.deactivate_all_user_tokens(session, user_id)
+        session.commit()
         
         return Message(detail="Logged out successfully")
 
@@ -82,6 +87,7 @@ class AuthService:
     def logout_from_all_devices(session: Session, user_id: str) -> Message:
         """Logout user from all devices by deactivating all FCM tokens"""
         fcm_service.deactivate_all_user_tokens(session, user_id)
+        session.commit()
         return Message(detail="Logged out from all devices successfully")
     
     @staticmethod
@@ -1,41 +1,81 @@
-import httpx
+import jwt
 from datetime import timedelta
 from fastapi import HTTPException, status
 from sqlmodel import Session
-from google.auth.transport import requests
-from google.oauth2 import id_token
 from typing import Optional
 
 from app.crud.users.crud_user import crud_user
 from app.core.config import settings
-from app.core.security import create_access_token, create_refresh_token
+from app.core.http_client import get_http_client
+from app.core.security import create_access_token, create_refresh_token, get_password_hash_async
 from app.models import Users
 from app.repository.request.user_request import UserCreate
 from app.models import GoogleUserInfo
 from app.repository.response.login_response import Token
+from app.services.auth.google.google_jwks import google_jwks
 from app.services.fcm.fcm_service import fcm_service
 
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+
 class GoogleAuthService:
+    @staticmethod
+    async def verify_id_token(token: str) -> GoogleUserInfo:
+        """Verify a Google ID token locally against Google's signing keys"""
+        if not settings.GOOGLE_CLIENT_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Google ID tokens are not accepted"
+            )
+        key = await google_jwks.get_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid Google token"
+            )
+        claims = jwt.decode(
+            token,
+            key.key,
+            algorithms=["RS256"],
+            audience=settings.GOOGLE_CLIENT_IDS,
+            issuer=GOOGLE_ISSUERS,
+            leeway=30
+        )
+        return GoogleUserInfo(
+            id=claims["sub"],
+            email=claims["email"],
+            verified_email=claims.get("email_verified", False),
+            name=claims.get("name") or claims["email"].split("@")[0],
+            given_name=claims.get("given_name"),
+            family_name=claims.get("family_name"),
+            picture=claims.get("picture"),
+            locale=claims.get("locale")
+        )
+
+    @staticmethod
+    async def verify_access_token(token: str) -> GoogleUserInfo:
+        """Get the user of a Google access token from the userinfo endpoint"""
+        response = await get_http_client().get(
+            GOOGLE_USERINFO_URL,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid Google token"
+            )
+        return GoogleUserInfo(**response.json())
+
     @staticmethod
     async def verify_google_token(token: str) -> GoogleUserInfo:
         """Verify Google ID token and get user info"""
         try:
-            # Method 1: Using Google's tokeninfo endpoint
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://www.googleapis.com/oauth2/v2/userinfo",
-                    headers={"Authorization": f"Bearer {token}"}
-                )
-                
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid Google token"
-                    )
-                
-                user_data = response.json()
-                return GoogleUserInfo(**user_data)
-                
+            # ID tokens are JWTs, access tokens are opaque
+            if token.count(".") == 2:
+                return await GoogleAuthService.verify_id_token(token)
+            return await GoogleAuthService.verify_access_token(token)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -84,14 +124,14 @@ class GoogleAuthService:
             )
             
             # Check if username already exists, if so, append numbers
-            base_username = user_create.username
-            counter = 1
-            while crud_user.get_by_username(session=session, username=user_create.username):
-                user_create.username = f"{base_username}{counter}"
-                counter += 1
+            user_create.username = crud_user.get_available_username(session=session, base_username=user_create.username)
             
             try:
-                user = crud_user.create(session=session, user_create=user_create)
+                user = crud_user.create(
+                    session=session,
+                    user_create=user_create,
+                    hashed_password=await get_password_hash_async(user_create.password)
+                )
             except Exception as e:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -101,6 +141,7 @@ class GoogleAuthService:
         # Xử lý FCM token khi login Google (tương tự như login thường)
         if fcm_token and device:
             fcm_service.register_token_on_login(session, user.user_id, fcm_token, device)
+        session.commit()
         
         # Create access token
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
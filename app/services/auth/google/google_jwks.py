@@ -0,0 +1,69 @@
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+DEFAULT_MAX_AGE_SECONDS = 3600
+# An unknown kid refetches the keys at most this often, so forged tokens cannot hammer Google
+MIN_REFRESH_SECONDS = 60
+
+
+class GoogleJWKSCache:
+    """Google's token signing keys, cached per process.
+
+    Keys are refetched once the Cache-Control max-age of the last response
+    runs out, or early when a token names a key that is not cached yet
+    (Google rotates keys ahead of using them).
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._static = False
+        self._lock: Optional[asyncio.Lock] = None
+
+    def use_static_keys(self, jwks: Dict[str, Any]) -> None:
+        """Serve a fixed JWKS document instead of fetching, for tests and local runs"""
+        self._keys = self._parse(jwks)
+        self._static = True
+
+    def _parse(self, jwks: Dict[str, Any]) -> Dict[str, jwt.PyJWK]:
+        return {key["kid"]: jwt.PyJWK(key) for key in jwks.get("keys", []) if "kid" in key}
+
+    async def get_key(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        if self._static:
+            return self._keys.get(kid)
+        now = time.monotonic()
+        if now < self._expires_at and kid in self._keys:
+            return self._keys[kid]
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            stale = now >= self._expires_at
+            unknown_kid = kid not in self._keys and now - self._fetched_at >= MIN_REFRESH_SECONDS
+            if stale or unknown_kid:
+                await self._refresh()
+        return self._keys.get(kid)
+
+    async def _refresh(self) -> None:
+        response = await get_http_client().get(self.url)
+        response.raise_for_status()
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE_SECONDS
+        self._keys = self._parse(response.json())
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+
+
+google_jwks = GoogleJWKSCache(settings.GOOGLE_JWKS_URL)
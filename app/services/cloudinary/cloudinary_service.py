@@ -1,18 +1,34 @@
-import cloudinary
-import cloudinary.uploader
-from app.core.config import settings 
+import os
+import threading
 
-cloudinary.config(
-    cloud_name=settings.CLOUDINARY_CLOUD_NAME,
-    api_key=settings.CLOUDINARY_API_KEY,
-    api_secret=settings.CLOUDINARY_API_SECRET
-)
+from app.core.config import settings
+
+_config_lock = threading.Lock()
+_configured_pid = None
+
+
+def _get_uploader():
+    """Import and configure the SDK on first upload, once per process"""
+    global _configured_pid
+    import cloudinary
+    import cloudinary.uploader
+
+    if _configured_pid != os.getpid():
+        with _config_lock:
+            if _configured_pid != os.getpid():
+                cloudinary.config(
+                    cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+                    api_key=settings.CLOUDINARY_API_KEY,
+                    api_secret=settings.CLOUDINARY_API_SECRET
+                )
+                _configured_pid = os.getpid()
+    return cloudinary.uploader
 
 def upload_image_to_cloudinary(file, folder="user_avatars"):
-    result = cloudinary.uploader.upload(
+    result = _get_uploader().upload(
         file,
         folder=folder,
         overwrite=True,
         resource_type="image"
     )
-    return result.get("secure_url")
\ No newline at end of file
+    return result.get("secure_url")
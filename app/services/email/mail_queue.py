@@ -0,0 +1,210 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import emails
+from emails.backend.smtp import SMTPBackend
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueuedEmail:
+    email_to: str
+    subject: str
+    html_content: str
+
+
+def smtp_options() -> Dict[str, Any]:
+    options = {
+        "host": settings.SMTP_HOST,
+        "port": settings.SMTP_PORT,
+        "tls": settings.SMTP_TLS,
+        "ssl": settings.SMTP_SSL,
+        "user": settings.SMTP_USER,
+        "password": settings.SMTP_PASSWORD,
+    }
+    return {k: v for k, v in options.items() if v}
+
+
+def build_message(subject: str, html_content: str) -> emails.Message:
+    return emails.Message(
+        subject=subject,
+        html=html_content,
+        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+        charset="utf-8"
+    )
+
+
+class MailQueue:
+    """Sends emails from background threads.
+
+    Each worker keeps its SMTP connection open between messages and closes it
+    after MAIL_SMTP_IDLE_SECONDS without work. Failed sends reconnect and are
+    retried with backoff up to MAIL_MAX_RETRIES times.
+    """
+
+    def __init__(self, workers: int, max_size: int, max_retries: int, retry_base_seconds: float, idle_seconds: float):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.idle_seconds = idle_seconds
+        self._stats_lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._queue: "queue.Queue[Optional[QueuedEmail]]" = queue.Queue(maxsize=self.max_size)
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        """Start the workers, and replace any that died"""
+        if self._threads and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._start_lock:
+            alive = [thread for thread in self._threads if thread.is_alive()]
+            if len(alive) < self.workers:
+                started = [
+                    threading.Thread(target=self._work, name=f"mail-worker-{i}", daemon=True)
+                    for i in range(len(alive), self.workers)
+                ]
+                for thread in started:
+                    thread.start()
+                self._threads = alive + started
+
+    def enqueue(self, email_to: str, subject: str, html_content: str) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(QueuedEmail(email_to=email_to, subject=subject, html_content=html_content))
+        except queue.Full:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many emails queued, please try again"
+            )
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Send what is queued within timeout seconds, then stop the workers.
+        Emails still queued at the deadline are dropped."""
+        threads, self._threads = self._threads, []
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            try:
+                self._queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        alive = [thread for thread in threads if thread.is_alive()]
+        if alive:
+            # Workers still busy stop after their current email
+            self._drop_queued()
+            for _ in alive:
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    break
+
+    def _drop_queued(self) -> None:
+        dropped = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                dropped += 1
+        if dropped:
+            logger.warning(f"Dropped {dropped} queued emails on shutdown")
+            with self._stats_lock:
+                self.dropped += dropped
+
+    def _close(self, backend: SMTPBackend) -> None:
+        """Close the SMTP connection, the server may already have dropped it"""
+        try:
+            backend.close()
+        except Exception as e:
+            logger.warning(f"Error closing SMTP connection: {str(e)}")
+
+    def _work(self) -> None:
+        backend: Optional[SMTPBackend] = None
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                if backend is not None:
+                    self._close(backend)
+                    backend = None
+                continue
+            if item is None:
+                break
+            try:
+                if backend is None:
+                    backend = SMTPBackend(fail_silently=False, **smtp_options())
+                self._send_with_retry(backend, item)
+            except Exception:
+                # Keep the worker alive, the next email starts on a fresh connection
+                logger.exception(f"Unexpected error sending email to {item.email_to}")
+                with self._stats_lock:
+                    self.failed += 1
+                if backend is not None:
+                    self._close(backend)
+                    backend = None
+        if backend is not None:
+            self._close(backend)
+
+    def _send_with_retry(self, backend: SMTPBackend, item: QueuedEmail) -> None:
+        message = build_message(item.subject, item.html_content)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._close(backend)
+                time.sleep(self.retry_base_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                with self._stats_lock:
+                    self.retried += 1
+            try:
+                response = message.send(to=item.email_to, smtp=backend)
+                if response is not None and response.status_code == 250:
+                    logger.info(f"Email sent successfully to {item.email_to}")
+                    with self._stats_lock:
+                        self.sent += 1
+                    return
+                logger.warning(f"Failed to send email to {item.email_to}: {getattr(response, 'error', None)}")
+            except Exception as e:
+                logger.warning(f"Error sending email to {item.email_to}: {str(e)}")
+        logger.error(f"Giving up on email to {item.email_to} after {self.max_retries + 1} attempts")
+        with self._stats_lock:
+            self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "workers": sum(thread.is_alive() for thread in self._threads),
+                "queued": self._queue.qsize(),
+                "max_size": self.max_size,
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
+
+
+mail_queue = MailQueue(
+    workers=settings.MAIL_WORKERS,
+    max_size=settings.MAIL_QUEUE_MAX_SIZE,
+    max_retries=settings.MAIL_MAX_RETRIES,
+    retry_base_seconds=settings.MAIL_RETRY_BASE_SECONDS,
+    idle_seconds=settings.MAIL_SMTP_IDLE_SECONDS
+)
@@ -3,55 +3,52 @@ from pathlib import Path
 from typing import Any
 import logging
 
-import emails
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound
 from fastapi import HTTPException
 
 from app.core.config import settings
+from app.services.email.mail_queue import build_message, mail_queue, smtp_options
 
 logger = logging.getLogger(__name__)
 
+TEMPLATES_DIR = Path(__file__).parent.parent.parent / "email-templates" / "build"
+
+# Templates never change at runtime, compile each once
+template_env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), auto_reload=False, cache_size=-1)
+for _template_path in TEMPLATES_DIR.glob("*.html"):
+    template_env.get_template(_template_path.name)
+
 @dataclass
 class EmailData:
     subject: str
     html_content: str
 
 def render_email_template(template_name: str, context: dict[str, Any]) -> str:
-    template_path = Path(__file__).parent.parent.parent / "email-templates" / "build" / template_name
     try:
-        template_str = template_path.read_text(encoding="utf-8")
-        return Template(template_str).render(context)
-    except FileNotFoundError:
+        return template_env.get_template(template_name).render(context)
+    except TemplateNotFound:
         logger.error(f"Email template not found: {template_name}")
         raise HTTPException(status_code=500, detail="Email template not found")
 
 def send_email(email_to: str, subject: str, html_content: str) -> None:
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-        charset="utf-8"
-    )
-
-    smtp_options = {
-        "host": settings.SMTP_HOST,
-        "port": settings.SMTP_PORT,
-        "tls": settings.SMTP_TLS,
-        "ssl": settings.SMTP_SSL,
-        "user": settings.SMTP_USER,
-        "password": settings.SMTP_PASSWORD,
-    }
-    logger.error(f"{smtp_options}")
+    """Send an email over a new SMTP connection and wait for it"""
+    message = build_message(subject, html_content)
     try:
-        response = message.send(to=email_to, smtp={k: v for k, v in smtp_options.items() if v})
+        response = message.send(to=email_to, smtp=smtp_options())
         if not response.status_code == 250:
             logger.error(f"Failed to send email to {email_to}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to send email")
         logger.info(f"Email sent successfully to {email_to}")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending email to {email_to}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to send email")
 
+def queue_email(email_to: str, subject: str, html_content: str) -> None:
+    """Queue an email for the background mail workers, returns without waiting for SMTP"""
+    mail_queue.enqueue(email_to=email_to, subject=subject, html_content=html_content)
+
 def create_verification_email(email_to: str, otp_code: str) -> EmailData:
     subject = f"{settings.PROJECT_NAME} - Email Verification Code"
     html = render_email_template("new_account.html", {
@@ -0,0 +1,183 @@
+import logging
+import os
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.firebase import get_firebase_app
+from app.crud.fcm.crud_fcm import crud_fcm
+
+logger = logging.getLogger(__name__)
+
+# FCM accepts at most 500 tokens per multicast message
+MULTICAST_LIMIT = 500
+
+
+@lru_cache(maxsize=None)
+def _error_classes() -> tuple[tuple, tuple, tuple]:
+    """Errors worth retrying, token errors after which the token will never work again, and
+    invalid argument errors, which can be caused by the token or by the message.
+    Imported on first send, firebase_admin.messaging is slow to import."""
+    from firebase_admin import exceptions, messaging
+
+    retryable = (
+        exceptions.UnavailableError,
+        exceptions.InternalError,
+        exceptions.DeadlineExceededError,
+        # Quota errors are ResourceExhaustedError
+        exceptions.ResourceExhaustedError,
+        exceptions.UnknownError,
+    )
+    dead_token = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+    invalid_argument = (exceptions.InvalidArgumentError,)
+    return retryable, dead_token, invalid_argument
+
+
+class FCMDeliveryEngine:
+    """Sends push notifications off the request path.
+
+    Tokens are sent in multicast batches of up to MULTICAST_LIMIT on a small
+    worker pool. Failed tokens are retried with exponential backoff, and tokens
+    FCM reports as unregistered or invalid are deactivated in fcm_tokens.
+    """
+
+    def __init__(self, max_workers: int, max_retries: int, retry_base_seconds: float):
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.max_workers = max_workers
+        self._executor = self._new_executor()
+        # Worker threads do not survive a fork, a forked process gets a fresh pool
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fcm-delivery")
+
+    def _reset_after_fork(self) -> None:
+        self._executor = self._new_executor()
+
+    def submit(
+        self, tokens: List[str], title: str, body: str, data: Optional[Dict[str, str]] = None
+    ) -> Future:
+        """Queue a notification to the given tokens, returns the future of deliver()"""
+        return self._executor.submit(self._run, self.deliver, tokens, title, body, data)
+
+    def submit_to_user(
+        self, user_id: str, title: str, body: str, data: Optional[Dict[str, str]] = None
+    ) -> Future:
+        """Queue a notification to all active devices of a user"""
+        return self._executor.submit(self._run, self.deliver_to_user, user_id, title, body, data)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, func, *args) -> Dict[str, Any]:
+        try:
+            return func(*args)
+        except Exception:
+            logger.exception("FCM delivery failed")
+            raise
+
+    def deliver_to_user(
+        self, user_id: str, title: str, body: str, data: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        with Session(engine) as session:
+            tokens = [token.fcm_token for token in crud_fcm.get_active_tokens(session, user_id)]
+        return self.deliver(tokens=tokens, title=title, body=body, data=data)
+
+    def deliver(
+        self, tokens: List[str], title: str, body: str, data: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Send a notification to the tokens in the calling thread"""
+        tokens = list(dict.fromkeys(token for token in tokens if token))
+        if not tokens:
+            return {"success": False, "error": "No valid token(s) provided"}
+
+        success_count = 0
+        dead_tokens: List[str] = []
+        failed_tokens: List[str] = []
+        for start in range(0, len(tokens), MULTICAST_LIMIT):
+            sent, dead, failed = self._send_batch(tokens[start:start + MULTICAST_LIMIT], title, body, data)
+            success_count += sent
+            dead_tokens.extend(dead)
+            failed_tokens.extend(failed)
+
+        if dead_tokens:
+            with Session(engine) as session:
+                crud_fcm.deactivate_tokens(session, dead_tokens)
+                session.commit()
+            logger.info("Deactivated %d dead FCM tokens", len(dead_tokens))
+
+        return {
+            "success": success_count > 0,
+            "success_count": success_count,
+            "failure_count": len(dead_tokens) + len(failed_tokens),
+            "deactivated_count": len(dead_tokens),
+            # Tokens that still failed with a transient error after the retries
+            "retryable_count": len(failed_tokens),
+        }
+
+    def _send_batch(
+        self, tokens: List[str], title: str, body: str, data: Optional[Dict[str, str]]
+    ) -> tuple[int, List[str], List[str]]:
+        """Send one multicast batch, retrying tokens that failed with a transient error.
+        Returns the number sent, the dead tokens and the tokens that still failed."""
+        from firebase_admin import messaging
+
+        retryable_errors, dead_token_errors, invalid_argument_errors = _error_classes()
+        app = get_firebase_app()
+        success_count = 0
+        dead_tokens: List[str] = []
+        pending = tokens
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Exponential backoff with full jitter
+                time.sleep(random.uniform(0, self.retry_base_seconds * 2 ** (attempt - 1)))
+            message = messaging.MulticastMessage(
+                tokens=pending,
+                notification=messaging.Notification(title=title, body=body),
+                data=data,
+            )
+            try:
+                response = messaging.send_each_for_multicast(message, app=app)
+            except retryable_errors as e:
+                logger.warning("FCM multicast failed (attempt %d): %s", attempt + 1, e)
+                continue
+
+            retry = []
+            invalid = []
+            for token, result in zip(pending, response.responses):
+                if result.success:
+                    success_count += 1
+                elif isinstance(result.exception, retryable_errors):
+                    retry.append(token)
+                elif isinstance(result.exception, dead_token_errors):
+                    dead_tokens.append(token)
+                elif isinstance(result.exception, invalid_argument_errors):
+                    invalid.append(token)
+                else:
+                    logger.warning("FCM send failed for a token: %s", result.exception)
+
+            if invalid and len(invalid) == len(pending):
+                # Every token rejected with invalid argument points at the message, not the tokens
+                logger.error("FCM rejected the message for all %d tokens: %s", len(pending), response.responses[0].exception)
+            else:
+                dead_tokens.extend(invalid)
+
+            pending = retry
+            if not pending:
+                break
+
+        return success_count, dead_tokens, pending
+
+
+fcm_delivery = FCMDeliveryEngine(
+    max_workers=settings.FCM_DELIVERY_WORKERS,
+    max_retries=settings.FCM_MAX_RETRIES,
+    retry_base_seconds=settings.FCM_RETRY_BASE_SECONDS
+)
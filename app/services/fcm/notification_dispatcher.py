@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.crud.fcm.crud_fcm import crud_fcm
+from app.crud.fcm.crud_notification_outbox import crud_notification_outbox
+from app.services.fcm.fcm_delivery import fcm_delivery
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 3600
+
+
+class NotificationDispatcher:
+    """Drains the notification outbox in batches.
+
+    Messages are leased with FOR UPDATE SKIP LOCKED, so any number of
+    dispatchers can run side by side. A message is marked sent only after
+    delivery, which makes delivery at-least-once: a dispatcher that dies
+    mid-batch leaves its messages to be picked up when the lease runs out.
+    Sent and failed messages past the retention period are deleted in batches
+    every purge_seconds.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_seconds: float,
+        lease_seconds: float,
+        max_attempts: int,
+        retry_base_seconds: float,
+        retention_days: int,
+        purge_seconds: float
+    ):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retention_days = retention_days
+        self.purge_seconds = purge_seconds
+        self._next_purge = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.purged = 0
+        self.last_batch_at: Optional[datetime] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self) -> None:
+        """Check the outbox now instead of at the next poll"""
+        self._wake.set()
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.purge_seconds
+                try:
+                    self.purge_once()
+                except Exception:
+                    logger.exception("Notification outbox purge failed")
+            try:
+                claimed = self.dispatch_once()
+            except Exception:
+                logger.exception("Notification dispatch failed")
+                claimed = 0
+            # A full batch means there is probably more waiting
+            if claimed < self.batch_size:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def purge_once(self) -> int:
+        """Delete finished messages past the retention period, one committed batch at a time"""
+        older_than = datetime.now() - timedelta(days=self.retention_days)
+        purged = 0
+        with Session(engine) as session:
+            while not self._stop.is_set():
+                deleted = crud_notification_outbox.delete_finished_batch(session, older_than, self.batch_size)
+                session.commit()
+                purged += deleted
+                if deleted < self.batch_size:
+                    break
+        if purged:
+            logger.info(f"Purged {purged} finished notifications older than {self.retention_days} days")
+            with self._stats_lock:
+                self.purged += purged
+        return purged
+
+    def dispatch_once(self) -> int:
+        """Claim and deliver one batch, returns the number of messages claimed"""
+        with Session(engine) as session:
+            messages = crud_notification_outbox.claim_batch(session, self.batch_size, self.lease_seconds)
+            if not messages:
+                return 0
+            tokens_by_user = crud_fcm.get_active_tokens_for_users(
+                session, list({message.user_id for message in messages})
+            )
+            # Commit the lease before sending, so other dispatchers skip these rows
+            session.commit()
+
+        futures = [
+            (message, fcm_delivery.submit(
+                tokens=tokens_by_user.get(message.user_id, []),
+                title=message.title,
+                body=message.body,
+                data=message.data
+            ))
+            for message in messages
+        ]
+
+        sent_ids = []
+        retried = failed = 0
+        with Session(engine) as session:
+            for message, future in futures:
+                try:
+                    result = future.result()
+                    # Dead tokens and users without devices are done, only transient failures are retried
+                    if result.get("success") or not result.get("retryable_count"):
+                        sent_ids.append(message.outbox_id)
+                        continue
+                    error = f"{result['retryable_count']} token(s) failed with a transient error"
+                except Exception as e:
+                    error = str(e)
+
+                if message.attempts >= self.max_attempts:
+                    crud_notification_outbox.mark_failed(session, message.outbox_id, error)
+                    failed += 1
+                else:
+                    delay = min(self.retry_base_seconds * 2 ** (message.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+                    crud_notification_outbox.mark_retry(session, message.outbox_id, error, delay)
+                    retried += 1
+            crud_notification_outbox.mark_sent(session, sent_ids)
+            session.commit()
+
+        with self._stats_lock:
+            self.sent += len(sent_ids)
+            self.retried += retried
+            self.failed += failed
+            self.last_batch_at = datetime.now()
+        return len(messages)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "purged": self.purged,
+                "last_batch_at": self.last_batch_at,
+            }
+
+
+notification_dispatcher = NotificationDispatcher(
+    batch_size=settings.NOTIFICATION_OUTBOX_BATCH_SIZE,
+    poll_seconds=settings.NOTIFICATION_OUTBOX_POLL_SECONDS,
+    lease_seconds=settings.NOTIFICATION_OUTBOX_LEASE_SECONDS,
+    max_attempts=settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS,
+    retry_base_seconds=settings.NOTIFICATION_OUTBOX_RETRY_BASE_SECONDS,
+    retention_days=settings.NOTIFICATION_OUTBOX_RETENTION_DAYS,
+    purge_seconds=settings.NOTIFICATION_OUTBOX_PURGE_SECONDS
+)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Starting notification dispatcher")
+    try:
+        notification_dispatcher.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fcm_delivery.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
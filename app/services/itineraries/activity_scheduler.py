@@ -0,0 +1,136 @@
+from collections import deque
+from dataclasses import dataclass
+from datetime import time
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlmodel import Session
+
+from app.models import PlacePublic
+from app.services.places.place_service import place_service
+from app.services.places.travel_matrix import travel_matrix
+
+DAY_START_MINUTES = 8 * 60
+LAST_MINUTE = 23 * 60 + 59
+
+# Minutes spent at a place, by place type
+VISIT_MINUTES = {"ATTRACTION": 120, "RESTAURANT": 75, "HOTEL": 30}
+DEFAULT_VISIT_MINUTES = 90
+
+
+@dataclass(frozen=True)
+class MealWindow:
+    name: str
+    start: int  # minutes after midnight
+    end: int  # latest start
+
+
+MEAL_WINDOWS = (
+    MealWindow("breakfast", 7 * 60, 9 * 60 + 30),
+    MealWindow("lunch", 11 * 60 + 30, 13 * 60 + 30),
+    MealWindow("dinner", 18 * 60, 20 * 60 + 30),
+)
+
+
+def _serves(place: PlacePublic, window: MealWindow) -> bool:
+    """Restaurants without meal_types are assumed to serve every meal"""
+    meal_types = {meal.lower() for meal in (place.restaurant_detail.meal_types if place.restaurant_detail else [])}
+    if not meal_types:
+        return True
+    if "brunch" in meal_types and window.name in ("breakfast", "lunch"):
+        return True
+    return window.name in meal_types
+
+
+class ActivityScheduler:
+    """Assigns start times to a day's places.
+
+    Places other than restaurants are visited in the given order (the route
+    order). Restaurants are slotted into the breakfast, lunch and dinner
+    windows they serve, as close to the current position as possible. Each
+    visit starts after the previous one's visit duration plus the travel
+    time between them, so start times never collide. A day whose last visit
+    would start after midnight is rejected rather than squeezed.
+    """
+
+    def _travel(self, travel, position: Optional[int], idx: int) -> int:
+        return 0 if position is None else int(travel[position, idx])
+
+    def visit_minutes(self, place: PlacePublic) -> int:
+        return VISIT_MINUTES.get((place.type or "").upper(), DEFAULT_VISIT_MINUTES)
+
+    def schedule(
+        self, places: Sequence[PlacePublic], hotel: Optional[PlacePublic] = None
+    ) -> List[Tuple[int, time]]:
+        """Get (index into places, start_time) pairs in visit order, leaving from the hotel if given"""
+        # Travel minutes between every two stops, the hotel is the last row
+        travel = travel_matrix.minutes(travel_matrix.matrix_km(list(places) + ([hotel] if hotel else [])))
+        others = deque(idx for idx, place in enumerate(places) if (place.type or "").upper() != "RESTAURANT")
+        restaurants = [idx for idx, place in enumerate(places) if (place.type or "").upper() == "RESTAURANT"]
+        windows = deque(MEAL_WINDOWS)
+        clock = DAY_START_MINUTES
+        # Index of the last stop, None before the first one when there is no hotel
+        position = len(places) if hotel else None
+        plan: List[Tuple[int, int]] = []
+
+        while others or restaurants:
+            while windows and clock > windows[0].end:
+                windows.popleft()
+
+            meal = None
+            if restaurants and windows:
+                window = windows[0]
+                following = others[0] if others else None
+                # Eat now when in the window, or when the next visit would run past it
+                due = (
+                    following is None
+                    or clock >= window.start
+                    or clock + self._travel(travel, position, following)
+                    + self.visit_minutes(places[following]) > window.end
+                )
+                if due:
+                    serving = [idx for idx in restaurants if _serves(places[idx], window)]
+                    if not serving:
+                        windows.popleft()
+                        continue
+                    meal = min(serving, key=lambda idx: self._travel(travel, position, idx))
+                    windows.popleft()
+
+            if meal is not None:
+                idx = meal
+                restaurants.remove(idx)
+                begin = max(clock + self._travel(travel, position, idx), window.start)
+            else:
+                # Restaurants left over once no meal window fits are visited in turn
+                idx = others.popleft() if others else restaurants.pop(0)
+                begin = clock + self._travel(travel, position, idx)
+
+            if begin > LAST_MINUTE:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Too many places for one day, {places[idx].name} would start after midnight"
+                )
+            plan.append((idx, begin))
+            clock = begin + self.visit_minutes(places[idx])
+            position = idx
+
+        return [(idx, time(minute // 60, minute % 60)) for idx, minute in plan]
+
+    def schedule_place_ids(
+        self, session: Session, place_ids: List[int], hotel_id: Optional[int] = None
+    ) -> List[Tuple[int, time]]:
+        """Schedule places given by id, returns (index into place_ids, start_time) in visit order"""
+        places = place_service._get_places_by_ids(session=session, place_ids=place_ids + ([hotel_id] if hotel_id else []))
+        missing_ids = [place_id for place_id in dict.fromkeys(place_ids) if place_id not in places]
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Places with IDs {missing_ids} not found"
+            )
+        return self.schedule(
+            places=[places[place_id] for place_id in place_ids],
+            hotel=places.get(hotel_id) if hotel_id else None
+        )
+
+
+activity_scheduler = ActivityScheduler()
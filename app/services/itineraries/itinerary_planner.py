@@ -0,0 +1,192 @@
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlmodel import Session
+
+from app.crud.places.crud_place import crud_place
+from app.models import (
+    ItineraryActivityCreate, ItineraryCreate, ItineraryDayCreate, ItineraryGenerateRequest,
+    ItineraryPublic, Users
+)
+from app.services.itineraries.activity_scheduler import activity_scheduler
+from app.services.itineraries.itinerary_service import itinerary_service
+from app.services.itineraries.route_optimizer import optimize_route
+from app.services.places.place_service import place_service
+from app.services.places.spatial_index import KM_PER_DEGREE
+
+PLANNER_TYPES = ("ATTRACTION", "RESTAURANT")
+MAX_DAYS = 30
+KMEANS_ITERATIONS = 25
+
+
+def bayesian_scores(ratings: np.ndarray, reviews: np.ndarray) -> np.ndarray:
+    """Ratings shrunk towards the average rating, less so the more reviews a place has.
+
+    A 5.0 with 3 reviews should not beat a 4.6 with 2,000. The prior weighs
+    as much as the median review count of the candidates.
+    """
+    rated = ~np.isnan(ratings)
+    ratings = np.where(rated, ratings, 0.0)
+    reviews = np.where(rated & ~np.isnan(reviews), reviews, 0.0)
+    if reviews.sum() > 0:
+        prior_mean = float(np.average(ratings, weights=reviews))
+    else:
+        prior_mean = float(ratings[rated].mean()) if rated.any() else 0.0
+    prior_weight = max(float(np.median(reviews)), 1.0)
+    return (reviews * ratings + prior_weight * prior_mean) / (reviews + prior_weight)
+
+
+def _project_km(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Equirectangular projection, close enough within a city"""
+    scale = np.cos(np.radians(lats.mean()))
+    return np.column_stack((lats * KM_PER_DEGREE, lons * KM_PER_DEGREE * scale))
+
+
+def _kmeans(points: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means with k-means++ seeding, returns the centers"""
+    rng = np.random.default_rng(seed)
+    centers = points[[rng.integers(len(points))]]
+    for _ in range(1, k):
+        d2 = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = d2.sum()
+        pick = rng.choice(len(points), p=d2 / total) if total > 0 else rng.integers(len(points))
+        centers = np.vstack((centers, points[pick]))
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, points)
+        # An empty cluster keeps its old center
+        moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.allclose(moved, centers):
+            break
+        centers = moved
+    return centers
+
+
+def cluster_into_days(points: np.ndarray, days: int, per_day: int) -> List[List[int]]:
+    """Split points into at most `days` geographic groups of at most `per_day` each.
+
+    k-means finds the centers, then points are handed to their nearest
+    center with room left, closest pairs first, so no day is overloaded.
+    """
+    k = min(days, len(points))
+    centers = _kmeans(points, k)
+    distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    capacity = min(per_day, -(-len(points) // k))
+
+    groups: List[List[int]] = [[] for _ in range(k)]
+    assigned = np.zeros(len(points), dtype=bool)
+    for flat in np.argsort(distances, axis=None):
+        idx, cluster = divmod(int(flat), k)
+        if not assigned[idx] and len(groups[cluster]) < capacity:
+            groups[cluster].append(idx)
+            assigned[idx] = True
+    return [group for group in groups if group]
+
+
+class ItineraryPlanner:
+    def _select(
+        self, types: np.ndarray, scores: np.ndarray, preferred_types: List[str], total: int
+    ) -> np.ndarray:
+        """Indexes of the best scored places, the slots split evenly between the preferred types"""
+        selected = []
+        quotas = np.full(len(preferred_types), total // len(preferred_types))
+        quotas[:total % len(preferred_types)] += 1
+        for place_type, quota in zip(preferred_types, quotas):
+            candidates = np.flatnonzero(types == place_type)
+            if len(candidates) > quota:
+                candidates = candidates[np.argpartition(-scores[candidates], quota - 1)[:quota]]
+            selected.append(candidates)
+        return np.concatenate(selected)
+
+    def generate(
+        self,
+        session: Session,
+        user: Users,
+        plan_in: ItineraryGenerateRequest,
+        idempotency_key: Optional[str] = None
+    ) -> ItineraryPublic:
+        """Plan an itinerary from the best rated places of a city and save it"""
+        if plan_in.start_date > plan_in.end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Start date cannot be after end date"
+            )
+        day_count = (plan_in.end_date - plan_in.start_date).days + 1
+        if day_count > MAX_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Itineraries can be generated for at most {MAX_DAYS} days"
+            )
+        preferred_types = list(dict.fromkeys(place_type.upper() for place_type in plan_in.preferred_types))
+        if not preferred_types or any(place_type not in PLANNER_TYPES for place_type in preferred_types):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Preferred types must be among {', '.join(PLANNER_TYPES)}"
+            )
+
+        hotel = None
+        if plan_in.hotel_id:
+            hotel = itinerary_service._get_place_with_details(session=session, place_id=plan_in.hotel_id)
+
+        place_ids, types, lats, lons, ratings, reviews = crud_place.get_planner_candidates(
+            session=session,
+            city=plan_in.destination_city,
+            types=preferred_types,
+            max_price_level=plan_in.max_price_level
+        )
+        if not place_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No places found for this city"
+            )
+
+        place_ids = np.asarray(place_ids)
+        types = np.asarray(types)
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        scores = bayesian_scores(np.asarray(ratings, dtype=float), np.asarray(reviews, dtype=float))
+
+        selected = self._select(types, scores, preferred_types, day_count * plan_in.activities_per_day)
+        groups = cluster_into_days(_project_km(lats[selected], lons[selected]), day_count, plan_in.activities_per_day)
+
+        start = (hotel.latitude, hotel.longitude) if hotel else None
+        places = place_service._get_places_by_ids(session=session, place_ids=[int(place_ids[idx]) for idx in selected])
+        days_in: List[Tuple[ItineraryDayCreate, List[ItineraryActivityCreate]]] = []
+        for day_idx, group in enumerate(groups):
+            members = selected[group]
+            order, _, _ = optimize_route(points=list(zip(lats[members], lons[members])), start=start)
+            route = [int(place_ids[members[idx]]) for idx in order]
+            schedule = activity_scheduler.schedule(places=[places[place_id] for place_id in route], hotel=hotel)
+            days_in.append((
+                ItineraryDayCreate(day_number=day_idx + 1, date=plan_in.start_date + timedelta(days=day_idx)),
+                [
+                    ItineraryActivityCreate(place_id=route[idx], start_time=start_time)
+                    for idx, start_time in schedule
+                ]
+            ))
+
+        itinerary_in = ItineraryCreate(
+            title=plan_in.title or f"{day_count} days in {plan_in.destination_city}",
+            description="Generated from the place catalogue",
+            start_date=plan_in.start_date,
+            end_date=plan_in.end_date,
+            budget=plan_in.budget,
+            destination_city=plan_in.destination_city,
+            hotel_id=plan_in.hotel_id
+        )
+        return itinerary_service.create_itinerary_tree(
+            session=session,
+            user=user,
+            itinerary_in=itinerary_in,
+            days_in=days_in,
+            idempotency_key=idempotency_key,
+            places={**places, plan_in.hotel_id: hotel} if hotel else places
+        )
+
+
+itinerary_planner = ItineraryPlanner()
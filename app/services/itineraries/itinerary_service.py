@@ -1,6 +1,7 @@
 from fastapi import HTTPException, status
 from sqlmodel import Session, select
-from typing import List, Dict, Any, Optional
+from sqlalchemy.exc import IntegrityError
+from typing import List, Dict, Any, Optional, Tuple
 from uuid import UUID
 from app.models import (
     FavoriteItineraries, Message, Itineraries, ItineraryCreate, ItineraryUpdate, ItineraryPublic,
@@ -9,118 +10,202 @@ from app.models import (
     PaginationMetadata, PaginatedResponse, Places, PlacePublic,
     PlacePhotos, RestaurantDetails, HotelDetails, AttractionDetails,
     PlacePhotoPublic, RestaurantDetailPublic, HotelDetailPublic, AttractionDetailPublic,UserPublicMinimal,
-    ItineraryShares, Users
+    ItineraryShares, Users, ItineraryDayRoutePublic, ItineraryRoutePublic, TravelLegPublic
 )
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.pagination import cursor_pagination, decode_cursor, encode_cursor
+from app.crud.itineraries.crud_favorite import crud_favorite
 from app.crud.itineraries.crud_itinerary import crud_itinerary
+from app.crud.itineraries.crud_itinerary_share import crud_itinerary_share
+from app.crud.users.crud_user import crud_user
+from app.services.itineraries.activity_scheduler import activity_scheduler
+from app.services.itineraries.route_optimizer import optimize_route
 from app.services.places.place_service import place_service
-from datetime import date
+from app.services.places.travel_matrix import travel_matrix
+from datetime import date, datetime
+
+# Serialized ItineraryPublic (without is_favorite) keyed by (itinerary_id, version)
+document_cache: LRUCache[bytes] = LRUCache(
+    name="itinerary_documents",
+    max_size=settings.ITINERARY_DOCUMENT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.ITINERARY_DOCUMENT_CACHE_TTL_SECONDS
+)
 
 class ItineraryService:
     def _get_place_with_details(self, session: Session, place_id: int) -> PlacePublic:
         """Helper method to get place with all details"""
-        # Get the place
-        place = session.get(Places, place_id)
+        place = place_service._get_places_by_ids(session=session, place_ids=[place_id]).get(place_id)
         if not place:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Place with ID {place_id} not found"
             )
-        
-        # Convert to dict to build PlacePublic
-        place_data = place.dict()
-        
-        # Get photos
-        photos = session.exec(
-            select(PlacePhotos).where(PlacePhotos.place_id == place_id)
-        ).all()
-        place_data["photos"] = [PlacePhotoPublic(**photo.dict()) for photo in photos] if photos else []
-        
-        # Get details based on place type
-        place_data["restaurant_detail"] = None
-        place_data["hotel_detail"] = None
-        place_data["attraction_detail"] = None
-        
-        if place.type.upper() == "RESTAURANT":
-            restaurant_detail = session.exec(
-                select(RestaurantDetails).where(RestaurantDetails.place_id == place_id)
-            ).first()
-            if restaurant_detail:
-                place_data["restaurant_detail"] = RestaurantDetailPublic(**restaurant_detail.dict())
-        
-        elif place.type.upper() == "HOTEL":
-            hotel_detail = session.exec(
-                select(HotelDetails).where(HotelDetails.place_id == place_id)
-            ).first()
-            if hotel_detail:
-                place_data["hotel_detail"] = HotelDetailPublic(**hotel_detail.dict())
-        
-        elif place.type.upper() == "ATTRACTION":
-            attraction_detail = session.exec(
-                select(AttractionDetails).where(AttractionDetails.place_id == place_id)
-            ).first()
-            if attraction_detail:
-                place_data["attraction_detail"] = AttractionDetailPublic(**attraction_detail.dict())
-        
-        return PlacePublic(**place_data)
+        return place
+
+    def _to_user_minimal(self, user: Users, permissions: str) -> UserPublicMinimal:
+        return UserPublicMinimal(
+            user_id=user.user_id,
+            username=user.username,
+            full_name=user.full_name,
+            email=user.email,
+            profile_picture=user.profile_picture,
+            permissions=permissions
+        )
 
-    def get_itinerary(self, session: Session, itinerary_id: int,current_user: Users = None) -> ItineraryPublic:
-        itinerary = crud_itinerary.get_by_id(session=session, itinerary_id=itinerary_id)
-        if not itinerary:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Itinerary not found"
-            )
+    def _build_days_public(
+        self,
+        session: Session,
+        days: List[ItineraryDays],
+        activities_by_day: Dict[int, List[ItineraryActivities]],
+        places: Optional[Dict[int, PlacePublic]] = None
+    ) -> List[ItineraryDayPublic]:
+        """Helper method to assemble days with their activities and places in memory.
+        Places not passed in are loaded in one batch."""
+        if places is None:
+            place_ids = [
+                activity.place_id
+                for activities in activities_by_day.values()
+                for activity in activities
+            ]
+            places = place_service._get_places_by_ids(session=session, place_ids=place_ids)
 
-        # Fetch days for this itinerary
-        days = crud_itinerary.get_days(session=session, itinerary_id=itinerary_id)
         days_with_data = []
-        for day in days:
-            day_data = day.dict()
-            activities = crud_itinerary.get_activities(session=session, day_id=day.day_id)
+        for day in sorted(days, key=lambda d: d.day_number):
             activities_with_place = []
-            for activity in activities:
+            for activity in sorted(activities_by_day.get(day.day_id, []), key=lambda a: a.start_time):
+                place = places.get(activity.place_id)
+                if not place:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Place with ID {activity.place_id} not found"
+                    )
                 activity_data = activity.dict()
-                place = self._get_place_with_details(session, activity.place_id)
                 activity_data["place"] = place
                 activities_with_place.append(ItineraryActivityPublic(**activity_data))
+            day_data = day.dict()
             day_data["activities"] = activities_with_place
             days_with_data.append(ItineraryDayPublic(**day_data))
+        return days_with_data
+
+    def _build_itinerary_public(
+        self,
+        session: Session,
+        itinerary: Itineraries,
+        days: List[ItineraryDays],
+        activities_by_day: Dict[int, List[ItineraryActivities]],
+        owner: Optional[Users],
+        shares: List[ItineraryShares],
+        shared_users: Dict[UUID, Users],
+        places: Optional[Dict[int, PlacePublic]] = None
+    ) -> ItineraryPublic:
+        """Helper method to assemble a full ItineraryPublic from already loaded rows.
+        Places (activities and hotel) not passed in are loaded in one batch."""
+        if places is None:
+            place_ids = [
+                activity.place_id
+                for activities in activities_by_day.values()
+                for activity in activities
+            ]
+            if itinerary.hotel_id:
+                place_ids.append(itinerary.hotel_id)
+            places = place_service._get_places_by_ids(session=session, place_ids=place_ids)
 
         itinerary_data = itinerary.dict()
-        itinerary_data["days"] = days_with_data
+        itinerary_data["days"] = self._build_days_public(
+            session=session, days=days, activities_by_day=activities_by_day, places=places
+        )
         itinerary_data["hotel"] = None
         if itinerary.hotel_id:
-            itinerary_data["hotel"] = self._get_place_with_details(session, itinerary.hotel_id)
-        owner = session.get(Users, itinerary.user_id)
-        if owner:
-            itinerary_data["owner"] = UserPublicMinimal(
-                user_id=owner.user_id,
-                username=owner.username,
-                full_name=owner.full_name,
-                email=owner.email,
-                profile_picture=owner.profile_picture,
-                permissions="owner"  
-            )
-        else:
-            itinerary_data["owner"] = None
-        # Lấy danh sách user được share
-        shares = session.exec(
-            select(ItineraryShares).where(ItineraryShares.itinerary_id == itinerary_id)
-        ).all()
-        shared_users = []
-        for s in shares:
-            user_obj = session.get(Users, s.shared_with_user_id)
-            if user_obj:
-                shared_user_with_permission = UserPublicMinimal(
-                    user_id=user_obj.user_id,
-                    username=user_obj.username,
-                    full_name=user_obj.full_name,
-                    email=user_obj.email,
-                    profile_picture=user_obj.profile_picture,
-                    permissions=s.permission 
+            itinerary_data["hotel"] = places.get(itinerary.hotel_id)
+            if not itinerary_data["hotel"]:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Place with ID {itinerary.hotel_id} not found"
                 )
-            shared_users.append(shared_user_with_permission)
-        itinerary_data["shared_users"] = shared_users
+        itinerary_data["owner"] = self._to_user_minimal(owner, "owner") if owner else None
+        itinerary_data["shared_users"] = [
+            self._to_user_minimal(shared_users[share.shared_with_user_id], share.permission)
+            for share in shares
+            if share.shared_with_user_id in shared_users
+        ]
+        return ItineraryPublic(**itinerary_data)
+
+    def _build_itinerary_summaries(
+        self, session: Session, itineraries: List[Itineraries], user_id: Optional[UUID] = None
+    ) -> List[ItineraryPublic]:
+        """Helper method to assemble a page of feed entries, without days.
+
+        Hotels, shares, users (owners and shared users) and the favorites of
+        user_id are each loaded in one batch for the whole page. is_favorite
+        keeps the stored flag when no user_id is given.
+        """
+        itinerary_ids = [itinerary.itinerary_id for itinerary in itineraries]
+        shares_by_itinerary = crud_itinerary_share.get_by_itinerary_ids(session=session, itinerary_ids=itinerary_ids)
+        users = crud_user.get_by_ids(
+            session=session,
+            user_ids=[itinerary.user_id for itinerary in itineraries] + [
+                share.shared_with_user_id for shares in shares_by_itinerary.values() for share in shares
+            ]
+        )
+        hotels = place_service._get_places_by_ids(
+            session=session, place_ids=[itinerary.hotel_id for itinerary in itineraries if itinerary.hotel_id]
+        )
+        favorited_ids = None
+        if user_id:
+            favorited_ids = crud_favorite.get_favorited_ids(session=session, user_id=user_id, itinerary_ids=itinerary_ids)
+
+        summaries = []
+        for itinerary in itineraries:
+            itinerary_data = itinerary.dict()
+            itinerary_data["days"] = []
+            itinerary_data["hotel"] = hotels.get(itinerary.hotel_id) if itinerary.hotel_id else None
+            owner = users.get(itinerary.user_id)
+            itinerary_data["owner"] = self._to_user_minimal(owner, "owner") if owner else None
+            itinerary_data["shared_users"] = [
+                self._to_user_minimal(users[share.shared_with_user_id], share.permission)
+                for share in shares_by_itinerary[itinerary.itinerary_id]
+                if share.shared_with_user_id in users
+            ]
+            if favorited_ids is not None:
+                itinerary_data["is_favorite"] = itinerary.itinerary_id in favorited_ids
+            summaries.append(ItineraryPublic(**itinerary_data))
+        return summaries
+
+    def _load_itinerary_public(self, session: Session, itinerary_id: int) -> ItineraryPublic:
+        """Helper method to build an itinerary from the database, without the user's is_favorite"""
+        itinerary = crud_itinerary.get_tree(session=session, itinerary_id=itinerary_id)
+        if not itinerary:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Itinerary not found"
+            )
+
+        # Days, activities, owner and shares are already eager loaded
+        return self._build_itinerary_public(
+            session=session,
+            itinerary=itinerary,
+            days=itinerary.days,
+            activities_by_day={day.day_id: day.activities for day in itinerary.days},
+            owner=itinerary.user,
+            shares=itinerary.shares,
+            shared_users={
+                share.shared_with_user_id: share.shared_with_user
+                for share in itinerary.shares
+                if share.shared_with_user
+            }
+        )
+
+    def get_itinerary(
+        self,
+        session: Session,
+        itinerary_id: int,
+        current_user: Users = None,
+        include_legs: bool = False,
+        travel_mode: Optional[str] = None
+    ) -> ItineraryPublic:
+        itinerary_public = self._load_itinerary_public(session=session, itinerary_id=itinerary_id)
+
         is_favorite = False
         if current_user:
             user_id = getattr(current_user, "user_id", current_user)
@@ -131,63 +216,106 @@ class ItineraryService:
                 )
             ).first()
             is_favorite = bool(fav)
-            print(f"Is favorite: {is_favorite}")
-        itinerary_data["is_favorite"] = is_favorite
-        return ItineraryPublic(**itinerary_data)
+        itinerary_public.is_favorite = is_favorite
+        if include_legs:
+            self._attach_next_legs(days=itinerary_public.days, mode=travel_mode)
+        return itinerary_public
+
+    def get_itinerary_document(self, session: Session, itinerary_id: int, current_user: Users = None) -> bytes:
+        """Get the itinerary as a serialized ItineraryResponse, read through document_cache.
+        A cached read is a single query for the version and the user's favorite."""
+        user_id = getattr(current_user, "user_id", current_user)
+        found = crud_itinerary.get_version(session=session, itinerary_id=itinerary_id, user_id=user_id)
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Itinerary not found"
+            )
+        version, is_favorite = found
+
+        document = document_cache.get((itinerary_id, version))
+        if document is None:
+            # Built after the version was read, so a concurrent edit can only make it newer than its key
+            itinerary_public = self._load_itinerary_public(session=session, itinerary_id=itinerary_id)
+            document = itinerary_public.model_dump_json(exclude={"is_favorite"}).encode()
+            document_cache.set((itinerary_id, version), document)
+
+        # is_favorite differs per user, so it is kept out of the cached document and added here
+        return b'{"data":{"is_favorite":' + (b"true" if is_favorite else b"false") + b"," + document[1:] + b"}"
+
+    def _attach_next_legs(self, days: List[ItineraryDayPublic], mode: Optional[str] = None) -> None:
+        """Fill next_leg of every activity but the last of each day, all legs in one batch"""
+        mode = travel_matrix.resolve_mode(mode)
+        legs = [
+            (activity, following)
+            for day in days
+            for activity, following in zip(day.activities, day.activities[1:])
+            if activity.place and following.place
+        ]
+        if not legs:
+            return
+        km = travel_matrix.pair_km([(activity.place, following.place) for activity, following in legs])
+        minutes = travel_matrix.minutes(km, mode)
+        for (activity, following), distance, duration in zip(legs, km, minutes):
+            activity.next_leg = TravelLegPublic(
+                to_activity_id=following.itinerary_activity_id,
+                mode=mode,
+                distance_km=round(float(distance), 3),
+                duration_minutes=int(duration)
+            )
     
-    def get_itineraries(self, session: Session, user_id: UUID = None, destination: str = None, page: int = 1, limit: int = 10) -> Dict[str, Any]:
+    def get_itineraries(
+        self,
+        session: Session,
+        user_id: UUID = None,
+        destination: str = None,
+        page: int = 1,
+        limit: int = 10,
+        cursor: str = None
+    ) -> Dict[str, Any]:
         skip = (page - 1) * limit
+        # In cursor mode seek past the (created_at, itinerary_id) key and skip the count
+        key = decode_cursor(cursor, datetime, int)
+        after = tuple(key) if key else None
+        total_count = 0
         if user_id:
-            itineraries = crud_itinerary.get_by_user_id(session=session, user_id=str(user_id), skip=skip, limit=limit + 1)
-            total_count = crud_itinerary.get_count_by_user_id(session=session, user_id=str(user_id))
+            itineraries = crud_itinerary.get_by_user_id(
+                session=session, user_id=str(user_id), skip=skip, limit=limit + 1, after=after
+            )
+            if cursor is None:
+                total_count = crud_itinerary.get_count_by_user_id(session=session, user_id=str(user_id))
         elif destination:
-            itineraries = crud_itinerary.get_by_destination(session=session, destination=destination, skip=skip, limit=limit + 1)
-            total_count = crud_itinerary.get_count_by_destination(session=session, destination=destination)
+            itineraries = crud_itinerary.get_by_destination(
+                session=session, destination=destination, skip=skip, limit=limit + 1, after=after
+            )
+            if cursor is None:
+                total_count = crud_itinerary.get_count_by_destination(session=session, destination=destination)
         else:
-            itineraries = crud_itinerary.get_multi(session=session, skip=skip, limit=limit + 1)
-            total_count = crud_itinerary.get_count(session=session)
+            itineraries = crud_itinerary.get_multi(session=session, skip=skip, limit=limit + 1, after=after)
+            if cursor is None:
+                total_count = crud_itinerary.get_count(session=session)
 
-        total_pages = (total_count + limit - 1) // limit if limit else 1
         has_next = len(itineraries) > limit
         if has_next:
             itineraries = itineraries[:limit]
 
-        itineraries_with_data = []
-        for itinerary in itineraries:
-            itinerary_data = itinerary.dict()
-            itinerary_data["days"] = []
-            itinerary_data["hotel"] = None
-            if itinerary.hotel_id:
-                itinerary_data["hotel"] = self._get_place_with_details(session, itinerary.hotel_id)
-            # Lấy danh sách user được share
-            shares = session.exec(
-                select(ItineraryShares).where(ItineraryShares.itinerary_id == itinerary.itinerary_id)
-            ).all()
-            shared_users = []
-            for s in shares:
-                user_obj = session.get(Users, s.shared_with_user_id)
-                if user_obj:
-                    shared_user_with_permission = UserPublicMinimal(
-                        user_id=user_obj.user_id,
-                        username=user_obj.username,
-                        full_name=user_obj.full_name,
-                        email=user_obj.email,
-                        profile_picture=user_obj.profile_picture,
-                        permissions=s.permission 
-                    )
-                shared_users.append(shared_user_with_permission)
-            itinerary_data["shared_users"] = shared_users
-
-            itineraries_with_data.append(ItineraryPublic(**itinerary_data))
-
-        pagination = PaginationMetadata(
-            page=page,
-            limit=limit,
-            has_prev=page > 1,
-            has_next=has_next,
-            total_pages=total_pages
+        itineraries_with_data = self._build_itinerary_summaries(
+            session=session, itineraries=itineraries, user_id=user_id
         )
 
+        if cursor is not None:
+            last = itineraries[-1] if has_next else None
+            next_cursor = encode_cursor(last.created_at, last.itinerary_id) if last else None
+            pagination = cursor_pagination(limit=limit, cursor=cursor, next_cursor=next_cursor)
+        else:
+            pagination = PaginationMetadata(
+                page=page,
+                limit=limit,
+                has_prev=page > 1,
+                has_next=has_next,
+                total_pages=(total_count + limit - 1) // limit if limit else 1
+            )
+
         return {
             "data": itineraries_with_data,
             "pagination": pagination
@@ -206,6 +334,7 @@ class ItineraryService:
             self._get_place_with_details(session=session, place_id=itinerary_in.hotel_id)
         
         itinerary = crud_itinerary.create(session=session, itinerary_create=itinerary_in, user_id=str(user_id))
+        session.commit()
         
         # Add empty days list and hotel details as it's a new itinerary
         itinerary_data = itinerary.dict()
@@ -216,6 +345,102 @@ class ItineraryService:
         
         return ItineraryPublic(**itinerary_data)
     
+    def create_itinerary_tree(
+        self,
+        session: Session,
+        user: Users,
+        itinerary_in: ItineraryCreate,
+        days_in: List[Tuple[ItineraryDayCreate, List[ItineraryActivityCreate]]],
+        idempotency_key: Optional[str] = None,
+        places: Optional[Dict[int, PlacePublic]] = None
+    ) -> ItineraryPublic:
+        """Create an itinerary with all its days and activities in one transaction.
+
+        Everything is validated before anything is written, and a retry with the
+        same idempotency key returns the itinerary created by the first request.
+        Callers that already loaded the places (and hotel) pass them in.
+        """
+        if idempotency_key:
+            existing = crud_itinerary.get_by_idempotency_key(
+                session=session, user_id=str(user.user_id), idempotency_key=idempotency_key
+            )
+            if existing:
+                return self.get_itinerary(session=session, itinerary_id=existing.itinerary_id, current_user=user)
+
+        if itinerary_in.start_date > itinerary_in.end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Start date cannot be after end date"
+            )
+
+        # Days are numbered by date, as add_day does
+        days_in = sorted(days_in, key=lambda item: item[0].date)
+        seen_dates = set()
+        for day_number, (day_in, activities_in) in enumerate(days_in, start=1):
+            if day_in.date in seen_dates:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="This date already exists in itinerary"
+                )
+            seen_dates.add(day_in.date)
+            day_in.day_number = day_number
+
+            start_times = [activity_in.start_time for activity_in in activities_in]
+            if len(set(start_times)) != len(start_times):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Time already exists in this day"
+                )
+
+        if days_in and days_in[-1][0].date > itinerary_in.end_date:
+            itinerary_in.end_date = days_in[-1][0].date
+
+        # Check the hotel and every activity place in one batch
+        place_ids = [activity_in.place_id for _, activities_in in days_in for activity_in in activities_in]
+        if itinerary_in.hotel_id:
+            place_ids.append(itinerary_in.hotel_id)
+        if places is None:
+            places = place_service._get_places_by_ids(session=session, place_ids=place_ids)
+        missing_ids = [place_id for place_id in dict.fromkeys(place_ids) if place_id not in places]
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Places with IDs {missing_ids} not found"
+            )
+
+        try:
+            itinerary, days, activities_by_day = crud_itinerary.create_tree(
+                session=session,
+                itinerary_create=itinerary_in,
+                user_id=user.user_id,
+                days=days_in,
+                idempotency_key=idempotency_key
+            )
+        except IntegrityError:
+            # A concurrent retry with the same key got there first
+            session.rollback()
+            existing = None
+            if idempotency_key:
+                existing = crud_itinerary.get_by_idempotency_key(
+                    session=session, user_id=str(user.user_id), idempotency_key=idempotency_key
+                )
+            if not existing:
+                raise
+            return self.get_itinerary(session=session, itinerary_id=existing.itinerary_id, current_user=user)
+
+        session.commit()
+        itinerary_public = self._build_itinerary_public(
+            session=session,
+            itinerary=itinerary,
+            days=days,
+            activities_by_day=activities_by_day,
+            owner=user,
+            shares=[],
+            shared_users={},
+            places=places
+        )
+        return itinerary_public
+
     def update_itinerary(self, session: Session, user_id: UUID, itinerary_id: int, itinerary_in: ItineraryUpdate) -> ItineraryPublic:
         # Get the itinerary and verify ownership
         itinerary = self._check_edit_permission(session, user_id, itinerary_id)
@@ -242,25 +467,19 @@ class ItineraryService:
             self._get_place_with_details(session=session, place_id=itinerary_in.hotel_id)
         
         updated_itinerary = crud_itinerary.update(session=session, db_itinerary=itinerary, itinerary_in=itinerary_in)
+        crud_itinerary.bump_version(session=session, itinerary_id=itinerary_id)
+        session.commit()
         
         # Return the updated itinerary with all details
         return self.get_itinerary(session=session, itinerary_id=itinerary_id)
     
     def delete_itinerary(self, session: Session, user_id: UUID, itinerary_id: int) -> Message:
     # Get the itinerary and verify ownership
-        itinerary = self._get_user_itinerary(session, user_id, itinerary_id)
-
-        # Xóa tất cả các ngày và hoạt động liên quan
-        days = crud_itinerary.get_days(session=session, itinerary_id=itinerary_id)
-        for day in days:
-            # Xóa tất cả activity của day này
-            activities = crud_itinerary.get_activities(session=session, day_id=day.day_id)
-            for activity in activities:
-                crud_itinerary.delete_activity(session=session, activity_id=activity.itinerary_activity_id)
-            crud_itinerary.delete_day(session=session, day_id=day.day_id)
+        self._get_user_itinerary(session, user_id, itinerary_id)
 
-        # Sau khi đã xóa hết các bản ghi con, mới xóa itinerary
+        # Days, activities, shares and favorites go with it through ON DELETE CASCADE
         crud_itinerary.delete(session=session, itinerary_id=itinerary_id)
+        session.commit()
         return Message(detail="Itinerary deleted successfully")
     
     def add_day(self, session: Session, user_id: UUID, itinerary_id: int, day_in: ItineraryDayCreate) -> ItineraryDayPublic:
@@ -307,8 +526,8 @@ class ItineraryService:
             date=day_in.date
         )
         session.add(new_day)
+        crud_itinerary.bump_version(session=session, itinerary_id=itinerary_id)
         session.commit()
-        session.refresh(new_day)
 
         # Trả về kết quả
         day_data = new_day.dict()
@@ -333,22 +552,16 @@ class ItineraryService:
             session.add(itinerary)
         
         updated_day = crud_itinerary.update_day(session=session, db_day=day, day_in=day_in)
+        crud_itinerary.bump_version(session=session, itinerary_id=day.itinerary_id)
+        session.commit()
         
-        # Fetch activities for this day with full place details
+        # Fetch activities for this day, places are loaded in one batch
         activities = crud_itinerary.get_activities(session=session, day_id=day_id)
-        activities_with_place = []
-        
-        for activity in activities:
-            activity_data = activity.dict()
-            place = self._get_place_with_details(session=session, place_id=activity.place_id)
-            activity_data["place"] = place
-            activities_with_place.append(ItineraryActivityPublic(**activity_data))
-        
-        # Create ItineraryDayPublic with activities included
-        day_data = updated_day.dict()
-        day_data["activities"] = activities_with_place
-        
-        return ItineraryDayPublic(**day_data)
+        return self._build_days_public(
+            session=session,
+            days=[updated_day],
+            activities_by_day={updated_day.day_id: activities}
+        )[0]
         
     def delete_day(self, session: Session, user_id: UUID, day_id: int) -> Message:
         # Get the day
@@ -389,6 +602,7 @@ class ItineraryService:
         # Trừ 1 ngày cho end_date
         itinerary.end_date = itinerary.end_date - timedelta(days=1)
         session.add(itinerary)
+        crud_itinerary.bump_version(session=session, itinerary_id=itinerary_id)
 
         session.commit()
 
@@ -407,19 +621,20 @@ class ItineraryService:
         self._check_edit_permission(session, user_id, day.itinerary_id)
         
         # Kiểm tra trùng start_time trong ngày
-        if activity_in.start_time:
-            activities_in_day = crud_itinerary.get_activities(session=session, day_id=day_id)
-            for act in activities_in_day:
-                if act.start_time == activity_in.start_time:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Time already exists in this day"
-                    )
+        if activity_in.start_time and crud_itinerary.is_start_time_taken(
+            session=session, day_id=day_id, start_time=activity_in.start_time
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Time already exists in this day"
+            )
         
         # Verify place exists and get full details
         place = self._get_place_with_details(session=session, place_id=activity_in.place_id)
         
         activity = crud_itinerary.create_activity(session=session, day_id=day_id, activity_create=activity_in)
+        crud_itinerary.bump_version(session=session, itinerary_id=day.itinerary_id)
+        session.commit()
         
         # Create ItineraryActivityPublic with place included
         activity_data = activity.dict()
@@ -448,27 +663,18 @@ class ItineraryService:
         self._check_edit_permission(session, user_id, day.itinerary_id)
 
         # Nếu có cập nhật start_time, kiểm tra trùng trong ngày
-        if activity_in.start_time:
-            activities_in_day = crud_itinerary.get_activities(session=session, day_id=day.day_id)
-            for act in activities_in_day:
-                if act.itinerary_activity_id != activity_id and act.start_time == activity_in.start_time:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="start_time already exists in this day"
-                    )
+        if activity_in.start_time and crud_itinerary.is_start_time_taken(
+            session=session, day_id=day.day_id, start_time=activity_in.start_time, exclude_activity_id=activity_id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start_time already exists in this day"
+            )
 
         # Cập nhật activity
         updated_activity = crud_itinerary.update_activity(session=session, db_activity=activity, activity_in=activity_in)
-
-        # Sắp xếp lại các activity trong ngày theo start_time tăng dần (nếu cần)
-        activities_in_day = crud_itinerary.get_activities(session=session, day_id=day.day_id)
-        activities_sorted = sorted(activities_in_day, key=lambda x: x.start_time)
-
-        # Nếu bạn có trường thứ tự (order), hãy cập nhật lại ở đây (bỏ qua nếu không có)
-        # for idx, act in enumerate(activities_sorted):
-        #     act.order = idx + 1
-        #     session.add(act)
-        # session.commit()
+        crud_itinerary.bump_version(session=session, itinerary_id=day.itinerary_id)
+        session.commit()
 
         # Lấy thông tin place cho activity vừa cập nhật
         if activity_in.place_id:
@@ -502,8 +708,146 @@ class ItineraryService:
         self._check_edit_permission(session, user_id, day.itinerary_id)
         self._get_user_itinerary(session, user_id, day.itinerary_id)
         crud_itinerary.delete_activity(session=session, activity_id=activity_id)
+        crud_itinerary.bump_version(session=session, itinerary_id=day.itinerary_id)
+        session.commit()
         return Message(detail="Activity deleted successfully")
-    
+
+    def _optimize_days(
+        self,
+        session: Session,
+        itinerary: Itineraries,
+        days: List[ItineraryDays],
+        activities_by_day: Dict[int, List[ItineraryActivities]],
+        dry_run: bool
+    ) -> ItineraryRoutePublic:
+        """Helper method to reorder each day's activities by travel distance from the hotel.
+
+        The day keeps its time slots, activities are moved between them in
+        route order. Nothing is written when dry_run is set or no day's order changed.
+        """
+        place_ids = [
+            activity.place_id
+            for activities in activities_by_day.values()
+            for activity in activities
+        ]
+        if itinerary.hotel_id:
+            place_ids.append(itinerary.hotel_id)
+        places = place_service._get_places_by_ids(session=session, place_ids=place_ids)
+        hotel = places.get(itinerary.hotel_id) if itinerary.hotel_id else None
+        start = (hotel.latitude, hotel.longitude) if hotel else None
+
+        days_public = []
+        updates = []
+        for day in sorted(days, key=lambda d: d.day_number):
+            activities = sorted(activities_by_day.get(day.day_id, []), key=lambda a: a.start_time)
+            for activity in activities:
+                if activity.place_id not in places:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Place with ID {activity.place_id} not found"
+                    )
+            order, distance_before, distance_after = optimize_route(
+                points=[
+                    (places[activity.place_id].latitude, places[activity.place_id].longitude)
+                    for activity in activities
+                ],
+                start=start
+            )
+
+            activities_public = []
+            for slot, idx in zip([activity.start_time for activity in activities], order):
+                activity = activities[idx]
+                if activity.start_time != slot:
+                    updates.append((activity, slot))
+                activity_data = activity.dict()
+                activity_data["start_time"] = slot
+                activity_data["place"] = places[activity.place_id]
+                activities_public.append(ItineraryActivityPublic(**activity_data))
+
+            days_public.append(ItineraryDayRoutePublic(
+                day_id=day.day_id,
+                day_number=day.day_number,
+                distance_before_km=round(distance_before, 3),
+                distance_after_km=round(distance_after, 3),
+                activities=activities_public
+            ))
+
+        # A day already in route order is left untouched
+        if not dry_run and updates:
+            crud_itinerary.set_start_times(session=session, updates=updates)
+            crud_itinerary.bump_version(session=session, itinerary_id=itinerary.itinerary_id)
+            session.commit()
+
+        return ItineraryRoutePublic(
+            itinerary_id=itinerary.itinerary_id,
+            dry_run=dry_run,
+            distance_before_km=round(sum(day.distance_before_km for day in days_public), 3),
+            distance_after_km=round(sum(day.distance_after_km for day in days_public), 3),
+            days=days_public
+        )
+
+    def optimize_day(self, session: Session, user_id: UUID, day_id: int, dry_run: bool = False) -> ItineraryRoutePublic:
+        day = crud_itinerary.get_day_by_id(session=session, day_id=day_id)
+        if not day:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Day not found"
+            )
+
+        itinerary = self._check_edit_permission(session, user_id, day.itinerary_id)
+        activities = crud_itinerary.get_activities(session=session, day_id=day_id)
+        return self._optimize_days(
+            session=session,
+            itinerary=itinerary,
+            days=[day],
+            activities_by_day={day_id: activities},
+            dry_run=dry_run
+        )
+
+    def optimize_itinerary(self, session: Session, user_id: UUID, itinerary_id: int, dry_run: bool = False) -> ItineraryRoutePublic:
+        itinerary = self._check_edit_permission(session, user_id, itinerary_id)
+        days = crud_itinerary.get_days(session=session, itinerary_id=itinerary_id)
+        activities_by_day = crud_itinerary.get_activities_by_day_ids(
+            session=session, day_ids=[day.day_id for day in days]
+        )
+        return self._optimize_days(
+            session=session,
+            itinerary=itinerary,
+            days=days,
+            activities_by_day=activities_by_day,
+            dry_run=dry_run
+        )
+
+    def schedule_day(self, session: Session, user_id: UUID, day_id: int) -> ItineraryDayPublic:
+        """Reassign a day's start times from travel and visit times, keeping the visit order
+        and moving restaurants into meal times"""
+        day = crud_itinerary.get_day_by_id(session=session, day_id=day_id)
+        if not day:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Day not found"
+            )
+
+        itinerary = self._check_edit_permission(session, user_id, day.itinerary_id)
+        activities = crud_itinerary.get_activities(session=session, day_id=day_id)
+        schedule = activity_scheduler.schedule_place_ids(
+            session=session,
+            place_ids=[activity.place_id for activity in activities],
+            hotel_id=itinerary.hotel_id
+        )
+        crud_itinerary.set_start_times(
+            session=session,
+            updates=[(activities[idx], start_time) for idx, start_time in schedule]
+        )
+        crud_itinerary.bump_version(session=session, itinerary_id=day.itinerary_id)
+        session.commit()
+
+        return self._build_days_public(
+            session=session,
+            days=[day],
+            activities_by_day={day_id: activities}
+        )[0]
+
     def _get_user_itinerary(self, session: Session, user_id: UUID, itinerary_id: int) -> Itineraries:
         """Helper method to get an itinerary and verify user ownership"""
         itinerary = crud_itinerary.get_by_id(session=session, itinerary_id=itinerary_id)
@@ -6,9 +6,13 @@ from app.models import (
     Message, ItineraryShares, Users, Itineraries,
     PaginationMetadata, ItinerarySharePublic, ItineraryPublic,Places,UserPublicMinimal
 )
+from app.core.pagination import cursor_pagination, decode_cursor, encode_cursor
 from app.services.places.place_service import place_service
+from app.crud.itineraries.crud_itinerary import crud_itinerary
 from app.crud.itineraries.crud_itinerary_share import crud_itinerary_share
-from app.services.fcm.fcm_service import fcm_service
+from app.crud.fcm.crud_notification_outbox import crud_notification_outbox
+from app.services.itineraries.itinerary_service import itinerary_service
+from app.services.fcm.notification_dispatcher import notification_dispatcher
 
 
 class ItineraryShareService:
@@ -30,6 +34,33 @@ class ItineraryShareService:
             shared_with_user=shared_user
         )
 
+    def _decode_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """Helper method to get the share_id a cursor seeks past"""
+        key = decode_cursor(cursor, int)
+        return key[0] if key else None
+
+    def _get_pagination(
+        self,
+        shares: List[ItineraryShares],
+        page: int,
+        limit: int,
+        has_next: bool,
+        cursor: Optional[str],
+        total_items: Optional[int]
+    ) -> PaginationMetadata:
+        """Helper method to build pagination, only counting rows in page mode"""
+        if cursor is not None:
+            next_cursor = encode_cursor(shares[-1].share_id) if has_next else None
+            return cursor_pagination(limit=limit, cursor=cursor, next_cursor=next_cursor)
+
+        return PaginationMetadata(
+            page=page,
+            limit=limit,
+            has_prev=page > 1,
+            has_next=has_next,
+            total_pages=(total_items + limit - 1) // limit if limit else 1
+        )
+
     def get_share(self, session: Session, share_id: int) -> ItinerarySharePublic:
         share = crud_itinerary_share.get_by_id(session=session, share_id=share_id)
         if not share:
@@ -40,13 +71,19 @@ class ItineraryShareService:
         
         return self._get_share_with_details(session=session, share=share)
     
-    def get_shares(self, session: Session, page: int = 1, limit: int = 10) -> Dict[str, Any]:
+    def get_shares(
+        self, session: Session, page: int = 1, limit: int = 10, cursor: str = None
+    ) -> Dict[str, Any]:
         skip = (page - 1) * limit
+        after_id = self._decode_cursor(cursor)
 
         # Get one more item than the requested limit to check if there's a next page
-        shares = crud_itinerary_share.get_multi(session=session, skip=skip, limit=limit + 1)
-        total_items = crud_itinerary_share.get_count(session=session)
-        total_pages = (total_items + limit - 1) // limit if limit else 1
+        shares = crud_itinerary_share.get_multi(
+            session=session, skip=skip, limit=limit + 1, after_id=after_id
+        )
+        total_items = None
+        if cursor is None:
+            total_items = crud_itinerary_share.get_count(session=session)
 
         has_next = len(shares) > limit
         if has_next:
@@ -56,12 +93,8 @@ class ItineraryShareService:
         for share in shares:
             shares_with_details.append(self._get_share_with_details(session=session, share=share))
 
-        pagination = PaginationMetadata(
-            page=page,
-            limit=limit,
-            has_prev=page > 1,
-            has_next=has_next,
-            total_pages=total_pages
+        pagination = self._get_pagination(
+            shares=shares, page=page, limit=limit, has_next=has_next, cursor=cursor, total_items=total_items
         )
 
         return {
@@ -69,7 +102,9 @@ class ItineraryShareService:
             "pagination": pagination
         }
     
-    def get_shares_by_itinerary(self, session: Session, itinerary_id: int, page: int = 1, limit: int = 10) -> Dict[str, Any]:
+    def get_shares_by_itinerary(
+        self, session: Session, itinerary_id: int, page: int = 1, limit: int = 10, cursor: str = None
+    ) -> Dict[str, Any]:
         # Check if itinerary exists
         itinerary = session.get(Itineraries, itinerary_id)
         if not itinerary:
@@ -79,9 +114,15 @@ class ItineraryShareService:
             )
         
         skip = (page - 1) * limit
-        shares = crud_itinerary_share.get_by_itinerary_id(session=session, itinerary_id=itinerary_id, skip=skip, limit=limit + 1)
-        total_items = crud_itinerary_share.get_count_by_itinerary_id(session=session, itinerary_id=itinerary_id)
-        total_pages = (total_items + limit - 1) // limit if limit else 1
+        after_id = self._decode_cursor(cursor)
+
+        # Get one more item than the requested limit to check if there's a next page
+        shares = crud_itinerary_share.get_by_itinerary_id(
+            session=session, itinerary_id=itinerary_id, skip=skip, limit=limit + 1, after_id=after_id
+        )
+        total_items = None
+        if cursor is None:
+            total_items = crud_itinerary_share.get_count_by_itinerary_id(session=session, itinerary_id=itinerary_id)
 
         has_next = len(shares) > limit
         if has_next:
@@ -91,12 +132,8 @@ class ItineraryShareService:
         for share in shares:
             shares_with_details.append(self._get_share_with_details(session=session, share=share))
 
-        pagination = PaginationMetadata(
-            page=page,
-            limit=limit,
-            has_prev=page > 1,
-            has_next=has_next,
-            total_pages=total_pages
+        pagination = self._get_pagination(
+            shares=shares, page=page, limit=limit, has_next=has_next, cursor=cursor, total_items=total_items
         )
 
         return {
@@ -104,7 +141,9 @@ class ItineraryShareService:
             "pagination": pagination
         }
     
-    def get_shares_by_user(self, session: Session, shared_with_user_id: uuid.UUID, page: int = 1, limit: int = 10) -> Dict[str, Any]:
+    def get_shares_by_user(
+        self, session: Session, shared_with_user_id: uuid.UUID, page: int = 1, limit: int = 10, cursor: str = None
+    ) -> Dict[str, Any]:
         # Check if user exists
         user = session.get(Users, shared_with_user_id)
         if not user:
@@ -114,9 +153,15 @@ class ItineraryShareService:
             )
         
         skip = (page - 1) * limit
-        shares = crud_itinerary_share.get_by_shared_user_id(session=session, shared_with_user_id=shared_with_user_id, skip=skip, limit=limit + 1)
-        total_items = crud_itinerary_share.get_count_by_shared_user_id(session=session, shared_with_user_id=shared_with_user_id)
-        total_pages = (total_items + limit - 1) // limit if limit else 1
+        after_id = self._decode_cursor(cursor)
+
+        # Get one more item than the requested limit to check if there's a next page
+        shares = crud_itinerary_share.get_by_shared_user_id(
+            session=session, shared_with_user_id=shared_with_user_id, skip=skip, limit=limit + 1, after_id=after_id
+        )
+        total_items = None
+        if cursor is None:
+            total_items = crud_itinerary_share.get_count_by_shared_user_id(session=session, shared_with_user_id=shared_with_user_id)
 
         has_next = len(shares) > limit
         if has_next:
@@ -126,12 +171,8 @@ class ItineraryShareService:
         for share in shares:
             shares_with_details.append(self._get_share_with_details(session=session, share=share))
 
-        pagination = PaginationMetadata(
-            page=page,
-            limit=limit,
-            has_prev=page > 1,
-            has_next=has_next,
-            total_pages=total_pages
+        pagination = self._get_pagination(
+            shares=shares, page=page, limit=limit, has_next=has_next, cursor=cursor, total_items=total_items
         )
 
         return {
@@ -139,11 +180,19 @@ class ItineraryShareService:
             "pagination": pagination
         }
     
-    def get_shares_by_permission(self, session: Session, permission: str, page: int = 1, limit: int = 10) -> Dict[str, Any]:
+    def get_shares_by_permission(
+        self, session: Session, permission: str, page: int = 1, limit: int = 10, cursor: str = None
+    ) -> Dict[str, Any]:
         skip = (page - 1) * limit
-        shares = crud_itinerary_share.get_by_permission(session=session, permission=permission, skip=skip, limit=limit + 1)
-        total_items = crud_itinerary_share.get_count_by_permission(session=session, permission=permission)
-        total_pages = (total_items + limit - 1) // limit if limit else 1
+        after_id = self._decode_cursor(cursor)
+
+        # Get one more item than the requested limit to check if there's a next page
+        shares = crud_itinerary_share.get_by_permission(
+            session=session, permission=permission, skip=skip, limit=limit + 1, after_id=after_id
+        )
+        total_items = None
+        if cursor is None:
+            total_items = crud_itinerary_share.get_count_by_permission(session=session, permission=permission)
 
         has_next = len(shares) > limit
         if has_next:
@@ -153,12 +202,8 @@ class ItineraryShareService:
         for share in shares:
             shares_with_details.append(self._get_share_with_details(session=session, share=share))
 
-        pagination = PaginationMetadata(
-            page=page,
-            limit=limit,
-            has_prev=page > 1,
-            has_next=has_next,
-            total_pages=total_pages
+        pagination = self._get_pagination(
+            shares=shares, page=page, limit=limit, has_next=has_next, cursor=cursor, total_items=total_items
         )
 
         return {
@@ -195,27 +240,31 @@ class ItineraryShareService:
                 detail="Itinerary is already shared with this user"
             )
         
+        # Queue the notification first so it commits together with the share
+        owner = session.get(Users, itinerary.user_id)
+        if owner:
+            crud_notification_outbox.enqueue(
+                session=session,
+                user_id=shared_with_user_id,
+                kind="itinerary_share",
+                title="Share new itinerary",
+                body=f"{owner.full_name} shared a new itinerary with you",
+                data={
+                    "type": "itinerary_share",
+                    "itinerary_id": str(itinerary_id),
+                    "permission": permission
+                }
+            )
+
         share = crud_itinerary_share.create(
             session=session, 
             itinerary_id=itinerary_id, 
             shared_with_user_id=shared_with_user_id, 
             permission=permission
         )
-
-        # Get owner info and send notification
-        owner = session.get(Users, itinerary.user_id)
-        if owner:
-            try:
-                fcm_service.send_share_notification(
-                    session=session,
-                    shared_with_user_id=str(shared_with_user_id),
-                    owner_name=owner.full_name,
-                    itinerary_id=str(itinerary_id),
-                    permission=permission
-                )
-            except Exception:
-                # Log error but continue if notification fails
-                pass
+        crud_itinerary.bump_version(session=session, itinerary_id=itinerary_id)
+        session.commit()
+        notification_dispatcher.wake()
         
         return self._get_share_with_details(session=session, share=share)
     def update_permissions_for_shared_users(
@@ -265,6 +314,9 @@ class ItineraryShareService:
                 detail="; ".join(errors)
             )
 
+        if updated_shares:
+            crud_itinerary.bump_version(session=session, itinerary_id=itinerary_id)
+        session.commit()
         return updated_shares
     
     def update_share_permission(self, session: Session, share_id: int, permission: str, user_id: uuid.UUID) -> ItinerarySharePublic:
@@ -301,6 +353,8 @@ class ItineraryShareService:
             db_share=share, 
             permission=permission
         )
+        crud_itinerary.bump_version(session=session, itinerary_id=share.itinerary_id)
+        session.commit()
         
         return self._get_share_with_details(session=session, share=updated_share)
     
@@ -327,6 +381,8 @@ class ItineraryShareService:
             )
 
         crud_itinerary_share.delete(session=session, share_id=share_id)
+        crud_itinerary.bump_version(session=session, itinerary_id=itinerary.itinerary_id)
+        session.commit()
         return Message(detail="Itinerary share deleted successfully")
     
     def delete_share_by_itinerary_and_user(self, session: Session, itinerary_id: int, shared_with_user_id: uuid.UUID, user_id: uuid.UUID) -> Message:
@@ -352,10 +408,12 @@ class ItineraryShareService:
             itinerary_id=itinerary_id, 
             shared_with_user_id=shared_with_user_id
         )
+        crud_itinerary.bump_version(session=session, itinerary_id=itinerary_id)
+        session.commit()
         return Message(detail="Itinerary share deleted successfully")
     
     def get_shared_itineraries_for_user(
-        self, session: Session, shared_with_user_id: uuid.UUID, page: int = 1, limit: int = 10
+        self, session: Session, shared_with_user_id: uuid.UUID, page: int = 1, limit: int = 10, cursor: str = None
     ) -> Dict[str, Any]:
         # Check if user exists
         user = session.get(Users, shared_with_user_id)
@@ -366,73 +424,32 @@ class ItineraryShareService:
             )
 
         skip = (page - 1) * limit
+        after_id = self._decode_cursor(cursor)
         shares = crud_itinerary_share.get_by_shared_user_id(
-            session=session, shared_with_user_id=shared_with_user_id, skip=skip, limit=limit + 1
-        )
-        total_items = crud_itinerary_share.get_count_by_shared_user_id(
-            session=session, shared_with_user_id=shared_with_user_id
+            session=session, shared_with_user_id=shared_with_user_id, skip=skip, limit=limit + 1, after_id=after_id
         )
-        total_pages = (total_items + limit - 1) // limit if limit else 1
+        total_items = None
+        if cursor is None:
+            total_items = crud_itinerary_share.get_count_by_shared_user_id(
+                session=session, shared_with_user_id=shared_with_user_id
+            )
 
         has_next = len(shares) > limit
         if has_next:
             shares = shares[:limit]
 
-        itineraries = []
-        for share in shares:
-            itinerary = session.get(Itineraries, share.itinerary_id)
-            if itinerary:
-                itinerary_data = itinerary.dict()
-                itinerary_data["days"] = []
-                share_objs = session.exec(
-                    select(ItineraryShares).where(ItineraryShares.itinerary_id == itinerary.itinerary_id)
-                ).all()
-                shared_users = []
-                for s in share_objs:
-                    user_obj = session.get(Users, s.shared_with_user_id)
-                    if user_obj:
-                        shared_user_with_permission = UserPublicMinimal(
-                            user_id=user_obj.user_id,
-                            username=user_obj.username,
-                            full_name=user_obj.full_name,
-                            email=user_obj.email,
-                            profile_picture=user_obj.profile_picture,
-                            permissions=s.permission 
-                        )
-                    shared_users.append(shared_user_with_permission)
-                itinerary_data["shared_users"] = shared_users
-                
-                # Lấy thông tin hotel nếu có
-                if itinerary.hotel_id:
-                    hotel_place = session.get(Places, itinerary.hotel_id)
-                    if hotel_place:
-                        itinerary_data["hotel"] = place_service._get_place_with_details(session, hotel_place)
-                    else:
-                        itinerary_data["hotel"] = None
-                else:
-                    itinerary_data["hotel"] = None        
-                # Lấy thông tin chủ sở hữu itinerary
-                owner = session.get(Users, itinerary.user_id)
-                if owner:
-                    itinerary_data["owner"] = UserPublicMinimal(
-                        user_id=owner.user_id,
-                        username=owner.username,
-                        full_name=owner.full_name,
-                        email=owner.email,
-                        profile_picture=owner.profile_picture,
-                        permissions="owner"  
-                    )
-                else:
-                    itinerary_data["owner"] = None
-            
-                itineraries.append(ItineraryPublic(**itinerary_data))
-
-        pagination = PaginationMetadata(
-            page=page,
-            limit=limit,
-            has_prev=page > 1,
-            has_next=has_next,
-            total_pages=total_pages
+        # Itineraries of the page in share order, each entity type loaded in one batch
+        itineraries_by_id = crud_itinerary.get_by_ids(
+            session=session, itinerary_ids=[share.itinerary_id for share in shares]
+        )
+        itineraries = itinerary_service._build_itinerary_summaries(
+            session=session,
+            itineraries=[itineraries_by_id[share.itinerary_id] for share in shares if share.itinerary_id in itineraries_by_id],
+            user_id=shared_with_user_id
+        )
+
+        pagination = self._get_pagination(
+            shares=shares, page=page, limit=limit, has_next=has_next, cursor=cursor, total_items=total_items
         )
 
         return {
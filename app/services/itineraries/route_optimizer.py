@@ -0,0 +1,90 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.places.spatial_index import haversine_km_array
+
+# 2-opt stops after this many passes over the tour even if it could still improve
+MAX_TWO_OPT_PASSES = 50
+
+
+def distance_matrix(lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Pairwise great-circle distances in kilometers, computed in one vectorized pass"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    return haversine_km_array(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+
+def tour_length(dist: np.ndarray, tour: Sequence[int]) -> float:
+    """Length of the closed tour, back to where it started"""
+    tour = np.asarray(tour)
+    return float(dist[tour, np.roll(tour, -1)].sum())
+
+
+def _nearest_neighbour(dist: np.ndarray) -> np.ndarray:
+    n = len(dist)
+    tour = np.empty(n, dtype=int)
+    visited = np.zeros(n, dtype=bool)
+    tour[0] = 0
+    visited[0] = True
+    for k in range(1, n):
+        candidates = np.where(visited, np.inf, dist[tour[k - 1]])
+        tour[k] = int(np.argmin(candidates))
+        visited[tour[k]] = True
+    return tour
+
+
+def _two_opt(dist: np.ndarray, tour: np.ndarray) -> np.ndarray:
+    """Reverse segments while that shortens the tour, node 0 stays first.
+
+    For each segment start all segment ends are scored at once, and the
+    best improving reversal is applied.
+    """
+    n = len(tour)
+    for _ in range(MAX_TWO_OPT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            ends = np.arange(i + 1, n)
+            a, b = tour[i - 1], tour[i]
+            c, d = tour[ends], tour[(ends + 1) % n]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                j = ends[best]
+                tour[i:j + 1] = tour[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return tour
+
+
+def optimize_route(
+    points: List[Tuple[float, float]],
+    start: Optional[Tuple[float, float]] = None
+) -> Tuple[List[int], float, float]:
+    """Order points to minimize travel distance.
+
+    With a start (the hotel) the route leaves from and returns to it,
+    otherwise it is an open path between any two of the points. Returns the
+    new order as indexes into points, and the distance in km of the given
+    order and of the new one.
+    """
+    if not points:
+        return [], 0.0, 0.0
+
+    lats = [lat for lat, _ in points]
+    lons = [lon for _, lon in points]
+    if start is not None:
+        dist = distance_matrix([start[0]] + lats, [start[1]] + lons)
+    else:
+        # A depot at zero distance from every point turns the closed tour into an open path
+        dist = np.zeros((len(points) + 1, len(points) + 1))
+        dist[1:, 1:] = distance_matrix(lats, lons)
+
+    current = np.arange(len(points) + 1)
+    tour = _two_opt(dist, _nearest_neighbour(dist))
+    before = tour_length(dist, current)
+    after = tour_length(dist, tour)
+    if after >= before:
+        return list(range(len(points))), before, before
+    return [int(node) - 1 for node in tour[1:]], before, after
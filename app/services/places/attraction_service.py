@@ -79,11 +79,14 @@ class AttractionService:
                 detail="Attraction detail already exists for this place"
             )
         
-        return crud_attraction.create(
+        attraction_detail = crud_attraction.create(
             session=session, 
             place_id=place_id, 
             attraction_detail_create=attraction_detail_in
         )
+        session.commit()
+        place_service.invalidate_place(place_id)
+        return attraction_detail
     
     def update_attraction_detail(self, session: Session, place_id: int, attraction_detail_in: AttractionDetailUpdate) -> AttractionDetails:
         # Check if place exists
@@ -97,11 +100,14 @@ class AttractionService:
                 detail="Attraction detail not found for this place"
             )
         
-        return crud_attraction.update(
+        attraction_detail = crud_attraction.update(
             session=session, 
             db_attraction_detail=db_attraction_detail, 
             attraction_detail_in=attraction_detail_in
         )
+        session.commit()
+        place_service.invalidate_place(place_id)
+        return attraction_detail
     
     def delete_attraction_detail(self, session: Session, place_id: int) -> Message:
         # Check if place exists
@@ -116,6 +122,8 @@ class AttractionService:
             )
         
         crud_attraction.delete_by_place_id(session=session, place_id=place_id)
+        session.commit()
+        place_service.invalidate_place(place_id)
         return Message(detail="Attraction detail deleted successfully")
 
 attraction_service = AttractionService()
\ No newline at end of file
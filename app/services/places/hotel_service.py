@@ -79,11 +79,14 @@ class HotelService:
                 detail="Hotel detail already exists for this place"
             )
         
-        return crud_hotel_detail.create(
+        hotel_detail = crud_hotel_detail.create(
             session=session, 
             place_id=place_id, 
             hotel_detail_create=hotel_detail_in
         )
+        session.commit()
+        place_service.invalidate_place(place_id)
+        return hotel_detail
     
     def update_hotel_detail(self, session: Session, place_id: int, hotel_detail_in: HotelDetailUpdate) -> HotelDetails:
         # Check if place exists
@@ -97,11 +100,14 @@ class HotelService:
                 detail="Hotel detail not found for this place"
             )
         
-        return crud_hotel_detail.update(
+        hotel_detail = crud_hotel_detail.update(
             session=session, 
             db_hotel_detail=db_hotel_detail, 
             hotel_detail_in=hotel_detail_in
         )
+        session.commit()
+        place_service.invalidate_place(place_id)
+        return hotel_detail
     
     def delete_hotel_detail(self, session: Session, place_id: int) -> Message:
         # Check if place exists
@@ -116,6 +122,8 @@ class HotelService:
             )
         
         crud_hotel_detail.delete_by_place_id(session=session, place_id=place_id)
+        session.commit()
+        place_service.invalidate_place(place_id)
         return Message(detail="Hotel detail deleted successfully")
 
 hotel_service = HotelService()
\ No newline at end of file
@@ -8,55 +8,102 @@ from app.models import (
     RestaurantDetailPublic, HotelDetailPublic, AttractionDetailPublic,
     PaginationMetadata, PaginatedResponse
 )
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.pagination import cursor_pagination, decode_cursor, encode_cursor
 from app.crud.places.crud_place import crud_place
+from app.crud.places.crud_restaurant import crud_restaurant
+from app.crud.places.crud_hotel import crud_hotel_detail
+from app.crud.places.crud_attraction import crud_attraction
+from app.services.places.spatial_index import place_spatial_index
+
+# Read-through cache of fully hydrated places (photos and details) keyed by place_id
+place_cache: LRUCache[PlacePublic] = LRUCache(
+    name="places",
+    max_size=settings.PLACE_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PLACE_CACHE_TTL_SECONDS
+)
 
 class PlaceService:
     def _get_place_with_details(self, session: Session, place: Places) -> PlacePublic:
         """Helper method to get place with all details"""
-        # Convert to dict to build PlacePublic
-        place_data = place.dict()
-        
+        return self._get_places_with_details(session=session, places=[place])[0]
+
+    def _get_places_with_details(self, session: Session, places: List[Places]) -> List[PlacePublic]:
+        """Helper method to get a list of places with all details.
+
+        Photos and type-specific details are loaded for the whole list at once,
+        so the number of queries does not grow with the number of places.
+        """
+        if not places:
+            return []
+
+        place_ids = [place.place_id for place in places]
+        ids_by_type: Dict[str, List[int]] = {"RESTAURANT": [], "HOTEL": [], "ATTRACTION": []}
+        for place in places:
+            place_type = place.type.upper()
+            if place_type in ids_by_type:
+                ids_by_type[place_type].append(place.place_id)
+
         # Get photos
-        photos = crud_place.get_photos(session=session, place_id=place.place_id)
-        place_data["photos"] = photos
-        
-        # Get details based on place type
-        place_data["restaurant_detail"] = None
-        place_data["hotel_detail"] = None
-        place_data["attraction_detail"] = None
-        
-        if place.type.upper() == "RESTAURANT":
-            restaurant_detail = session.exec(
-                select(RestaurantDetails).where(RestaurantDetails.place_id == place.place_id)
-            ).first()
-            if restaurant_detail:
-                place_data["restaurant_detail"] = RestaurantDetailPublic(**restaurant_detail.dict())
-        
-        elif place.type.upper() == "HOTEL":
-            hotel_detail = session.exec(
-                select(HotelDetails).where(HotelDetails.place_id == place.place_id)
-            ).first()
-            if hotel_detail:
-                place_data["hotel_detail"] = HotelDetailPublic(**hotel_detail.dict())
-        
-        elif place.type.upper() == "ATTRACTION":
-            attraction_detail = session.exec(
-                select(AttractionDetails).where(AttractionDetails.place_id == place.place_id)
-            ).first()
-            if attraction_detail:
-                place_data["attraction_detail"] = AttractionDetailPublic(**attraction_detail.dict())
-        
-        return PlacePublic(**place_data)
+        photos_by_place: Dict[int, List[PlacePhotoPublic]] = {place_id: [] for place_id in place_ids}
+        for photo in crud_place.get_photos_by_place_ids(session=session, place_ids=place_ids):
+            photos_by_place[photo.place_id].append(PlacePhotoPublic(**photo.dict()))
+
+        # Get details based on place type, keeping the first detail row of each place
+        restaurant_details: Dict[int, RestaurantDetailPublic] = {}
+        for detail in crud_restaurant.get_by_place_ids(session=session, place_ids=ids_by_type["RESTAURANT"]):
+            restaurant_details.setdefault(detail.place_id, RestaurantDetailPublic(**detail.dict()))
+
+        hotel_details: Dict[int, HotelDetailPublic] = {}
+        for detail in crud_hotel_detail.get_by_place_ids(session=session, place_ids=ids_by_type["HOTEL"]):
+            hotel_details.setdefault(detail.place_id, HotelDetailPublic(**detail.dict()))
+
+        attraction_details: Dict[int, AttractionDetailPublic] = {}
+        for detail in crud_attraction.get_by_place_ids(session=session, place_ids=ids_by_type["ATTRACTION"]):
+            attraction_details.setdefault(detail.place_id, AttractionDetailPublic(**detail.dict()))
+
+        places_with_details = []
+        for place in places:
+            # Convert to dict to build PlacePublic
+            place_data = place.dict()
+            place_data["photos"] = photos_by_place[place.place_id]
+            place_data["restaurant_detail"] = restaurant_details.get(place.place_id)
+            place_data["hotel_detail"] = hotel_details.get(place.place_id)
+            place_data["attraction_detail"] = attraction_details.get(place.place_id)
+            places_with_details.append(PlacePublic(**place_data))
+
+        return places_with_details
+
+    def _get_places_by_ids(self, session: Session, place_ids: List[int]) -> Dict[int, PlacePublic]:
+        """Helper method to get places with all details keyed by place_id, read
+        through place_cache. Unknown ids are left out of the result."""
+        unique_ids = list(dict.fromkeys(place_ids))
+        found = place_cache.get_many(unique_ids)
+        missing_ids = [place_id for place_id in unique_ids if place_id not in found]
+        if missing_ids:
+            places = crud_place.get_by_ids(session=session, place_ids=missing_ids)
+            loaded = {
+                place.place_id: place
+                for place in self._get_places_with_details(session=session, places=places)
+            }
+            place_cache.set_many(loaded)
+            found.update(loaded)
+        return {place_id: found[place_id] for place_id in unique_ids if place_id in found}
+
+    def invalidate_place(self, place_id: int) -> None:
+        """Drop a place from place_cache after it or its photos/details change"""
+        place_cache.invalidate(place_id)
 
     def get_place(self, session: Session, place_id: int) -> PlacePublic:
-        place = crud_place.get_by_id(session=session, place_id=place_id)
+        place = self._get_places_by_ids(session=session, place_ids=[place_id]).get(place_id)
         if not place:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Place not found"
             )
         
-        return self._get_place_with_details(session=session, place=place)
+        return place
     
     def get_places(self, session: Session, page: int = 1, limit: int = 10) -> Dict[str, Any]:
         skip = (page - 1) * limit
@@ -70,9 +117,7 @@ class PlaceService:
         if has_next:
             places = places[:limit]
 
-        places_with_details = []
-        for place in places:
-            places_with_details.append(self._get_place_with_details(session=session, place=place))
+        places_with_details = self._get_places_with_details(session=session, places=places)
 
         pagination = PaginationMetadata(
             page=page,
@@ -97,9 +142,7 @@ class PlaceService:
         if has_next:
             places = places[:limit]
 
-        places_with_details = []
-        for place in places:
-            places_with_details.append(self._get_place_with_details(session=session, place=place))
+        places_with_details = self._get_places_with_details(session=session, places=places)
 
         pagination = PaginationMetadata(
             page=page,
@@ -125,9 +168,7 @@ class PlaceService:
         if has_next:
             places = places[:limit]
 
-        places_with_details = []
-        for place in places:
-            places_with_details.append(self._get_place_with_details(session=session, place=place))
+        places_with_details = self._get_places_with_details(session=session, places=places)
 
         pagination = PaginationMetadata(
             page=page,
@@ -151,37 +192,16 @@ class PlaceService:
     ) -> Dict[str, Any]:
         skip = (page - 1) * limit
 
-        statement = (
-            select(Places)
-            .where(
-                (Places.type == type.upper()) &
-                (
-                    Places.name.ilike(f"%{query}%") |
-                    Places.address.ilike(f"%{query}%")
-                )
-            )
-            .offset(skip)
-            .limit(limit + 1)
-        )
-        results = session.exec(statement).all()
+        # Ranked by relevance, get one more item than the limit to check if there's a next page
+        results = crud_place.search(session=session, query=query, type=type, skip=skip, limit=limit + 1)
         has_next = len(results) > limit
         if has_next:
             results = results[:limit]
 
-        count_stmt = (
-            select(Places)
-            .where(
-                (Places.type == type.upper()) &
-                (
-                    Places.name.ilike(f"%{query}%") |
-                    Places.address.ilike(f"%{query}%")
-                )
-            )
-        )
-        total_items = len(session.exec(count_stmt).all())
+        total_items = crud_place.get_search_count(session=session, query=query, type=type)
         total_pages = (total_items + limit - 1) // limit if limit else 1
 
-        places = [self._get_place_with_details(session, place) for place in results]
+        places = self._get_places_with_details(session=session, places=results)
         pagination = PaginationMetadata(
             page=page,
             limit=limit,
@@ -202,9 +222,120 @@ class PlaceService:
         if has_next:
             places = places[:limit]
 
-        places_with_details = []
-        for place in places:
-            places_with_details.append(self._get_place_with_details(session=session, place=place))
+        places_with_details = self._get_places_with_details(session=session, places=places)
+
+        pagination = PaginationMetadata(
+            page=page,
+            limit=limit,
+            has_prev=page > 1,
+            has_next=has_next,
+            total_pages=total_pages
+        )
+
+        return {
+            "data": places_with_details,
+            "pagination": pagination
+        }
+    
+    def get_places_by_cursor(
+        self,
+        session: Session,
+        cursor: str = None,
+        city: str = None,
+        type: str = None,
+        limit: int = 10
+    ) -> Dict[str, Any]:
+        """Cursor mode for the place list, seeks on place_id and skips the count"""
+        key = decode_cursor(cursor, int)
+        after_id = key[0] if key else None
+
+        if city and type:
+            places = crud_place.get_by_city_and_type(
+                session=session, city=city, type=type, limit=limit + 1, after_id=after_id
+            )
+        elif city:
+            places = crud_place.get_by_city(session=session, city=city, limit=limit + 1, after_id=after_id)
+        elif type:
+            places = crud_place.get_by_type(session=session, type=type, limit=limit + 1, after_id=after_id)
+        else:
+            places = crud_place.get_multi(session=session, limit=limit + 1, after_id=after_id)
+
+        has_next = len(places) > limit
+        if has_next:
+            places = places[:limit]
+        next_cursor = encode_cursor(places[-1].place_id) if has_next else None
+
+        return {
+            "data": self._get_places_with_details(session=session, places=places),
+            "pagination": cursor_pagination(limit=limit, cursor=cursor, next_cursor=next_cursor)
+        }
+
+    def _get_places_with_distances(self, session: Session, matches: List[Tuple[int, float]]) -> List[PlacePublic]:
+        """Helper method to hydrate (place_id, distance_km) pairs, keeping their order"""
+        places = self._get_places_by_ids(session=session, place_ids=[place_id for place_id, _ in matches])
+        return [
+            places[place_id].model_copy(update={"distance_km": round(distance, 3)})
+            for place_id, distance in matches
+            if place_id in places
+        ]
+
+    def get_nearby_places(
+        self,
+        session: Session,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        type: Optional[str] = None,
+        page: int = 1,
+        limit: int = 10
+    ) -> Dict[str, Any]:
+        skip = (page - 1) * limit
+
+        matches = place_spatial_index.within_radius(
+            session=session, lat=lat, lon=lon, radius_km=radius_km, type=type
+        )
+        total_items = len(matches)
+        total_pages = (total_items + limit - 1) // limit if limit else 1
+
+        places_with_details = self._get_places_with_distances(session=session, matches=matches[skip:skip + limit])
+
+        pagination = PaginationMetadata(
+            page=page,
+            limit=limit,
+            has_prev=page > 1,
+            has_next=skip + limit < total_items,
+            total_pages=total_pages
+        )
+
+        return {
+            "data": places_with_details,
+            "pagination": pagination
+        }
+
+    def get_places_by_distance(
+        self,
+        session: Session,
+        lat: float,
+        lon: float,
+        city: Optional[str] = None,
+        type: Optional[str] = None,
+        page: int = 1,
+        limit: int = 10
+    ) -> Dict[str, Any]:
+        skip = (page - 1) * limit
+
+        # Get one more item than the requested limit to check if there's a next page
+        matches = place_spatial_index.nearest(
+            session=session, lat=lat, lon=lon, k=skip + limit + 1, type=type, city=city
+        )[skip:]
+        total_items = place_spatial_index.count(session=session, type=type, city=city)
+        total_pages = (total_items + limit - 1) // limit if limit else 1
+
+        has_next = len(matches) > limit
+        if has_next:
+            matches = matches[:limit]
+
+        places_with_details = self._get_places_with_distances(session=session, matches=matches)
 
         pagination = PaginationMetadata(
             page=page,
@@ -221,6 +352,8 @@ class PlaceService:
     
     def create_place(self, session: Session, place_in: PlaceCreate) -> PlacePublic:
         place = crud_place.create(session=session, place_create=place_in)
+        session.commit()
+        place_spatial_index.invalidate()
         
         # Return place with empty details as it's a new place
         return self._get_place_with_details(session=session, place=place)
@@ -234,6 +367,9 @@ class PlaceService:
             )
         
         updated_place = crud_place.update(session=session, db_place=place, place_in=place_in)
+        session.commit()
+        self.invalidate_place(place_id)
+        place_spatial_index.invalidate()
         
         return self._get_place_with_details(session=session, place=updated_place)
     
@@ -245,6 +381,9 @@ class PlaceService:
                 detail="Place not found"
             )
         crud_place.delete(session=session, place_id=place_id)
+        session.commit()
+        self.invalidate_place(place_id)
+        place_spatial_index.invalidate()
         return Message(detail="Place deleted successfully")
     
     def add_photo(self, session: Session, place_id: int, photo_in: PlacePhotoCreate) -> PlacePhotoPublic:
@@ -254,7 +393,10 @@ class PlaceService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Place not found"
             )
-        return crud_place.add_photo(session=session, place_id=place_id, photo_create=photo_in)
+        photo = crud_place.add_photo(session=session, place_id=place_id, photo_create=photo_in)
+        session.commit()
+        self.invalidate_place(place_id)
+        return photo
     
     def get_photos(self, session: Session, place_id: int, page: int = 1, limit: int = 10) -> Dict[str, Any]:
         place = crud_place.get_by_id(session=session, place_id=place_id)
@@ -298,7 +440,10 @@ class PlaceService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Photo not found"
             )
+        place_id = db_photo.place_id
         crud_place.delete_photo(session=session, photo_id=photo_id)
+        session.commit()
+        self.invalidate_place(place_id)
         return Message(detail="Photo deleted successfully")
 
 place_service = PlaceService()
\ No newline at end of file
@@ -80,11 +80,14 @@ class RestaurantService:
                 detail="Restaurant detail already exists for this place"
             )
         
-        return crud_restaurant.create(
+        restaurant_detail = crud_restaurant.create(
             session=session, 
             place_id=place_id, 
             restaurant_detail_create=restaurant_detail_in
         )
+        session.commit()
+        place_service.invalidate_place(place_id)
+        return restaurant_detail
     
     def update_restaurant_detail(self, session: Session, place_id: int, restaurant_detail_in: RestaurantDetailUpdate) -> RestaurantDetails:
         # Check if place exists
@@ -98,11 +101,14 @@ class RestaurantService:
                 detail="Restaurant detail not found for this place"
             )
         
-        return crud_restaurant.update(
+        restaurant_detail = crud_restaurant.update(
             session=session, 
             db_restaurant_detail=db_restaurant_detail, 
             restaurant_detail_in=restaurant_detail_in
         )
+        session.commit()
+        place_service.invalidate_place(place_id)
+        return restaurant_detail
     
     def delete_restaurant_detail(self, session: Session, place_id: int) -> Message:
         # Check if place exists
@@ -117,6 +123,8 @@ class RestaurantService:
             )
         
         crud_restaurant.delete_by_place_id(session=session, place_id=place_id)
+        session.commit()
+        place_service.invalidate_place(place_id)
         return Message(detail="Restaurant detail deleted successfully")
 
 restaurant_service = RestaurantService()
\ No newline at end of file
@@ -0,0 +1,273 @@
+import heapq
+import math
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud.places.crud_place import crud_place
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Size of a grid cell in degrees (~1.1 km of latitude)
+CELL_DEGREES = 0.01
+
+# Past this many rings a nearest-neighbour search falls back to a linear scan
+MAX_SEARCH_RINGS = 64
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates in kilometers"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_array(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """haversine_km over numpy arrays, broadcasting like any numpy operation"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _cell_of(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES)
+
+
+class _GridSnapshot:
+    """Immutable grid over all places.
+
+    Places are stored in parallel arrays sorted by grid cell, and each
+    non-empty cell maps to its [start, end) slice of those arrays.
+    """
+
+    def __init__(self, rows: List[Tuple[int, float, float, str, str]]):
+        self.type_codes: Dict[str, int] = {}
+        self.city_codes: Dict[str, int] = {}
+        self.counts: Dict[Tuple[int, int], int] = {}
+
+        entries = []
+        for place_id, lat, lon, place_type, city in rows:
+            if lat is None or lon is None:
+                continue
+            type_code = self.type_codes.setdefault((place_type or "").upper(), len(self.type_codes))
+            city_code = self.city_codes.setdefault(city or "", len(self.city_codes))
+            entries.append((_cell_of(lat, lon), place_id, lat, lon, type_code, city_code))
+        entries.sort()
+
+        self.ids = array("q")
+        self.lats = array("d")
+        self.lons = array("d")
+        self.types = array("i")
+        self.cities = array("i")
+        self.cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+        for idx, (cell, place_id, lat, lon, type_code, city_code) in enumerate(entries):
+            self.ids.append(place_id)
+            self.lats.append(lat)
+            self.lons.append(lon)
+            self.types.append(type_code)
+            self.cities.append(city_code)
+            start, _ = self.cells.get(cell, (idx, idx))
+            self.cells[cell] = (start, idx + 1)
+            for key in ((type_code, city_code), (type_code, -1), (-1, city_code), (-1, -1)):
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+        if entries:
+            self.min_row = min(cell[0] for cell in self.cells)
+            self.max_row = max(cell[0] for cell in self.cells)
+            self.min_col = min(cell[1] for cell in self.cells)
+            self.max_col = max(cell[1] for cell in self.cells)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def codes(self, type: Optional[str], city: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Translate filters to codes, None when a filter matches nothing"""
+        type_code = city_code = -1
+        if type:
+            if type.upper() not in self.type_codes:
+                return None
+            type_code = self.type_codes[type.upper()]
+        if city:
+            if city not in self.city_codes:
+                return None
+            city_code = self.city_codes[city]
+        return type_code, city_code
+
+    def scan_slice(
+        self, start: int, end: int, lat: float, lon: float, type_code: int, city_code: int
+    ) -> List[Tuple[float, int]]:
+        matches = []
+        for idx in range(start, end):
+            if type_code != -1 and self.types[idx] != type_code:
+                continue
+            if city_code != -1 and self.cities[idx] != city_code:
+                continue
+            distance = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+            matches.append((distance, self.ids[idx]))
+        return matches
+
+
+class PlaceSpatialIndex:
+    """In-memory grid index over place coordinates.
+
+    The index is built from the places table on first use. Place writes only
+    mark it stale (see PlaceService), and the next read rebuilds it; it is
+    also rebuilt once older than SPATIAL_INDEX_TTL_SECONDS, so other worker
+    processes catch up as well. Only one caller rebuilds at a time, the
+    others wait for and reuse its snapshot.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[_GridSnapshot] = None
+        # When the snapshot's rows were read, and when it was last marked stale
+        self._built_at = 0.0
+        self._invalidated_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Mark the snapshot stale after a place write, it is rebuilt on the next read"""
+        self._invalidated_at = time.monotonic()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and self._built_at > self._invalidated_at
+            and time.monotonic() - self._built_at <= self.ttl_seconds
+        )
+
+    def refresh(self, session: Session, force: bool = True) -> None:
+        """Rebuild the snapshot from the places table, unless force is off and
+        another caller rebuilt it while this one waited for the lock"""
+        with self._lock:
+            if not force and self._is_fresh():
+                return
+            # Taken before reading, so a write invalidated during the read leaves it stale
+            built_at = time.monotonic()
+            rows = crud_place.get_coordinates(session=session)
+            self._snapshot = _GridSnapshot(rows)
+            self._built_at = built_at
+
+    def _get_snapshot(self, session: Session) -> _GridSnapshot:
+        if not self._is_fresh():
+            self.refresh(session=session, force=False)
+        return self._snapshot
+
+    def count(self, session: Session, type: Optional[str] = None, city: Optional[str] = None) -> int:
+        snapshot = self._get_snapshot(session)
+        codes = snapshot.codes(type, city)
+        if codes is None:
+            return 0
+        return snapshot.counts.get(codes, 0)
+
+    def within_radius(
+        self,
+        session: Session,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        type: Optional[str] = None,
+        city: Optional[str] = None
+    ) -> List[Tuple[int, float]]:
+        """Get (place_id, distance_km) of places within radius_km, nearest first"""
+        snapshot = self._get_snapshot(session)
+        codes = snapshot.codes(type, city)
+        if codes is None or not len(snapshot):
+            return []
+        type_code, city_code = codes
+
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        min_row, min_col = _cell_of(lat - dlat, lon - dlon)
+        max_row, max_col = _cell_of(lat + dlat, lon + dlon)
+
+        matches: List[Tuple[float, int]] = []
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(snapshot.cells):
+            # The box covers more cells than are populated, walk the populated ones
+            for (row, col), (start, end) in snapshot.cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    matches.extend(snapshot.scan_slice(start, end, lat, lon, type_code, city_code))
+        else:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    bounds = snapshot.cells.get((row, col))
+                    if bounds:
+                        matches.extend(snapshot.scan_slice(bounds[0], bounds[1], lat, lon, type_code, city_code))
+
+        matches = [match for match in matches if match[0] <= radius_km]
+        matches.sort()
+        return [(place_id, distance) for distance, place_id in matches]
+
+    def nearest(
+        self,
+        session: Session,
+        lat: float,
+        lon: float,
+        k: int,
+        type: Optional[str] = None,
+        city: Optional[str] = None
+    ) -> List[Tuple[int, float]]:
+        """Get (place_id, distance_km) of the k nearest places, nearest first.
+
+        Rings of cells around the query point are visited until the k-th
+        nearest match is closer than anything an unvisited ring could hold.
+        """
+        snapshot = self._get_snapshot(session)
+        codes = snapshot.codes(type, city)
+        if codes is None or not len(snapshot) or k <= 0:
+            return []
+        type_code, city_code = codes
+
+        center_row, center_col = _cell_of(lat, lon)
+        max_ring = max(
+            abs(center_row - snapshot.min_row), abs(center_row - snapshot.max_row),
+            abs(center_col - snapshot.min_col), abs(center_col - snapshot.max_col)
+        )
+
+        if max_ring > MAX_SEARCH_RINGS:
+            matches = snapshot.scan_slice(0, len(snapshot), lat, lon, type_code, city_code)
+            return [(place_id, distance) for distance, place_id in heapq.nsmallest(k, matches)]
+
+        # Max-heap (negated distances) of the best k matches so far
+        best: List[Tuple[float, int]] = []
+        for ring in range(max_ring + 1):
+            for row in range(center_row - ring, center_row + ring + 1):
+                on_edge_row = abs(row - center_row) == ring
+                for col in range(center_col - ring, center_col + ring + 1):
+                    if not on_edge_row and abs(col - center_col) != ring:
+                        continue
+                    bounds = snapshot.cells.get((row, col))
+                    if not bounds:
+                        continue
+                    for distance, place_id in snapshot.scan_slice(
+                        bounds[0], bounds[1], lat, lon, type_code, city_code
+                    ):
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, place_id))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, place_id))
+
+            if len(best) == k:
+                # Anything outside this ring is at least `ring` cells away on one axis
+                far_lat = min(89.9, abs(lat) + (ring + 1) * CELL_DEGREES)
+                km_per_cell = CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(far_lat))
+                if -best[0][0] <= ring * km_per_cell:
+                    break
+
+        return [(place_id, -neg_distance) for neg_distance, place_id in sorted(best, reverse=True)]
+
+
+place_spatial_index = PlaceSpatialIndex(ttl_seconds=settings.SPATIAL_INDEX_TTL_SECONDS)
@@ -0,0 +1,90 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models import PlacePublic, TravelMatrixPublic
+from app.services.places.place_service import place_service
+from app.services.places.spatial_index import haversine_km_array
+
+
+class TravelMatrix:
+    """Distances and travel time estimates between places.
+
+    Full matrices and lists of pairs are each computed in one vectorized
+    haversine pass. Nothing is cached: a vectorized haversine costs less per
+    pair than a cache lookup would, and always follows the current
+    coordinates.
+    """
+
+    def __init__(
+        self,
+        speeds_kmh: Dict[str, float],
+        overhead_minutes: Dict[str, int],
+        route_factor: float,
+        default_mode: str
+    ):
+        self.speeds_kmh = speeds_kmh
+        self.overhead_minutes = overhead_minutes
+        self.route_factor = route_factor
+        self.default_mode = default_mode
+
+    def resolve_mode(self, mode: Optional[str]) -> str:
+        mode = (mode or self.default_mode).lower()
+        if mode not in self.speeds_kmh:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown travel mode, expected one of {', '.join(self.speeds_kmh)}"
+            )
+        return mode
+
+    def matrix_km(self, places: Sequence[PlacePublic]) -> np.ndarray:
+        """n x n distances between the places, in km"""
+        lats = np.array([place.latitude for place in places], dtype=float)
+        lons = np.array([place.longitude for place in places], dtype=float)
+        return haversine_km_array(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+    def pair_km(self, pairs: Sequence[Tuple[PlacePublic, PlacePublic]]) -> np.ndarray:
+        """Distance in km of each (origin, destination) pair"""
+        if not pairs:
+            return np.empty(0)
+        lat1, lon1, lat2, lon2 = np.array(
+            [(origin.latitude, origin.longitude, destination.latitude, destination.longitude) for origin, destination in pairs],
+            dtype=float
+        ).T
+        return haversine_km_array(lat1, lon1, lat2, lon2)
+
+    def minutes(self, km: np.ndarray, mode: Optional[str] = None) -> np.ndarray:
+        """Estimated door to door travel minutes for distances in km, 0 where there is nothing to travel"""
+        mode = self.resolve_mode(mode)
+        km = np.asarray(km, dtype=float)
+        moving = np.rint(km * self.route_factor / self.speeds_kmh[mode] * 60) + self.overhead_minutes.get(mode, 0)
+        return np.where(km > 0, moving, 0).astype(int)
+
+    def get_matrix(self, session: Session, place_ids: Sequence[int], mode: Optional[str] = None) -> TravelMatrixPublic:
+        """Distances and travel minutes between every pair of places given by id"""
+        mode = self.resolve_mode(mode)
+        places = place_service._get_places_by_ids(session=session, place_ids=list(place_ids))
+        missing_ids = [place_id for place_id in dict.fromkeys(place_ids) if place_id not in places]
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Places with IDs {missing_ids} not found"
+            )
+        km = self.matrix_km([places[place_id] for place_id in place_ids])
+        return TravelMatrixPublic(
+            place_ids=list(place_ids),
+            mode=mode,
+            distances_km=np.round(km, 3).tolist(),
+            duration_minutes=self.minutes(km, mode).tolist()
+        )
+
+
+travel_matrix = TravelMatrix(
+    speeds_kmh=settings.TRAVEL_SPEEDS_KMH,
+    overhead_minutes=settings.TRAVEL_OVERHEAD_MINUTES,
+    route_factor=settings.TRAVEL_ROUTE_FACTOR,
+    default_mode=settings.TRAVEL_DEFAULT_MODE
+)
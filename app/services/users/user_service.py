@@ -1,13 +1,20 @@
-from fastapi import HTTPException, status
+import logging
+from fastapi import BackgroundTasks, HTTPException, status
 from sqlmodel import Session, select, func
 from uuid import UUID
+from app.core.config import settings
+from app.core.db import engine
+from app.core.security import get_password_hash_async
+from app.crud.itineraries.crud_itinerary import crud_itinerary
 from app.crud.users.crud_user import crud_user
 from app.models import Users, Message, UserPublicMinimal
 from app.repository.response.user_response import UserResponse, UserUpdateMe
 from app.repository.request.user_request import UserUpdate, UserCreate
 
+logger = logging.getLogger(__name__)
+
 class UserService:
-    def create_user(self, session: Session, user_in: UserCreate) -> Users:
+    async def create_user(self, session: Session, user_in: UserCreate) -> Users:
         if crud_user.get_by_email(session=session, email=user_in.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -19,7 +26,11 @@ class UserService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="The user with this username already exists in the system"
             )
-        return crud_user.create(session=session, user_create=user_in)
+        user = crud_user.create(
+            session=session, user_create=user_in, hashed_password=await get_password_hash_async(user_in.password)
+        )
+        session.commit()
+        return user
 
     def update_user(self, session: Session, current_user: Users, user_in: UserUpdate) -> UserUpdateMe:
         if user_in.email:
@@ -36,7 +47,9 @@ class UserService:
                     status_code=status.HTTP_409_CONFLICT,
                     detail="User with this username already exists"
                 )
-        return crud_user.update(session=session, db_user=current_user, user_in=user_in)
+        user = crud_user.update(session=session, db_user=current_user, user_in=user_in)
+        session.commit()
+        return user
 
     def update_user_admin(self, session: Session, user_id: UUID, user_in: UserUpdate) -> Users:
         db_user = session.get(Users, user_id)
@@ -45,7 +58,9 @@ class UserService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        return crud_user.update(session=session, db_user=db_user, user_in=user_in)
+        user = crud_user.update(session=session, db_user=db_user, user_in=user_in)
+        session.commit()
+        return user
 
     # Thêm các phương thức mới cho admin
     def get_users(self, session: Session, skip: int = 0, limit: int = 100) -> UserResponse:
@@ -75,7 +90,53 @@ class UserService:
             )
         return user
 
-    def delete_user_admin(self, session: Session, current_user: Users, user_id: UUID) -> Message:
+    def _delete_user(self, session: Session, user: Users, background_tasks: BackgroundTasks) -> Message:
+        """Helper method to delete small accounts now, and deactivate large ones until the background purge"""
+        itinerary_count = crud_itinerary.get_count_by_user_id(session=session, user_id=user.user_id)
+        if itinerary_count > settings.USER_DELETE_SYNC_MAX_ITINERARIES:
+            crud_user.mark_deleted(session=session, user=user)
+            session.commit()
+            background_tasks.add_task(self.purge_user, user.user_id)
+        else:
+            crud_user.delete(session=session, user_id=user.user_id)
+            session.commit()
+        return Message(detail="User deleted successfully")
+
+    def purge_user(self, user_id: UUID) -> None:
+        """Delete a user's itineraries in small transactions, then the user.
+
+        Every worker resumes pending purges on boot, so several may purge the
+        same user. Batches skip rows another purge has locked, and a purge that
+        finds only locked rows left hands the user over to that one instead of
+        deleting the rest through the cascade in one long transaction.
+        """
+        with Session(engine) as session:
+            while True:
+                deleted = crud_itinerary.delete_batch_by_user_id(
+                    session=session, user_id=user_id, batch_size=settings.USER_PURGE_BATCH_SIZE
+                )
+                session.commit()
+                if deleted:
+                    continue
+                if crud_itinerary.has_any_by_user_id(session=session, user_id=user_id):
+                    logger.info(f"User {user_id} is being purged by another worker")
+                    return
+                break
+            crud_user.delete(session=session, user_id=user_id)
+            session.commit()
+        logger.info(f"Purged user {user_id}")
+
+    def resume_pending_purges(self) -> None:
+        """Finish purges interrupted by a restart"""
+        with Session(engine) as session:
+            user_ids = crud_user.get_pending_purge_ids(session=session)
+        for user_id in user_ids:
+            try:
+                self.purge_user(user_id)
+            except Exception:
+                logger.exception(f"Failed to purge user {user_id}")
+
+    def delete_user_admin(self, session: Session, current_user: Users, user_id: UUID, background_tasks: BackgroundTasks) -> Message:
         """Delete a user (admin only)"""
         user = session.get(Users, user_id)
         if not user:
@@ -88,20 +149,16 @@ class UserService:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Cannot delete yourself"
             )
-        session.delete(user)
-        session.commit()
-        return Message(detail="User deleted successfully")
+        return self._delete_user(session=session, user=user, background_tasks=background_tasks)
 
-    def delete_user_me(self, session: Session, current_user: Users) -> Message:
+    def delete_user_me(self, session: Session, current_user: Users, background_tasks: BackgroundTasks) -> Message:
         """Delete own user account"""
         if current_user.role != 'user':
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Super users are not allowed to delete themselves"
             )
-        session.delete(current_user)
-        session.commit()
-        return Message(detail="User deleted successfully")
+        return self._delete_user(session=session, user=current_user, background_tasks=background_tasks)
 
     def search_users_exclude_ids(self, session: Session, query: str, exclude_ids: list, limit: int = 20) -> list[UserPublicMinimal]:
         statement = (